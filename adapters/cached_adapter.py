@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM响应缓存适配器
+按(模型, 采样参数, 提示词哈希)缓存响应：内存LRU + 磁盘持久化，支持完全离线回放；
+只缓存通过校验的响应，流式调用边转发片段边缓存
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Callable, Iterator, AsyncIterator
+
+from .llm_base import LLMAdapter, set_call_info
+
+
+DEFAULT_CACHE_DIR = ".cache/llm_responses"
+# 内存LRU按响应文本字节数淘汰
+DEFAULT_MEMORY_BYTES = 32 * 1024 * 1024
+
+
+class LLMCacheMiss(LookupError):
+    """离线模式下缓存未命中"""
+
+
+class CachedLLMAdapter(LLMAdapter):
+    """带响应缓存的LLM适配器（包装任意LLMAdapter）"""
+
+    def __init__(self, inner: LLMAdapter, cache_dir: Optional[str] = None,
+                 max_memory_bytes: int = DEFAULT_MEMORY_BYTES,
+                 offline: Optional[bool] = None,
+                 validator: Optional[Callable[[str], bool]] = None):
+        """
+        初始化缓存适配器
+
+        Args:
+            inner: 被包装的LLM适配器
+            cache_dir: 磁盘缓存目录，None则从LLM_CACHE_DIR环境变量获取，
+                       为空字符串时只使用内存缓存
+            max_memory_bytes: 内存LRU的最大字节数
+            offline: 离线模式，未命中时抛出LLMCacheMiss而不请求API；
+                     None则从LLM_CACHE_OFFLINE环境变量获取
+            validator: 判断响应是否值得缓存的函数，默认非空即缓存；
+                       通常传入DecisionValidator.is_valid，只缓存含有效决策的响应
+        """
+        super().__init__(inner.api_key)
+        self.inner = inner
+        self.provider = inner.provider
+
+        if cache_dir is None:
+            cache_dir = os.getenv('LLM_CACHE_DIR', DEFAULT_CACHE_DIR)
+        self.cache_dir = cache_dir
+        if offline is None:
+            offline = os.getenv('LLM_CACHE_OFFLINE', '').lower() in ('1', 'true', 'yes')
+        self.offline = offline
+        self.validator = validator or (lambda response: bool(response and response.strip()))
+
+        self.max_memory_bytes = max_memory_bytes
+        self._memory: 'OrderedDict[str, str]' = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def cache_key(self, prompt: str, prefix: Optional[str] = None) -> str:
+        """
+        计算缓存键
+
+        Args:
+            prompt: 提示词可变部分
+            prefix: 静态前缀
+
+        Returns:
+            sha256十六进制字符串
+        """
+        prompt_hash = hashlib.sha256(((prefix or "") + prompt).encode('utf-8')).hexdigest()
+        material = json.dumps([self.inner.get_model_name(),
+                               self.inner.get_sampling_params(),
+                               prompt_hash], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    def call(self, prompt: str, prefix: Optional[str] = None) -> str:
+        """
+        调用LLM API（优先读取缓存）
+
+        Args:
+            prompt: 输入提示词
+            prefix: 静态前缀
+
+        Returns:
+            LLM响应文本
+        """
+        key = self.cache_key(prompt, prefix)
+        cached = self.lookup(key)
+        if cached is not None:
+            set_call_info({'path': 'cache'})
+            return cached
+
+        response = self.inner.call(prompt, prefix)
+        self.store(key, response)
+        return response
+
+    async def acall(self, prompt: str, prefix: Optional[str] = None) -> str:
+        """
+        异步调用LLM API（优先读取缓存）
+
+        Args:
+            prompt: 输入提示词
+            prefix: 静态前缀
+
+        Returns:
+            LLM响应文本
+        """
+        key = self.cache_key(prompt, prefix)
+        cached = self.lookup(key)
+        if cached is not None:
+            set_call_info({'path': 'cache'})
+            return cached
+
+        response = await self.inner.acall(prompt, prefix)
+        self.store(key, response)
+        return response
+
+    def stream(self, prompt: str, prefix: Optional[str] = None) -> Iterator[str]:
+        """
+        流式调用LLM API（优先读取缓存，命中时一次性返回）
+
+        未命中时边转发片段边记录，流结束或调用方提前关闭后把已收到的文本写入缓存；
+        提前关闭时已收到的部分含有完整决策，同样能通过校验。
+
+        Args:
+            prompt: 输入提示词
+            prefix: 静态前缀
+
+        Returns:
+            响应文本片段的迭代器
+        """
+        key = self.cache_key(prompt, prefix)
+        cached = self.lookup(key)
+        if cached is not None:
+            set_call_info({'path': 'cache'})
+            yield cached
+            return
+
+        chunks = self.inner.stream(prompt, prefix)
+        parts = []
+        try:
+            for chunk in chunks:
+                parts.append(chunk)
+                yield chunk
+        except GeneratorExit:
+            self.store(key, ''.join(parts))
+            raise
+        finally:
+            chunks.close()
+        self.store(key, ''.join(parts))
+
+    async def astream(self, prompt: str, prefix: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        异步流式调用LLM API（优先读取缓存，命中时一次性返回），缓存方式同stream
+
+        Args:
+            prompt: 输入提示词
+            prefix: 静态前缀
+
+        Returns:
+            响应文本片段的异步迭代器
+        """
+        key = self.cache_key(prompt, prefix)
+        cached = self.lookup(key)
+        if cached is not None:
+            set_call_info({'path': 'cache'})
+            yield cached
+            return
+
+        chunks = self.inner.astream(prompt, prefix)
+        parts = []
+        try:
+            async for chunk in chunks:
+                parts.append(chunk)
+                yield chunk
+        except GeneratorExit:
+            self.store(key, ''.join(parts))
+            raise
+        finally:
+            await chunks.aclose()
+        self.store(key, ''.join(parts))
+
+    def lookup(self, key: str) -> Optional[str]:
+        """
+        查询缓存：内存 -> 磁盘
+
+        Returns:
+            缓存的响应；未命中时返回None，离线模式下抛出LLMCacheMiss
+        """
+        with self._lock:
+            response = self._memory.get(key)
+            if response is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return response
+
+        response = self._read_disk(key)
+        if response is not None:
+            self._remember(key, response)
+            with self._lock:
+                self.hits += 1
+                self.disk_hits += 1
+            return response
+
+        with self._lock:
+            self.misses += 1
+        if self.offline:
+            raise LLMCacheMiss(f"{self.get_model_name()}离线缓存未命中: {key[:12]}")
+        return None
+
+    def store(self, key: str, response: str):
+        """写入缓存（未通过validator的响应不缓存，避免离线回放固化无效响应）"""
+        if not self.validator(response):
+            return
+        self._remember(key, response)
+        self._write_disk(key, response)
+
+    def _remember(self, key: str, response: str):
+        """写入内存LRU并按字节数淘汰"""
+        size = len(response.encode('utf-8'))
+        with self._lock:
+            previous = self._memory.pop(key, None)
+            if previous is not None:
+                self._memory_bytes -= len(previous.encode('utf-8'))
+            self._memory[key] = response
+            self._memory_bytes += size
+            while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted.encode('utf-8'))
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + ".json")
+
+    def _read_disk(self, key: str) -> Optional[str]:
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                return json.load(f)['response']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write_disk(self, key: str, response: str):
+        if not self.cache_dir:
+            return
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'model': self.inner.get_model_name(),
+                    'params': self.inner.get_sampling_params(),
+                    'response': response,
+                    'created': time.time(),
+                }, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️ LLM响应缓存写入失败: {e}")
+
+    def warm_up(self) -> bool:
+        """预热被包装适配器的连接池（离线模式不联网）"""
+        return True if self.offline else self.inner.warm_up()
+
+    async def awarm_up(self) -> bool:
+        """预热被包装适配器的异步连接池（离线模式不联网）"""
+        return True if self.offline else await self.inner.awarm_up()
+
+    async def aclose(self):
+        """关闭被包装适配器的连接池"""
+        await self.inner.aclose()
+
+    def get_sampling_params(self) -> Dict[str, Any]:
+        """获取被包装适配器的请求参数"""
+        return self.inner.get_sampling_params()
+
+    def get_model_name(self) -> str:
+        """获取模型名称"""
+        return self.inner.get_model_name()
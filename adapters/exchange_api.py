@@ -7,18 +7,43 @@
 
 import os
 import sys
-from typing import Dict, List
-
-# 添加cex_scripts路径到sys.path
-cex_scripts_path = "/Users/binguo/workspaces/cex_scripts/scripts/tools"
-if cex_scripts_path not in sys.path:
-    sys.path.append(cex_scripts_path)
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any
 
 try:
-    from cex_verified_api_client import BitgetVerifiedAPIClient
+    import requests
 except ImportError:
-    print("❌ 无法导入BitgetVerifiedAPIClient，请检查cex_scripts路径")
-    BitgetVerifiedAPIClient = None
+    print("❌ 请安装requests: pip install requests")
+    requests = None
+
+# BitgetVerifiedAPIClient所在目录（可用CEX_SCRIPTS_PATH环境变量覆盖）
+DEFAULT_CEX_SCRIPTS_PATH = "/Users/binguo/workspaces/cex_scripts/scripts/tools"
+
+# Bitget公共行情接口：不带symbol参数时一次返回全部现货ticker
+BITGET_TICKERS_URL = "https://api.bitget.com/api/v2/spot/market/tickers"
+BULK_REQUEST_TIMEOUT = 3.0
+# 无批量接口可用时，逐币并发请求的最大并发数
+MAX_FETCH_WORKERS = 8
+
+
+def load_client_class():
+    """
+    按需导入BitgetVerifiedAPIClient（首次创建ExchangeAPI时才修改sys.path）
+    
+    Returns:
+        客户端类，导入失败时返回None
+    """
+    cex_scripts_path = os.getenv('CEX_SCRIPTS_PATH', DEFAULT_CEX_SCRIPTS_PATH)
+    if cex_scripts_path not in sys.path:
+        sys.path.append(cex_scripts_path)
+    
+    try:
+        from cex_verified_api_client import BitgetVerifiedAPIClient
+    except ImportError:
+        print("❌ 无法导入BitgetVerifiedAPIClient，请检查cex_scripts路径")
+        return None
+    return BitgetVerifiedAPIClient
 
 
 class ExchangeAPI:
@@ -26,15 +51,22 @@ class ExchangeAPI:
     
     def __init__(self):
         """初始化交易所API"""
-        if BitgetVerifiedAPIClient is None:
+        client_class = load_client_class()
+        if client_class is None:
             raise ImportError("BitgetVerifiedAPIClient未找到")
         
         try:
-            self.client = BitgetVerifiedAPIClient()
+            self.client = client_class()
             print("✅ Bitget API客户端初始化成功")
         except Exception as e:
             print(f"❌ Bitget API客户端初始化失败: {e}")
             self.client = None
+        
+        # 公共行情接口使用长连接会话
+        self.session = requests.Session() if requests else None
+        self._executor = ThreadPoolExecutor(max_workers=MAX_FETCH_WORKERS,
+                                            thread_name_prefix="exchange-fetch")
+        self.last_snapshot: Dict[str, Any] = {}
     
     def get_latest_prices(self, symbols: List[str]) -> Dict[str, float]:
         """
@@ -46,22 +78,122 @@ class ExchangeAPI:
         Returns:
             价格字典，格式为{symbol: price}
         """
-        if self.client is None:
-            print("❌ API客户端未初始化")
-            return {symbol: 0.0 for symbol in symbols}
+        return self.get_snapshot(symbols)['prices']
+    
+    def get_snapshot(self, symbols: List[str]) -> Dict[str, Any]:
+        """
+        获取多个代币的同一时刻价格快照
         
-        prices = {}
+        优先一次请求拉取全部ticker；失败时对客户端逐币并发请求；
+        并发不可用时退回逐个请求。
         
-        for symbol in symbols:
+        Args:
+            symbols: 代币符号列表
+            
+        Returns:
+            快照字典：
+                prices: {symbol: price}，失败的代币为0.0
+                timestamp: 快照时间（秒，Unix时间戳）
+                skew_ms: 快照内各价格时间戳的最大差值（毫秒）
+                source: 数据来源，bulk / concurrent / sequential / unavailable
+                volumes: {symbol: 24小时成交额(USDT)}，仅bulk来源提供
+        """
+        snapshot = None
+        
+        try:
+            snapshot = self._fetch_bulk(symbols)
+        except Exception as e:
+            print(f"⚠️ 批量行情获取失败，改为逐币请求: {e}")
+        
+        if snapshot is None and self.client is not None:
             try:
-                price = self.client.get_current_price(symbol)
-                prices[symbol] = price
-                print(f"✅ {symbol}: ${price:.4f}")
+                snapshot = self._fetch_concurrent(symbols)
             except Exception as e:
-                print(f"❌ 获取{symbol}价格失败: {e}")
+                print(f"⚠️ 并发行情获取失败，改为逐个请求: {e}")
+                snapshot = self._fetch_sequential(symbols)
+        
+        if snapshot is None:
+            print("❌ API客户端未初始化")
+            snapshot = {
+                'prices': {symbol: 0.0 for symbol in symbols},
+                'timestamp': time.time(),
+                'skew_ms': 0.0,
+                'source': 'unavailable',
+            }
+        
+        ok = sum(1 for price in snapshot['prices'].values() if price > 0)
+        print(f"✅ 获取{ok}/{len(symbols)}个价格 "
+              f"(来源: {snapshot['source']}, 时间差: {snapshot['skew_ms']:.0f}ms)")
+        
+        self.last_snapshot = snapshot
+        return snapshot
+    
+    def _fetch_bulk(self, symbols: List[str]) -> Dict[str, Any]:
+        """一次请求获取全部ticker，时间差取自交易所返回的ticker时间戳"""
+        if self.session is None:
+            raise RuntimeError("requests未安装")
+        
+        response = self.session.get(BITGET_TICKERS_URL, timeout=BULK_REQUEST_TIMEOUT)
+        response.raise_for_status()
+        payload = response.json()
+        if payload.get('code') != '00000':
+            raise RuntimeError(payload.get('msg', '未知错误'))
+        
+        wanted = set(symbols)
+        tickers = {item['symbol']: item for item in payload.get('data', [])
+                   if item.get('symbol') in wanted}
+        
+        prices = {}
+        volumes = {}
+        stamps = []
+        for symbol in symbols:
+            ticker = tickers.get(symbol)
+            if ticker is None:
+                print(f"❌ 获取{symbol}价格失败: 行情中无此代币")
                 prices[symbol] = 0.0
+                continue
+            prices[symbol] = float(ticker['lastPr'])
+            volumes[symbol] = float(ticker.get('usdtVolume') or ticker.get('quoteVolume') or 0.0)
+            if ticker.get('ts'):
+                stamps.append(int(ticker['ts']))
         
-        return prices
+        return {
+            'prices': prices,
+            'volumes': volumes,
+            'timestamp': max(stamps) / 1000.0 if stamps else time.time(),
+            'skew_ms': float(max(stamps) - min(stamps)) if stamps else 0.0,
+            'source': 'bulk',
+        }
+    
+    def _fetch_one(self, symbol: str):
+        """请求单个代币价格，返回(价格, 收到响应的时间)"""
+        try:
+            price = self.client.get_current_price(symbol)
+        except Exception as e:
+            print(f"❌ 获取{symbol}价格失败: {e}")
+            price = 0.0
+        return price, time.time()
+    
+    def _fetch_concurrent(self, symbols: List[str]) -> Dict[str, Any]:
+        """对客户端逐币并发请求，时间差取自各响应的到达时间"""
+        results = list(self._executor.map(self._fetch_one, symbols))
+        return self._build_snapshot(symbols, results, 'concurrent')
+    
+    def _fetch_sequential(self, symbols: List[str]) -> Dict[str, Any]:
+        """逐个请求（最后的兜底路径）"""
+        results = [self._fetch_one(symbol) for symbol in symbols]
+        return self._build_snapshot(symbols, results, 'sequential')
+    
+    def _build_snapshot(self, symbols: List[str], results: list, source: str) -> Dict[str, Any]:
+        """由逐币请求结果构建快照"""
+        prices = {symbol: price for symbol, (price, _) in zip(symbols, results)}
+        stamps = [received for _, received in results]
+        return {
+            'prices': prices,
+            'timestamp': max(stamps) if stamps else time.time(),
+            'skew_ms': (max(stamps) - min(stamps)) * 1000.0 if stamps else 0.0,
+            'source': source,
+        }
     
     def get_single_price(self, symbol: str) -> float:
         """
@@ -0,0 +1,541 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM服务商网关
+按(服务商, API密钥)共享的令牌桶限流（请求数/分钟、token数/分钟）、
+截止时间内的抖动指数退避重试，以及服务商故障时快速失败的熔断器
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+from typing import Dict, Any, Optional, Iterator, AsyncIterator, Tuple
+
+from core.tokens import estimate_tokens
+from .llm_base import LLMAdapter, LLMAPIError, DEFAULT_LLM_TIMEOUT
+
+
+# 默认限流（可用{PROVIDER}_RPM / {PROVIDER}_TPM环境变量覆盖，如OPENAI_RPM）
+DEFAULT_REQUESTS_PER_MINUTE = 500
+DEFAULT_TOKENS_PER_MINUTE = 80000
+# 重试：最多尝试次数与退避基数（秒），全抖动 uniform(0, base * 2^n)
+DEFAULT_MAX_ATTEMPTS = 4
+DEFAULT_BACKOFF_BASE = 0.25
+DEFAULT_BACKOFF_CAP = 4.0
+# 熔断：连续失败次数阈值与打开时长（秒）
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 30.0
+
+
+class CircuitOpenError(LLMAPIError):
+    """熔断器打开，快速失败"""
+
+
+class TokenBucket:
+    """
+    线程安全的令牌桶
+
+    采用预约模式：acquire立即扣减令牌（余额可为负）并返回需要等待的秒数，
+    并发调用方按到达顺序排队，不会同时醒来争抢。
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        """
+        初始化令牌桶
+
+        Args:
+            rate_per_minute: 每分钟补充的令牌数
+            capacity: 桶容量（允许的突发量），默认等于每分钟额度
+        """
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else float(rate_per_minute)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """
+        查询令牌足够所需的等待时间（不扣减）
+
+        Args:
+            amount: 令牌数
+
+        Returns:
+            等待秒数
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            deficit = min(amount, self.capacity) - self._tokens
+            return max(0.0, deficit / self.rate)
+
+    def acquire(self, amount: float) -> float:
+        """
+        预约令牌
+
+        Args:
+            amount: 令牌数（超过容量时按容量计）
+
+        Returns:
+            调用方需要等待的秒数
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= min(amount, self.capacity)
+            return max(0.0, -self._tokens / self.rate)
+
+    def drain(self, seconds: float):
+        """清空令牌并预扣seconds秒的补充量（服务端返回429时所有调用方一起退让）"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, -seconds * self.rate)
+
+
+class CircuitBreaker:
+    """
+    熔断器
+
+    closed: 正常放行；连续失败达到阈值后转为open，期间所有调用快速失败；
+    open持续reset_timeout秒后转为half_open，只放行一个探测请求，成功则关闭，失败则重新打开。
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 reset_timeout: float = DEFAULT_RESET_TIMEOUT):
+        """
+        初始化熔断器
+
+        Args:
+            failure_threshold: 连续失败次数阈值
+            reset_timeout: 打开状态持续时间（秒）
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """
+        判断是否放行本次调用
+
+        Returns:
+            True表示放行
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def retry_in(self) -> float:
+        """距离允许探测还需等待的秒数"""
+        with self._lock:
+            if self.state != self.OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def release(self):
+        """调用被取消、结果未知：归还半开状态的探测名额"""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self):
+        """记录一次成功调用"""
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        """记录一次失败调用"""
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    print(f"🔌 熔断器打开: 连续失败{self.failures}次，{self.reset_timeout:.0f}s后探测")
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+
+class ProviderGateway:
+    """单个(服务商, API密钥)的共享限流与熔断状态"""
+
+    def __init__(self, provider: str,
+                 requests_per_minute: float = DEFAULT_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: float = DEFAULT_TOKENS_PER_MINUTE,
+                 failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 reset_timeout: float = DEFAULT_RESET_TIMEOUT):
+        """
+        初始化网关
+
+        Args:
+            provider: 服务商名称
+            requests_per_minute: 每分钟请求数上限
+            tokens_per_minute: 每分钟token数上限（输入+最大输出）
+            failure_threshold: 熔断失败阈值
+            reset_timeout: 熔断打开时长（秒）
+        """
+        self.provider = provider
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+
+        # 统计
+        self.calls = 0
+        self.retries = 0
+        self.throttled = 0
+        self.rejected = 0
+        self.failures = 0
+        self.wait_seconds = 0.0
+
+    def reserve(self, tokens: int, deadline: float) -> float:
+        """
+        预约一次请求的配额
+
+        先检查两个桶的等待时间，超过截止时间则不扣减直接失败，避免白白占用额度。
+
+        Args:
+            tokens: 本次请求估计消耗的token数
+            deadline: 单调时钟截止时刻
+
+        Returns:
+            需要等待的秒数
+
+        Raises:
+            LLMAPIError: 截止时间前拿不到配额
+        """
+        wait = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+        if time.monotonic() + wait > deadline:
+            self.throttled += 1
+            raise LLMAPIError(f"{self.provider}限流: 截止时间前无可用配额（需等待{wait:.1f}s）",
+                              provider=self.provider, status_code=429, retryable=False)
+        wait = max(self.requests.acquire(1), self.tokens.acquire(tokens))
+        self.wait_seconds += wait
+        return wait
+
+    def on_rate_limited(self, retry_after: Optional[float]):
+        """服务端返回429：所有共享该密钥的调用方一起退让"""
+        pause = retry_after if retry_after else 1.0
+        self.requests.drain(pause)
+        self.tokens.drain(pause)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取网关统计
+
+        Returns:
+            {provider, state, calls, retries, throttled, rejected, failures, wait_seconds}
+        """
+        return {
+            'provider': self.provider,
+            'state': self.breaker.state,
+            'calls': self.calls,
+            'retries': self.retries,
+            'throttled': self.throttled,
+            'rejected': self.rejected,
+            'failures': self.failures,
+            'wait_seconds': self.wait_seconds,
+        }
+
+
+_gateways: Dict[Tuple[str, str], ProviderGateway] = {}
+_gateways_lock = threading.Lock()
+
+
+def get_gateway(provider: str, api_key: str = "") -> ProviderGateway:
+    """
+    获取进程内共享的服务商网关（同一服务商+API密钥只创建一个）
+
+    限流额度从{PROVIDER}_RPM / {PROVIDER}_TPM环境变量读取。
+
+    Args:
+        provider: 服务商名称
+        api_key: API密钥（额度按密钥计算）
+
+    Returns:
+        ProviderGateway实例
+    """
+    key = (provider, api_key or "")
+    with _gateways_lock:
+        gateway = _gateways.get(key)
+        if gateway is None:
+            prefix = provider.upper()
+            gateway = ProviderGateway(
+                provider,
+                requests_per_minute=float(os.getenv(f'{prefix}_RPM', DEFAULT_REQUESTS_PER_MINUTE)),
+                tokens_per_minute=float(os.getenv(f'{prefix}_TPM', DEFAULT_TOKENS_PER_MINUTE)),
+            )
+            _gateways[key] = gateway
+        return gateway
+
+
+class GatewayLLMAdapter(LLMAdapter):
+    """经过服务商网关的LLM适配器（包装任意LLMAdapter）"""
+
+    def __init__(self, inner: LLMAdapter, gateway: Optional[ProviderGateway] = None,
+                 deadline: float = DEFAULT_LLM_TIMEOUT,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                 backoff_base: float = DEFAULT_BACKOFF_BASE):
+        """
+        初始化网关适配器
+
+        Args:
+            inner: 被包装的LLM适配器（失败时应抛出LLMAPIError）
+            gateway: 服务商网关，默认按(inner.provider, api_key)取共享实例
+            deadline: 单次决策的总截止时间（秒），限流等待与重试都不会超过它
+            max_attempts: 最多尝试次数
+            backoff_base: 退避基数（秒）
+        """
+        super().__init__(inner.api_key)
+        self.inner = inner
+        self.provider = inner.provider
+        self.gateway = gateway or get_gateway(inner.provider, inner.api_key)
+        self.deadline = deadline
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self._max_tokens = int(inner.get_sampling_params().get('max_tokens', 0))
+
+    def _cost(self, prompt: str, prefix: Optional[str]) -> int:
+        """本次请求占用的token额度：输入估计 + 最大输出"""
+        return estimate_tokens((prefix or "") + prompt) + self._max_tokens
+
+    def _admit(self, cost: int, deadline: float) -> float:
+        """
+        通过熔断器与限流，返回需要等待的秒数
+
+        Raises:
+            CircuitOpenError: 熔断器打开
+            LLMAPIError: 截止时间前拿不到配额
+        """
+        if not self.gateway.breaker.allow():
+            self.gateway.rejected += 1
+            raise CircuitOpenError(
+                f"{self.provider}熔断中，{self.gateway.breaker.retry_in():.0f}s后恢复探测",
+                provider=self.provider, retryable=False)
+        try:
+            return self.gateway.reserve(cost, deadline)
+        except LLMAPIError:
+            # 未真正发出请求，归还半开状态的探测名额（不计入熔断）
+            self.gateway.breaker.release()
+            raise
+
+    def _wait_admitted(self, delay: float):
+        """等待限流配额；等待期间被中断时归还_admit占用的半开探测名额"""
+        try:
+            time.sleep(delay)
+        except BaseException:
+            self.gateway.breaker.release()
+            raise
+
+    async def _await_admitted(self, delay: float):
+        """异步等待限流配额；等待期间被取消（决策超时、投票定局）时归还半开探测名额"""
+        try:
+            await asyncio.sleep(delay)
+        except BaseException:
+            self.gateway.breaker.release()
+            raise
+
+    def _on_error(self, error: Exception, attempt: int, deadline: float) -> float:
+        """
+        记录失败并计算退避时间
+
+        Returns:
+            下次重试前需要等待的秒数
+
+        Raises:
+            LLMAPIError: 不可重试、次数用尽或退避会超过截止时间
+        """
+        if not isinstance(error, LLMAPIError):
+            error = LLMAPIError.from_exception(self.provider, error)
+        self.gateway.failures += 1
+        if error.status_code == 429:
+            self.gateway.on_rate_limited(error.retry_after)
+        # 请求本身有问题（4xx）不代表服务商故障，不计入熔断；
+        # 也不算成功，只归还探测名额，半开状态等待下一个真正的探测结果
+        if error.retryable:
+            self.gateway.breaker.record_failure()
+        else:
+            self.gateway.breaker.release()
+        if not error.retryable or attempt + 1 >= self.max_attempts:
+            raise error
+
+        delay = random.uniform(0, min(DEFAULT_BACKOFF_CAP, self.backoff_base * 2 ** attempt))
+        # 429的Retry-After已通过清空令牌桶生效，其余状态码直接延长退避
+        if error.retry_after and error.status_code != 429:
+            delay = max(delay, error.retry_after)
+        if time.monotonic() + delay > deadline:
+            raise error
+        self.gateway.retries += 1
+        return delay
+
+    def _on_success(self):
+        self.gateway.calls += 1
+        self.gateway.breaker.record_success()
+
+    def call(self, prompt: str, prefix: Optional[str] = None) -> str:
+        """
+        经网关调用LLM API
+
+        Args:
+            prompt: 输入提示词
+            prefix: 静态前缀
+
+        Returns:
+            LLM响应文本
+
+        Raises:
+            LLMAPIError: 熔断、限流超时或重试用尽
+        """
+        deadline = time.monotonic() + self.deadline
+        cost = self._cost(prompt, prefix)
+        for attempt in range(self.max_attempts):
+            self._wait_admitted(self._admit(cost, deadline))
+            try:
+                response = self.inner.call(prompt, prefix)
+            except Exception as e:
+                time.sleep(self._on_error(e, attempt, deadline))
+                continue
+            self._on_success()
+            return response
+
+    async def acall(self, prompt: str, prefix: Optional[str] = None) -> str:
+        """
+        经网关异步调用LLM API
+
+        Args:
+            prompt: 输入提示词
+            prefix: 静态前缀
+
+        Returns:
+            LLM响应文本
+
+        Raises:
+            LLMAPIError: 熔断、限流超时或重试用尽
+        """
+        deadline = time.monotonic() + self.deadline
+        cost = self._cost(prompt, prefix)
+        for attempt in range(self.max_attempts):
+            await self._await_admitted(self._admit(cost, deadline))
+            try:
+                response = await self.inner.acall(prompt, prefix)
+            except asyncio.CancelledError:
+                self.gateway.breaker.release()
+                raise
+            except Exception as e:
+                await asyncio.sleep(self._on_error(e, attempt, deadline))
+                continue
+            self._on_success()
+            return response
+
+    def stream(self, prompt: str, prefix: Optional[str] = None) -> Iterator[str]:
+        """
+        经网关流式调用LLM API（收到首个片段前失败才重试）
+
+        Args:
+            prompt: 输入提示词
+            prefix: 静态前缀
+
+        Returns:
+            响应文本片段的迭代器
+        """
+        deadline = time.monotonic() + self.deadline
+        cost = self._cost(prompt, prefix)
+        for attempt in range(self.max_attempts):
+            self._wait_admitted(self._admit(cost, deadline))
+            chunks = self.inner.stream(prompt, prefix)
+            yielded = False
+            try:
+                for chunk in chunks:
+                    yielded = True
+                    yield chunk
+            except GeneratorExit:
+                # 调用方提前终止（已拿到完整决策）
+                if yielded:
+                    self._on_success()
+                else:
+                    self.gateway.breaker.release()
+                raise
+            except Exception as e:
+                # 已输出部分内容时不可重试
+                time.sleep(self._on_error(e, self.max_attempts if yielded else attempt, deadline))
+                continue
+            finally:
+                chunks.close()
+            self._on_success()
+            return
+
+    async def astream(self, prompt: str, prefix: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        经网关异步流式调用LLM API（收到首个片段前失败才重试）
+
+        Args:
+            prompt: 输入提示词
+            prefix: 静态前缀
+
+        Returns:
+            响应文本片段的异步迭代器
+        """
+        deadline = time.monotonic() + self.deadline
+        cost = self._cost(prompt, prefix)
+        for attempt in range(self.max_attempts):
+            await self._await_admitted(self._admit(cost, deadline))
+            chunks = self.inner.astream(prompt, prefix)
+            yielded = False
+            try:
+                async for chunk in chunks:
+                    yielded = True
+                    yield chunk
+            except (GeneratorExit, asyncio.CancelledError):
+                # 调用方提前终止（已拿到完整决策）或决策超时被取消
+                if yielded:
+                    self._on_success()
+                else:
+                    self.gateway.breaker.release()
+                raise
+            except Exception as e:
+                # 已输出部分内容时不可重试
+                await asyncio.sleep(self._on_error(e, self.max_attempts if yielded else attempt, deadline))
+                continue
+            finally:
+                await chunks.aclose()
+            self._on_success()
+            return
+
+    def warm_up(self) -> bool:
+        """预热被包装适配器的连接池（不计入限流配额）"""
+        return self.inner.warm_up()
+
+    async def awarm_up(self) -> bool:
+        """预热被包装适配器的异步连接池"""
+        return await self.inner.awarm_up()
+
+    async def aclose(self):
+        """关闭被包装适配器的连接池"""
+        await self.inner.aclose()
+
+    def get_sampling_params(self) -> Dict[str, Any]:
+        """获取被包装适配器的请求参数"""
+        return self.inner.get_sampling_params()
+
+    def get_model_name(self) -> str:
+        """获取模型名称"""
+        return self.inner.get_model_name()
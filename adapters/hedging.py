@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+对冲请求适配器
+主部署的调用超过其滚动p95延迟仍未返回时，把同一提示词发给备用部署（其他区域、端点或本地替身），
+取先到的有效响应并取消另一路；每次调用走了哪一路按调用上下文记录（llm_base.get_call_info），供审计与公平性分析。
+流式调用按首个片段对冲：先产出首个片段的一路胜出，此后只读取这一路
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Any, Optional, Callable, Iterator, AsyncIterator
+
+from .llm_base import LLMAdapter, LLMAPIError, set_call_info
+
+
+# 触发对冲的滚动分位点与窗口
+DEFAULT_HEDGE_QUANTILE = 0.95
+DEFAULT_HEDGE_WINDOW = 200
+# 样本不足时使用的对冲延迟（秒）
+DEFAULT_HEDGE_DELAY = 4.0
+DEFAULT_MIN_SAMPLES = 20
+# 对冲延迟下限（秒），避免p95很小时几乎每次都对冲
+DEFAULT_MIN_HEDGE_DELAY = 0.5
+
+PRIMARY = "primary"
+SECONDARY = "secondary"
+
+
+class HedgedLLMAdapter(LLMAdapter):
+    """主备对冲的LLM适配器（包装两个LLMAdapter）"""
+
+    def __init__(self, primary: LLMAdapter, secondary: LLMAdapter,
+                 quantile: float = DEFAULT_HEDGE_QUANTILE,
+                 window: int = DEFAULT_HEDGE_WINDOW,
+                 initial_delay: float = DEFAULT_HEDGE_DELAY,
+                 min_samples: int = DEFAULT_MIN_SAMPLES,
+                 min_delay: float = DEFAULT_MIN_HEDGE_DELAY,
+                 validator: Optional[Callable[[str], bool]] = None):
+        """
+        初始化对冲适配器
+
+        Args:
+            primary: 主部署适配器（决定模型名称、服务商与请求参数）
+            secondary: 备用部署适配器
+            quantile: 主部署滚动延迟的分位点，超过即发出备用请求
+            window: 滚动窗口的样本数
+            initial_delay: 样本不足min_samples时的对冲延迟（秒）
+            min_samples: 开始使用滚动分位数所需的样本数
+            min_delay: 对冲延迟下限（秒）
+            validator: 判断响应是否有效的函数，默认非空即有效；无效响应视为该路失败。
+                       流式调用在首个片段处即选定一路，不经过validator（由调用方校验完整响应）
+        """
+        super().__init__(primary.api_key)
+        self.primary = primary
+        self.secondary = secondary
+        self.provider = primary.provider
+        self.quantile = quantile
+        self.initial_delay = initial_delay
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.validator = validator or (lambda response: bool(response and response.strip()))
+
+        self._latencies: deque = deque(maxlen=window)
+        # 流式调用按主部署的首片段延迟对冲，单独统计
+        self._first_chunk_latencies: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+        # 同步路径的两路请求在此线程池中执行；被放弃的一路在后台自然结束
+        self._pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="arena-hedge")
+
+        self.calls = 0
+        self.hedged = 0
+        self.secondary_wins = 0
+
+    def hedge_delay(self, first_chunk: bool = False) -> float:
+        """
+        当前的对冲延迟：主部署滚动窗口的分位数（最近秩），不低于min_delay
+
+        Args:
+            first_chunk: 使用首片段延迟窗口（流式调用）
+
+        Returns:
+            秒
+        """
+        latencies = self._first_chunk_latencies if first_chunk else self._latencies
+        with self._lock:
+            if len(latencies) < self.min_samples:
+                return self.initial_delay
+            ordered = sorted(latencies)
+        rank = min(len(ordered) - 1, int(self.quantile * len(ordered)))
+        return max(self.min_delay, ordered[rank])
+
+    def _observe(self, seconds: float, first_chunk: bool = False):
+        """记录主部署的一次延迟（被取消时记已等待的时长，作为下界）"""
+        with self._lock:
+            (self._first_chunk_latencies if first_chunk else self._latencies).append(seconds)
+
+    def _check(self, response: str, path: str) -> str:
+        if not self.validator(response):
+            raise LLMAPIError(f"{self.provider} {path}部署返回无效响应", provider=self.provider)
+        return response
+
+    def _finish(self, path: str, hedged: bool, delay: float, started: float):
+        """记录本次调用的路由信息"""
+        with self._lock:
+            self.calls += 1
+            if hedged:
+                self.hedged += 1
+            if path == SECONDARY:
+                self.secondary_wins += 1
+        set_call_info({
+            'path': path,
+            'hedged': hedged,
+            'hedge_delay': delay,
+            'latency': time.perf_counter() - started,
+            'deployment': (self.primary if path == PRIMARY else self.secondary).get_model_name(),
+        })
+
+    def call(self, prompt: str, prefix: Optional[str] = None) -> str:
+        """
+        对冲调用：主部署超过对冲延迟或失败时发出备用请求，取先到的有效响应
+
+        同步客户端无法中途取消请求，落败的一路在后台完成后被丢弃。
+
+        Args:
+            prompt: 输入提示词
+            prefix: 静态前缀
+
+        Returns:
+            LLM响应文本
+
+        Raises:
+            LLMAPIError: 两路均失败（抛出主部署的错误）
+        """
+        started = time.perf_counter()
+        delay = self.hedge_delay()
+        futures = {self._pool.submit(self._timed_primary, prompt, prefix, started): PRIMARY}
+        done, _ = wait(futures, timeout=delay)
+        hedged = False
+        errors: Dict[str, Exception] = {}
+
+        while futures:
+            for future in done:
+                path = futures.pop(future)
+                try:
+                    response = self._check(future.result(), path)
+                except Exception as e:
+                    errors[path] = e
+                    continue
+                if futures and path == SECONDARY:
+                    self._observe(time.perf_counter() - started)
+                self._finish(path, hedged, delay, started)
+                return response
+            if not hedged:
+                # 主部署超过对冲延迟或已失败：发出备用请求
+                hedged = True
+                futures[self._pool.submit(self.secondary.call, prompt, prefix)] = SECONDARY
+            if futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+
+        raise errors.get(PRIMARY) or errors[SECONDARY]
+
+    def _timed_primary(self, prompt: str, prefix: Optional[str], started: float) -> str:
+        response = self.primary.call(prompt, prefix)
+        self._observe(time.perf_counter() - started)
+        return response
+
+    async def acall(self, prompt: str, prefix: Optional[str] = None) -> str:
+        """
+        异步对冲调用：先到的有效响应胜出，另一路立即取消（断开连接）
+
+        Args:
+            prompt: 输入提示词
+            prefix: 静态前缀
+
+        Returns:
+            LLM响应文本
+
+        Raises:
+            LLMAPIError: 两路均失败（抛出主部署的错误）
+        """
+        started = time.perf_counter()
+        delay = self.hedge_delay()
+        tasks = {asyncio.ensure_future(self._atimed_primary(prompt, prefix, started)): PRIMARY}
+        hedged = False
+        errors: Dict[str, Exception] = {}
+
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            while tasks:
+                for task in done:
+                    path = tasks.pop(task)
+                    try:
+                        response = self._check(task.result(), path)
+                    except Exception as e:
+                        errors[path] = e
+                        continue
+                    if tasks and path == SECONDARY:
+                        self._observe(time.perf_counter() - started)
+                    self._finish(path, hedged, delay, started)
+                    return response
+                if not hedged:
+                    hedged = True
+                    tasks[asyncio.ensure_future(self.secondary.acall(prompt, prefix))] = SECONDARY
+                if tasks:
+                    done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            # 胜出或被外层取消时，取消仍在进行的一路
+            for task in tasks:
+                task.cancel()
+
+        raise errors.get(PRIMARY) or errors[SECONDARY]
+
+    async def _atimed_primary(self, prompt: str, prefix: Optional[str], started: float) -> str:
+        response = await self.primary.acall(prompt, prefix)
+        self._observe(time.perf_counter() - started)
+        return response
+
+    def stream(self, prompt: str, prefix: Optional[str] = None) -> Iterator[str]:
+        """
+        流式对冲调用：主部署的首个片段超过对冲延迟未到或失败时发出备用请求，
+        先产出首个片段的一路胜出，落败的一路被关闭
+
+        选定一路之后的错误直接抛给调用方，不再切换部署。
+
+        Args:
+            prompt: 输入提示词
+            prefix: 静态前缀
+
+        Returns:
+            响应文本片段的迭代器
+
+        Raises:
+            LLMAPIError: 两路均未产出首个片段（抛出主部署的错误）
+        """
+        started = time.perf_counter()
+        delay = self.hedge_delay(first_chunk=True)
+        primary = self.primary.stream(prompt, prefix)
+        futures = {self._pool.submit(self._first_chunk, primary, PRIMARY, started): (PRIMARY, primary)}
+        done, _ = wait(futures, timeout=delay)
+        hedged = False
+        errors: Dict[str, Exception] = {}
+        winner = None
+
+        try:
+            while futures and winner is None:
+                for future in done:
+                    path, chunks = futures.pop(future)
+                    try:
+                        winner = (path, chunks, future.result())
+                    except Exception as e:
+                        errors[path] = e
+                        continue
+                    break
+                if winner is None and not hedged:
+                    hedged = True
+                    secondary = self.secondary.stream(prompt, prefix)
+                    futures[self._pool.submit(self._first_chunk, secondary, SECONDARY, started)] = \
+                        (SECONDARY, secondary)
+                if winner is None and futures:
+                    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+        finally:
+            # 落败的一路可能仍在等待首个片段，同步生成器只能在其完成后关闭
+            for future, (_, chunks) in futures.items():
+                future.add_done_callback(lambda _, chunks=chunks: chunks.close())
+
+        if winner is None:
+            raise errors.get(PRIMARY) or errors[SECONDARY]
+        path, chunks, first = winner
+        if futures and path == SECONDARY:
+            self._observe(time.perf_counter() - started, first_chunk=True)
+        self._finish(path, hedged, delay, started)
+        try:
+            yield first
+            yield from chunks
+        finally:
+            chunks.close()
+
+    def _first_chunk(self, chunks: Iterator[str], path: str, started: float) -> str:
+        """读取一路的首个非空片段（主部署同时记录首片段延迟）"""
+        for chunk in chunks:
+            if chunk:
+                if path == PRIMARY:
+                    self._observe(time.perf_counter() - started, first_chunk=True)
+                return chunk
+        raise LLMAPIError(f"{self.provider} {path}部署返回空响应", provider=self.provider)
+
+    async def astream(self, prompt: str, prefix: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        异步流式对冲调用：先产出首个片段的一路胜出，另一路立即取消（断开连接）
+
+        选定一路之后的错误直接抛给调用方，不再切换部署。
+
+        Args:
+            prompt: 输入提示词
+            prefix: 静态前缀
+
+        Returns:
+            响应文本片段的异步迭代器
+
+        Raises:
+            LLMAPIError: 两路均未产出首个片段（抛出主部署的错误）
+        """
+        started = time.perf_counter()
+        delay = self.hedge_delay(first_chunk=True)
+        primary = self.primary.astream(prompt, prefix)
+        tasks = {asyncio.ensure_future(self._afirst_chunk(primary, PRIMARY, started)): (PRIMARY, primary)}
+        hedged = False
+        errors: Dict[str, Exception] = {}
+        winner = None
+
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            while tasks and winner is None:
+                for task in done:
+                    path, chunks = tasks.pop(task)
+                    try:
+                        winner = (path, chunks, task.result())
+                    except Exception as e:
+                        errors[path] = e
+                        continue
+                    break
+                if winner is None and not hedged:
+                    hedged = True
+                    secondary = self.secondary.astream(prompt, prefix)
+                    tasks[asyncio.ensure_future(self._afirst_chunk(secondary, SECONDARY, started))] = \
+                        (SECONDARY, secondary)
+                if winner is None and tasks:
+                    done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            # 取消仍在等待首个片段的一路；已产出首片段但落败的一路显式关闭
+            for task, (_, chunks) in tasks.items():
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled() and task.exception() is None:
+                    await chunks.aclose()
+
+        if winner is None:
+            raise errors.get(PRIMARY) or errors[SECONDARY]
+        path, chunks, first = winner
+        if tasks and path == SECONDARY:
+            self._observe(time.perf_counter() - started, first_chunk=True)
+        self._finish(path, hedged, delay, started)
+        try:
+            yield first
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            await chunks.aclose()
+
+    async def _afirst_chunk(self, chunks: AsyncIterator[str], path: str, started: float) -> str:
+        """异步读取一路的首个非空片段（主部署同时记录首片段延迟）"""
+        async for chunk in chunks:
+            if chunk:
+                if path == PRIMARY:
+                    self._observe(time.perf_counter() - started, first_chunk=True)
+                return chunk
+        raise LLMAPIError(f"{self.provider} {path}部署返回空响应", provider=self.provider)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取对冲统计
+
+        Returns:
+            {calls, hedged, secondary_wins, hedge_delay, stream_hedge_delay}
+        """
+        return {
+            'calls': self.calls,
+            'hedged': self.hedged,
+            'secondary_wins': self.secondary_wins,
+            'hedge_delay': self.hedge_delay(),
+            'stream_hedge_delay': self.hedge_delay(first_chunk=True),
+        }
+
+    def warm_up(self) -> bool:
+        """预热两路部署的连接池"""
+        primary_ok = self.primary.warm_up()
+        return self.secondary.warm_up() and primary_ok
+
+    async def awarm_up(self) -> bool:
+        """并发预热两路部署的异步连接池"""
+        results = await asyncio.gather(self.primary.awarm_up(), self.secondary.awarm_up())
+        return all(results)
+
+    async def aclose(self):
+        """关闭两路部署的连接池"""
+        await self.primary.aclose()
+        await self.secondary.aclose()
+        self._pool.shutdown(wait=False)
+
+    def get_sampling_params(self) -> Dict[str, Any]:
+        """获取主部署的请求参数"""
+        return self.primary.get_sampling_params()
+
+    def get_model_name(self) -> str:
+        """获取模型名称（主部署）"""
+        return self.primary.get_model_name()
@@ -5,13 +5,124 @@ LLM适配器基类
 定义统一的LLM接口规范
 """
 
+import asyncio
+import contextvars
+import functools
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Iterator, AsyncIterator
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+# 单次请求超时（秒），与README的8s决策超时一致
+DEFAULT_LLM_TIMEOUT = 8.0
+# 连接池：长连接复用，避免每个周期重新TLS握手
+DEFAULT_MAX_CONNECTIONS = 20
+DEFAULT_MAX_KEEPALIVE = 10
+# 决策周期为5分钟，空闲连接需保活超过一个周期
+DEFAULT_KEEPALIVE_EXPIRY = 330.0
+
+SYSTEM_PROMPT = "你是一个专业的量化交易分析师，请根据市场数据给出交易决策。"
+
+
+# 本次调用的路由信息（对冲适配器记录走了主/备哪一路，缓存适配器记录命中），
+# 按上下文（线程/异步任务）隔离：同一适配器上并发的多次调用互不覆盖
+_CALL_INFO: 'contextvars.ContextVar[Optional[Dict[str, Any]]]' = contextvars.ContextVar(
+    'llm_call_info', default=None)
+
+
+def set_call_info(info: Optional[Dict[str, Any]]):
+    """记录当前上下文中本次调用的路由信息（由适配器在调用返回前设置）"""
+    _CALL_INFO.set(info)
+
+
+def get_call_info() -> Optional[Dict[str, Any]]:
+    """
+    获取当前上下文中最近一次调用的路由信息
+
+    Returns:
+        {path, ...}，未经对冲/缓存适配器时为None
+    """
+    return _CALL_INFO.get()
+
+
+class LLMAPIError(Exception):
+    """LLM API调用失败"""
+
+    def __init__(self, message: str, provider: str = "", status_code: Optional[int] = None,
+                 retryable: bool = True, retry_after: Optional[float] = None):
+        """
+        初始化异常
+        
+        Args:
+            message: 错误信息
+            provider: 服务商名称
+            status_code: HTTP状态码，连接错误/超时为None
+            retryable: 是否值得重试（限流、超时、5xx）
+            retry_after: 服务端建议的重试等待（秒）
+        """
+        super().__init__(message)
+        self.provider = provider
+        self.status_code = status_code
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+    @classmethod
+    def from_exception(cls, provider: str, error: Exception) -> 'LLMAPIError':
+        """
+        将SDK异常转换为LLMAPIError
+
+        Args:
+            provider: 服务商名称
+            error: SDK抛出的异常
+
+        Returns:
+            LLMAPIError实例
+        """
+        status_code = getattr(error, 'status_code', None)
+        retryable = status_code is None or status_code == 429 or status_code >= 500
+        retry_after = None
+        response = getattr(error, 'response', None)
+        headers = getattr(response, 'headers', None)
+        if headers is not None:
+            try:
+                retry_after = float(headers.get('retry-after'))
+            except (TypeError, ValueError):
+                retry_after = None
+        return cls(f"{provider} API调用失败: {error}", provider=provider, status_code=status_code,
+                   retryable=retryable, retry_after=retry_after)
+
+
+def build_http_limits(max_connections: int = DEFAULT_MAX_CONNECTIONS,
+                      max_keepalive: int = DEFAULT_MAX_KEEPALIVE,
+                      keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY):
+    """
+    构建HTTP连接池限制
+
+    Args:
+        max_connections: 最大连接数
+        max_keepalive: 最大保活连接数
+        keepalive_expiry: 空闲连接保活时间（秒）
+
+    Returns:
+        httpx.Limits实例；httpx不可用时返回None（使用SDK默认连接池）
+    """
+    if httpx is None:
+        return None
+    return httpx.Limits(max_connections=max_connections,
+                        max_keepalive_connections=max_keepalive,
+                        keepalive_expiry=keepalive_expiry)
 
 
 class LLMAdapter(ABC):
     """LLM适配器基类"""
     
+    # 服务商名称，同一服务商+API密钥共享限流与熔断状态
+    provider = "generic"
+    
     def __init__(self, api_key: str):
         """
         初始化LLM适配器
@@ -22,18 +133,103 @@ class LLMAdapter(ABC):
         self.api_key = api_key
     
     @abstractmethod
-    def call(self, prompt: str) -> str:
+    def call(self, prompt: str, prefix: Optional[str] = None) -> str:
         """
         调用LLM API
         
         Args:
-            prompt: 输入提示词
+            prompt: 输入提示词（给出prefix时为前缀之后的可变部分）
+            prefix: 跨调用不变的静态前缀（指令与schema），完整提示词为prefix + prompt；
+                    应放在请求最前面，以便服务端提示词缓存复用
             
         Returns:
             LLM响应文本
+            
+        Raises:
+            LLMAPIError: API调用失败
         """
         pass
     
+    async def acall(self, prompt: str, prefix: Optional[str] = None) -> str:
+        """
+        异步调用LLM API
+        
+        默认在线程池中执行同步的call，子类应使用原生异步客户端覆盖此方法
+        
+        Args:
+            prompt: 输入提示词（给出prefix时为前缀之后的可变部分）
+            prefix: 静态前缀，见call
+            
+        Returns:
+            LLM响应文本
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(self.call, prompt, prefix))
+    
+    def stream(self, prompt: str, prefix: Optional[str] = None) -> Iterator[str]:
+        """
+        流式调用LLM API
+        
+        默认一次性返回call的完整结果；支持流式输出的子类应覆盖此方法。
+        调用方可随时close()生成器以提前终止请求。
+        
+        Args:
+            prompt: 输入提示词
+            prefix: 静态前缀，见call
+            
+        Returns:
+            响应文本片段的迭代器
+        """
+        yield self.call(prompt, prefix)
+    
+    async def astream(self, prompt: str, prefix: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        异步流式调用LLM API
+        
+        默认一次性返回acall的完整结果；调用方可随时aclose()以提前终止请求。
+        
+        Args:
+            prompt: 输入提示词
+            prefix: 静态前缀，见call
+            
+        Returns:
+            响应文本片段的异步迭代器
+        """
+        yield await self.acall(prompt, prefix)
+    
+    def warm_up(self) -> bool:
+        """
+        预热同步连接池（建立TCP/TLS连接），在首个tick之前调用
+        
+        默认无操作；持有常驻客户端的子类应发起一次轻量请求
+        
+        Returns:
+            是否预热成功
+        """
+        return True
+    
+    async def awarm_up(self) -> bool:
+        """
+        预热异步连接池，须在实际使用该客户端的事件循环上调用
+        
+        Returns:
+            是否预热成功
+        """
+        return True
+    
+    async def aclose(self):
+        """释放异步客户端持有的连接池"""
+        pass
+    
+    def get_sampling_params(self) -> Dict[str, Any]:
+        """
+        获取影响输出的请求参数（模型版本、温度、最大token数等）
+        
+        Returns:
+            参数字典，用作响应缓存键的一部分
+        """
+        return {}
+    
     @abstractmethod
     def get_model_name(self) -> str:
         """
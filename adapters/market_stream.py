@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式行情适配器
+订阅websocket行情推送，按代币写入固定大小的环形缓冲区
+"""
+
+import json
+import socket
+import socketserver
+import threading
+import time
+from array import array
+from typing import Dict, List, Any, Optional, Iterable
+
+try:
+    import websocket
+except ImportError:
+    print("❌ 请安装websocket-client: pip install websocket-client")
+    websocket = None
+
+
+# Bitget现货公共行情推送
+BITGET_WS_URL = "wss://ws.bitget.com/v2/ws/public"
+# 每个代币保留的tick数量
+DEFAULT_RING_CAPACITY = 4096
+# Bitget要求30秒内至少发送一次ping
+PING_INTERVAL = 25.0
+RECONNECT_DELAY = 1.0
+MAX_RECONNECT_DELAY = 30.0
+
+_RECV_TIMEOUT_ERRORS = (socket.timeout, TimeoutError)
+if websocket is not None:
+    _RECV_TIMEOUT_ERRORS += (websocket.WebSocketTimeoutException,)
+
+
+class TickRingBuffer:
+    """
+    单个代币的tick环形缓冲区
+
+    按列存储在预分配的array中（ts/bid/ask/last），只有一个写线程。
+    读者通过序号校验（seqlock）读取最新tick，或直接拿到各列的memoryview做零拷贝快照。
+    """
+
+    COLUMNS = ('ts', 'bid', 'ask', 'last')
+
+    def __init__(self, capacity: int = DEFAULT_RING_CAPACITY):
+        """
+        初始化环形缓冲区
+
+        Args:
+            capacity: 缓冲区容量（tick数）
+        """
+        self.capacity = capacity
+        self.ts = array('d', bytes(8 * capacity))
+        self.bid = array('d', bytes(8 * capacity))
+        self.ask = array('d', bytes(8 * capacity))
+        self.last = array('d', bytes(8 * capacity))
+        # 累计写入数；_seq为奇数表示正在写入
+        self.count = 0
+        self._seq = 0
+
+    def append(self, ts: float, bid: float, ask: float, last: float):
+        """
+        写入一个tick（仅限写线程调用）
+
+        Args:
+            ts: 行情时间戳（秒）
+            bid: 买一价
+            ask: 卖一价
+            last: 最新成交价
+        """
+        self._seq += 1
+        index = self.count % self.capacity
+        self.ts[index] = ts
+        self.bid[index] = bid
+        self.ask[index] = ask
+        self.last[index] = last
+        self.count += 1
+        self._seq += 1
+
+    def latest(self) -> Optional[tuple]:
+        """
+        读取最新tick
+
+        Returns:
+            (ts, bid, ask, last)，尚无数据时返回None
+        """
+        while True:
+            seq = self._seq
+            if not seq & 1:
+                count = self.count
+                if count == 0:
+                    return None
+                index = (count - 1) % self.capacity
+                tick = (self.ts[index], self.bid[index], self.ask[index], self.last[index])
+                if self._seq == seq:
+                    return tick
+            # 写入进行中：释放GIL让写线程完成，而不是空转到切换间隔
+            time.sleep(0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        零拷贝快照
+
+        返回各列的memoryview及逻辑起点；第i个（按时间从旧到新）tick位于
+        (start + i) % capacity。视图与写线程共享内存，需要稳定副本时请自行复制。
+
+        Returns:
+            {ts, bid, ask, last: memoryview, start, size, count}
+        """
+        count = self.count
+        size = min(count, self.capacity)
+        return {
+            'ts': memoryview(self.ts),
+            'bid': memoryview(self.bid),
+            'ask': memoryview(self.ask),
+            'last': memoryview(self.last),
+            'start': (count - size) % self.capacity,
+            'size': size,
+            'count': count,
+        }
+
+
+class _LineConnection:
+    """按行分帧的TCP连接，接口与websocket-client的连接一致（send/recv/close）"""
+
+    def __init__(self, host: str, port: int, timeout: float):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.reader = self.sock.makefile('r', encoding='utf-8')
+
+    def settimeout(self, timeout: float):
+        self.sock.settimeout(timeout)
+
+    def send(self, message: str):
+        self.sock.sendall((message + "\n").encode('utf-8'))
+
+    def recv(self) -> str:
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError("连接已关闭")
+        return line.rstrip("\n")
+
+    def close(self):
+        try:
+            self.reader.close()
+        finally:
+            self.sock.close()
+
+
+class MarketStream:
+    """流式行情订阅器"""
+
+    def __init__(self, symbols: List[str], url: str = BITGET_WS_URL,
+                 capacity: int = DEFAULT_RING_CAPACITY):
+        """
+        初始化流式行情订阅器
+
+        Args:
+            symbols: 订阅的代币列表
+            url: 行情地址；wss://为websocket，tcp://host:port为本地回放服务器
+            capacity: 每个代币的环形缓冲区容量
+        """
+        self.symbols = list(symbols)
+        self.url = url
+        self.buffers = {symbol: TickRingBuffer(capacity) for symbol in self.symbols}
+        self.connected = False
+        self.messages = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._conn = None
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """
+        注册tick回调（在订阅线程中调用）
+
+        Args:
+            callback: callback(symbol, ts, last)
+        """
+        self._listeners.append(callback)
+
+    def start(self):
+        """在后台线程中启动订阅"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="market-stream", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止订阅"""
+        self._stop.set()
+        conn = self._conn
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+        if self._thread:
+            self._thread.join(timeout=2.0)
+
+    def latest(self, symbol: str) -> Optional[tuple]:
+        """
+        获取指定代币的最新tick
+
+        Returns:
+            (ts, bid, ask, last)，无数据时返回None
+        """
+        buffer = self.buffers.get(symbol)
+        return buffer.latest() if buffer else None
+
+    def get_ticker(self, symbol: str) -> Optional[Dict[str, float]]:
+        """
+        获取实时盘口摘要
+
+        Returns:
+            {ts, bid, ask, mid, spread_bp, last}，无数据时返回None
+        """
+        tick = self.latest(symbol)
+        if tick is None:
+            return None
+        ts, bid, ask, last = tick
+        mid = (bid + ask) / 2 if bid > 0 and ask > 0 else last
+        spread_bp = (ask - bid) / mid * 10000 if bid > 0 and ask > 0 and mid > 0 else 0.0
+        return {'ts': ts, 'bid': bid, 'ask': ask, 'mid': mid, 'spread_bp': spread_bp, 'last': last}
+
+    def snapshot_prices(self, symbols: List[str], max_age: float) -> Optional[Dict[str, Any]]:
+        """
+        由缓冲区生成价格快照，格式与ExchangeAPI.get_snapshot一致
+
+        Args:
+            symbols: 代币列表
+            max_age: 最旧tick允许的年龄（秒）
+
+        Returns:
+            快照字典；任一代币缺数据或数据过旧时返回None
+        """
+        if not self.connected:
+            return None
+
+        prices = {}
+        stamps = []
+        now = time.time()
+        for symbol in symbols:
+            tick = self.latest(symbol)
+            if tick is None or now - tick[0] > max_age:
+                return None
+            prices[symbol] = tick[3]
+            stamps.append(tick[0])
+
+        return {
+            'prices': prices,
+            'timestamp': min(stamps),
+            'skew_ms': (max(stamps) - min(stamps)) * 1000.0,
+            'source': 'stream',
+        }
+
+    def _connect(self):
+        """建立连接并发送订阅请求"""
+        if self.url.startswith('tcp://'):
+            host, port = self.url[len('tcp://'):].rsplit(':', 1)
+            conn = _LineConnection(host, int(port), timeout=PING_INTERVAL)
+        else:
+            if websocket is None:
+                raise ImportError("websocket-client库未安装")
+            conn = websocket.create_connection(self.url, timeout=PING_INTERVAL)
+
+        conn.send(json.dumps({
+            'op': 'subscribe',
+            'args': [{'instType': 'SPOT', 'channel': 'ticker', 'instId': symbol}
+                     for symbol in self.symbols],
+        }))
+        return conn
+
+    def _run(self):
+        """订阅主循环：断线后指数退避重连"""
+        delay = RECONNECT_DELAY
+        while not self._stop.is_set():
+            try:
+                self._conn = self._connect()
+                self.connected = True
+                delay = RECONNECT_DELAY
+                print(f"✅ 行情流已连接: {self.url}")
+                self._consume(self._conn)
+            except Exception as e:
+                if not self._stop.is_set():
+                    print(f"⚠️ 行情流断开，{delay:.0f}s后重连: {e}")
+            finally:
+                self.connected = False
+                if self._conn is not None:
+                    try:
+                        self._conn.close()
+                    except Exception:
+                        pass
+                    self._conn = None
+
+            self._stop.wait(delay)
+            delay = min(delay * 2, MAX_RECONNECT_DELAY)
+
+    def _consume(self, conn):
+        """持续读取推送并写入缓冲区"""
+        last_ping = time.monotonic()
+        while not self._stop.is_set():
+            if time.monotonic() - last_ping > PING_INTERVAL:
+                conn.send('ping')
+                last_ping = time.monotonic()
+
+            try:
+                message = conn.recv()
+            except _RECV_TIMEOUT_ERRORS:
+                continue
+            if not message or message == 'pong':
+                continue
+            self.on_message(message)
+
+    def on_message(self, message: str):
+        """
+        处理一条行情推送（Bitget ticker格式）
+
+        Args:
+            message: JSON文本
+        """
+        try:
+            payload = json.loads(message)
+        except ValueError:
+            return
+
+        arg = payload.get('arg') or {}
+        if arg.get('channel') != 'ticker':
+            return
+
+        for item in payload.get('data', []):
+            symbol = item.get('instId')
+            buffer = self.buffers.get(symbol)
+            if buffer is None:
+                continue
+            try:
+                ts = int(item['ts']) / 1000.0
+                last = float(item['lastPr'])
+                buffer.append(ts,
+                              float(item.get('bidPr') or 0.0),
+                              float(item.get('askPr') or 0.0),
+                              last)
+            except (KeyError, ValueError):
+                continue
+            for listener in self._listeners:
+                listener(symbol, ts, last)
+        self.messages += 1
+
+
+class ReplayServer:
+    """
+    本地行情回放服务器
+
+    以按行分帧的TCP协议回放录制的行情推送，供MarketStream以tcp://地址连接，
+    在离线调试与测试中代替交易所websocket。
+    """
+
+    def __init__(self, messages: Iterable[str], host: str = '127.0.0.1', port: int = 0,
+                 speed: float = 1.0, loop: bool = False):
+        """
+        初始化回放服务器
+
+        Args:
+            messages: 录制的推送消息（JSON文本，按时间顺序）
+            host: 监听地址
+            port: 监听端口，0表示自动分配
+            speed: 回放倍速，0表示不等待、尽快发送
+            loop: 是否循环回放（时间戳随轮次平移）
+        """
+        self.messages = list(messages)
+        self.speed = speed
+        self.loop = loop
+        server = self
+
+        class _Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                # 第一行为订阅请求，回放时按订阅的代币过滤
+                line = self.rfile.readline()
+                try:
+                    args = json.loads(line).get('args', [])
+                    wanted = {arg.get('instId') for arg in args}
+                except ValueError:
+                    wanted = set()
+                try:
+                    server._replay(self.wfile, wanted)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+        self._server = socketserver.ThreadingTCPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> 'ReplayServer':
+        """从JSONL录制文件创建回放服务器"""
+        with open(path, 'r', encoding='utf-8') as f:
+            messages = [line.rstrip("\n") for line in f if line.strip()]
+        return cls(messages, **kwargs)
+
+    @property
+    def url(self) -> str:
+        """供MarketStream连接的地址"""
+        host, port = self._server.server_address[:2]
+        return f"tcp://{host}:{port}"
+
+    def start(self):
+        """在后台线程中启动服务"""
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name="replay-server", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止服务"""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _replay(self, wfile, wanted: set):
+        """按原始时间间隔发送消息"""
+        shift_ms = 0
+        while True:
+            first_ts = None
+            started = time.monotonic()
+            last_ts = 0
+            for message in self.messages:
+                payload = json.loads(message)
+                data = [item for item in payload.get('data', [])
+                        if not wanted or item.get('instId') in wanted]
+                if not data:
+                    continue
+
+                ts = int(data[0]['ts'])
+                if first_ts is None:
+                    first_ts = ts
+                last_ts = ts
+                if self.speed > 0:
+                    delay = (ts - first_ts) / 1000.0 / self.speed - (time.monotonic() - started)
+                    if delay > 0:
+                        time.sleep(delay)
+
+                for item in data:
+                    item['ts'] = str(int(item['ts']) + shift_ms)
+                payload['data'] = data
+                wfile.write((json.dumps(payload) + "\n").encode('utf-8'))
+                wfile.flush()
+
+            if not self.loop or first_ts is None:
+                return
+            shift_ms += last_ts - first_ts + 1
@@ -6,8 +6,12 @@ OpenAI适配器
 """
 
 import os
-from typing import Dict, Any
-from .llm_base import LLMAdapter
+from typing import Dict, Any, Optional, Iterator, AsyncIterator
+from .llm_base import (
+    LLMAdapter, build_http_limits,
+    DEFAULT_LLM_TIMEOUT, DEFAULT_MAX_CONNECTIONS, DEFAULT_MAX_KEEPALIVE, SYSTEM_PROMPT,
+    LLMAPIError,
+)
 
 try:
     import openai
@@ -19,12 +23,25 @@ except ImportError:
 class OpenAIAdapter(LLMAdapter):
     """OpenAI适配器"""
     
-    def __init__(self, api_key: str = None):
+    provider = "openai"
+    
+    def __init__(self, api_key: str = None, timeout: float = DEFAULT_LLM_TIMEOUT,
+                 max_connections: int = DEFAULT_MAX_CONNECTIONS,
+                 max_keepalive: int = DEFAULT_MAX_KEEPALIVE,
+                 model: str = "gpt-4", base_url: Optional[str] = None,
+                 display_name: str = "GPT-4", provider: Optional[str] = None):
         """
         初始化OpenAI适配器
         
         Args:
             api_key: OpenAI API密钥，如果为None则从环境变量获取
+            timeout: 单次请求超时（秒）
+            max_connections: 连接池最大连接数
+            max_keepalive: 连接池最大保活连接数
+            model: 模型版本
+            base_url: API地址，指向OpenAI兼容服务（DeepSeek、通义千问等）时使用
+            display_name: 显示用的模型名称
+            provider: 服务商名称（决定共享的限流与熔断状态），默认openai
         """
         if api_key is None:
             api_key = os.getenv('OPENAI_API_KEY')
@@ -34,39 +51,150 @@ class OpenAIAdapter(LLMAdapter):
         
         super().__init__(api_key)
         
-        # 初始化OpenAI客户端
-        if openai:
-            openai.api_key = self.api_key
-        else:
+        if not openai:
             raise ImportError("OpenAI库未安装")
+        
+        self.model = model
+        self.display_name = display_name
+        if provider:
+            self.provider = provider
+        self.timeout = timeout
+        
+        # 常驻客户端：同步/异步各持有一个长连接池，重试交由上层处理
+        limits = build_http_limits(max_connections, max_keepalive)
+        sync_http = openai.DefaultHttpxClient(limits=limits) if limits else None
+        async_http = openai.DefaultAsyncHttpxClient(limits=limits) if limits else None
+        self.client = openai.OpenAI(api_key=self.api_key, base_url=base_url, timeout=timeout,
+                                    max_retries=0, http_client=sync_http)
+        self.async_client = openai.AsyncOpenAI(api_key=self.api_key, base_url=base_url, timeout=timeout,
+                                               max_retries=0, http_client=async_http)
     
-    def call(self, prompt: str) -> str:
+    def get_sampling_params(self) -> Dict[str, Any]:
+        """获取影响输出的请求参数"""
+        return {"model": self.model, "max_tokens": 500, "temperature": 0.7}
+    
+    def _build_request(self, prompt: str, prefix: Optional[str] = None) -> Dict[str, Any]:
+        """构建请求参数（静态前缀在最前，OpenAI自动缓存相同前缀）"""
+        system = SYSTEM_PROMPT + (prefix or "")
+        return {
+            **self.get_sampling_params(),
+            "messages": [
+                {"role": "system", "content": system},
+                {"role": "user", "content": prompt}
+            ],
+        }
+    
+    def call(self, prompt: str, prefix: Optional[str] = None) -> str:
         """
         调用OpenAI API
         
         Args:
             prompt: 输入提示词
+            prefix: 静态前缀，放入system消息以命中服务端提示词缓存
             
         Returns:
             OpenAI响应文本
+        
+        Raises:
+            LLMAPIError: API调用失败
         """
         try:
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "你是一个专业的量化交易分析师，请根据市场数据给出交易决策。"},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=500,
-                temperature=0.7
-            )
+            response = self.client.chat.completions.create(**self._build_request(prompt, prefix))
+            return response.choices[0].message.content.strip()
+            
+        except Exception as e:
+            raise LLMAPIError.from_exception(self.provider, e) from e
+    
+    async def acall(self, prompt: str, prefix: Optional[str] = None) -> str:
+        """
+        异步调用OpenAI API（复用常驻异步连接池）
+        
+        Args:
+            prompt: 输入提示词
+            prefix: 静态前缀，放入system消息以命中服务端提示词缓存
             
+        Returns:
+            OpenAI响应文本
+        
+        Raises:
+            LLMAPIError: API调用失败
+        """
+        try:
+            response = await self.async_client.chat.completions.create(**self._build_request(prompt, prefix))
             return response.choices[0].message.content.strip()
             
         except Exception as e:
-            print(f"❌ OpenAI API调用失败: {e}")
-            return '{"symbol": null, "action": "HOLD", "confidence": 0.0, "rationale": "API调用失败"}'
+            raise LLMAPIError.from_exception(self.provider, e) from e
+    
+    def stream(self, prompt: str, prefix: Optional[str] = None) -> Iterator[str]:
+        """
+        流式调用OpenAI API，关闭生成器即断开连接、停止生成
+        
+        Args:
+            prompt: 输入提示词
+            prefix: 静态前缀
+            
+        Returns:
+            响应文本片段的迭代器
+        
+        Raises:
+            LLMAPIError: API调用失败
+        """
+        try:
+            with self.client.chat.completions.create(**self._build_request(prompt, prefix),
+                                                     stream=True) as response:
+                for chunk in response:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+        except Exception as e:
+            raise LLMAPIError.from_exception(self.provider, e) from e
+    
+    async def astream(self, prompt: str, prefix: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        异步流式调用OpenAI API，aclose()即断开连接、停止生成
+        
+        Args:
+            prompt: 输入提示词
+            prefix: 静态前缀
+            
+        Returns:
+            响应文本片段的异步迭代器
+        
+        Raises:
+            LLMAPIError: API调用失败
+        """
+        try:
+            response = await self.async_client.chat.completions.create(
+                **self._build_request(prompt, prefix), stream=True)
+            async with response:
+                async for chunk in response:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+        except Exception as e:
+            raise LLMAPIError.from_exception(self.provider, e) from e
+    
+    def warm_up(self) -> bool:
+        """预热同步连接池：列出模型（不消耗token），失败不影响后续调用"""
+        try:
+            self.client.models.list()
+            return True
+        except Exception as e:
+            print(f"⚠️ {self.get_model_name()}连接预热失败: {e}")
+            return False
+    
+    async def awarm_up(self) -> bool:
+        """预热异步连接池"""
+        try:
+            await self.async_client.models.list()
+            return True
+        except Exception as e:
+            print(f"⚠️ {self.get_model_name()}异步连接预热失败: {e}")
+            return False
+    
+    async def aclose(self):
+        """关闭异步客户端连接池"""
+        await self.async_client.close()
     
     def get_model_name(self) -> str:
         """获取模型名称"""
-        return "GPT-4"
+        return self.display_name
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+模型注册表
+按配置登记各模型的适配器类与参数；适配器模块（及其SDK）只在该模型启用时才导入，
+所有启用的模型并行构建并预热连接池，冷启动各阶段耗时逐模型记录
+"""
+
+import importlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Callable
+
+from adapters.llm_base import LLMAdapter
+
+
+# 内置模型：显示名称 -> {adapter: "模块:类", api_key_env: 密钥环境变量, options: 构造参数}
+# OpenAI兼容的服务只需配置base_url与model，无需新增适配器类；
+# 可选的secondary（格式同上）为对冲请求的备用部署，hedge为HedgedLLMAdapter的参数
+DEFAULT_MODELS: Dict[str, Dict[str, Any]] = {
+    'OpenAI': {
+        'adapter': "adapters.openai_adapter:OpenAIAdapter",
+        'api_key_env': "OPENAI_API_KEY",
+    },
+    'Claude': {
+        'adapter': "adapters.claude_adapter:ClaudeAdapter",
+        'api_key_env': "ANTHROPIC_API_KEY",
+    },
+    'DeepSeek': {
+        'adapter': "adapters.openai_adapter:OpenAIAdapter",
+        'api_key_env': "DEEPSEEK_API_KEY",
+        'options': {'base_url': "https://api.deepseek.com", 'model': "deepseek-chat",
+                    'display_name': "DeepSeek-Chat", 'provider': "deepseek"},
+    },
+    'Qwen': {
+        'adapter': "adapters.openai_adapter:OpenAIAdapter",
+        'api_key_env': "DASHSCOPE_API_KEY",
+        'options': {'base_url': "https://dashscope.aliyuncs.com/compatible-mode/v1",
+                    'model': "qwen-plus", 'display_name': "Qwen-Plus", 'provider': "qwen"},
+    },
+}
+
+# 并行构建的最大线程数
+MAX_BUILD_WORKERS = 8
+
+
+class ModelRegistry:
+    """模型注册表"""
+
+    def __init__(self, specs: Optional[Dict[str, Dict[str, Any]]] = None,
+                 enabled: Optional[List[str]] = None):
+        """
+        初始化注册表
+
+        Args:
+            specs: {显示名称: 模型配置}，默认为DEFAULT_MODELS
+            enabled: 启用的模型列表，None表示所有设置了API密钥的模型
+        """
+        self.specs = dict(DEFAULT_MODELS if specs is None else specs)
+        self.enabled = enabled
+        self._classes: Dict[str, type] = {}
+        self.cold_start: Dict[str, Dict[str, float]] = {}
+        self.cold_start_seconds = 0.0
+
+    @classmethod
+    def from_env(cls) -> 'ModelRegistry':
+        """
+        按环境变量构建注册表
+
+        ARENA_MODELS_FILE: JSON文件，{显示名称: 模型配置}，与内置模型合并（同名覆盖）
+        ARENA_MODELS: 逗号分隔的启用模型列表
+
+        Returns:
+            ModelRegistry实例
+        """
+        specs = dict(DEFAULT_MODELS)
+        models_file = os.getenv('ARENA_MODELS_FILE')
+        if models_file:
+            with open(models_file, 'r', encoding='utf-8') as f:
+                specs.update(json.load(f))
+        enabled = os.getenv('ARENA_MODELS')
+        return cls(specs, [name.strip() for name in enabled.split(',') if name.strip()]
+                   if enabled else None)
+
+    def enabled_models(self) -> List[str]:
+        """
+        获取启用的模型（未显式指定时跳过未设置API密钥的模型，不导入其SDK）
+
+        Returns:
+            显示名称列表
+        """
+        if self.enabled is not None:
+            return [name for name in self.enabled if name in self.specs]
+        return [name for name, spec in self.specs.items()
+                if not spec.get('api_key_env') or os.getenv(spec['api_key_env'])]
+
+    def load_class(self, name: str) -> type:
+        """
+        导入模型的适配器类（首次调用时才导入模块）
+
+        Args:
+            name: 显示名称
+
+        Returns:
+            适配器类
+        """
+        if name not in self.specs:
+            raise ValueError(f"未知模型: {name}")
+        return self._import(self.specs[name]['adapter'])
+
+    def _import(self, path: str) -> type:
+        """按"模块:类"导入适配器类（带缓存）"""
+        adapter_class = self._classes.get(path)
+        if adapter_class is None:
+            module_name, _, attr = path.partition(':')
+            adapter_class = getattr(importlib.import_module(module_name), attr)
+            self._classes[path] = adapter_class
+        return adapter_class
+
+    def _instantiate(self, name: str, spec: Dict[str, Any]) -> LLMAdapter:
+        """按配置构建适配器实例"""
+        options = dict(spec.get('options', {}))
+        key_env = spec.get('api_key_env')
+        if key_env:
+            api_key = os.getenv(key_env)
+            if not api_key:
+                raise ValueError(f"{name} API密钥未设置，请设置{key_env}环境变量")
+            options['api_key'] = api_key
+        return self._import(spec['adapter'])(**options)
+
+    def create_adapter(self, name: str) -> LLMAdapter:
+        """
+        构建模型的（主部署）适配器实例
+
+        Args:
+            name: 显示名称
+
+        Returns:
+            LLMAdapter实例
+        """
+        spec = self.specs.get(name)
+        if spec is None:
+            raise ValueError(f"未知模型: {name}")
+        return self._instantiate(name, spec)
+
+    def create_secondary(self, name: str) -> Optional[LLMAdapter]:
+        """
+        构建模型的备用部署适配器
+
+        Args:
+            name: 显示名称
+
+        Returns:
+            LLMAdapter实例，未配置secondary时返回None
+        """
+        spec = self.specs.get(name)
+        if spec is None:
+            raise ValueError(f"未知模型: {name}")
+        secondary = spec.get('secondary')
+        return self._instantiate(f"{name}备用部署", secondary) if secondary else None
+
+    def hedge_options(self, name: str) -> Dict[str, Any]:
+        """获取模型的对冲参数（HedgedLLMAdapter的构造参数）"""
+        return dict(self.specs.get(name, {}).get('hedge', {}))
+
+    def _build_one(self, name: str, wrap: Callable[..., Any], warm_up: bool):
+        """构建并预热单个模型，记录导入、构造与预热各阶段耗时"""
+        timings = {}
+        started = time.perf_counter()
+        self.load_class(name)
+        secondary = self.specs[name].get('secondary')
+        if secondary:
+            self._import(secondary['adapter'])
+        timings['import'] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        result = wrap(self.create_adapter(name), self.create_secondary(name), self.hedge_options(name))
+        timings['construct'] = time.perf_counter() - started
+
+        timings['warm_up'] = 0.0
+        if warm_up:
+            started = time.perf_counter()
+            adapter = getattr(result, 'llm_adapter', result)
+            adapter.warm_up()
+            timings['warm_up'] = time.perf_counter() - started
+        self.cold_start[name] = timings
+        return result
+
+    def build_all(self, wrap: Callable[..., Any], warm_up: bool = True) -> Dict[str, Any]:
+        """
+        并行构建所有启用的模型
+
+        Args:
+            wrap: 将适配器包装为决策引擎的函数，
+                  参数为(主部署适配器, 备用部署适配器或None, 对冲参数)
+            warm_up: 构建后预热同步连接池；决策走异步连接池时应传False，
+                     改由调度器预热后调用record_warm_up
+
+        Returns:
+            {显示名称: wrap的返回值}，初始化失败的模型不包含在内
+        """
+        names = self.enabled_models()
+        for name, spec in self.specs.items():
+            if name not in names and self.enabled is None:
+                print(f"⏭️ {name}: 未设置{spec.get('api_key_env')}，跳过")
+
+        started = time.perf_counter()
+        results = {}
+        if names:
+            with ThreadPoolExecutor(max_workers=min(MAX_BUILD_WORKERS, len(names)),
+                                    thread_name_prefix="arena-build") as pool:
+                futures = {name: pool.submit(self._build_one, name, wrap, warm_up) for name in names}
+                for name, future in futures.items():
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        print(f"❌ {name}初始化失败: {e}")
+        self.cold_start_seconds = time.perf_counter() - started
+        return results
+
+    def record_warm_up(self, latencies: Dict[str, float]):
+        """
+        记录构建之后单独完成的预热耗时（如决策调度器预热异步连接池），计入冷启动统计
+
+        Args:
+            latencies: {显示名称: 预热耗时（秒）}，各模型并发预热
+        """
+        for name, seconds in latencies.items():
+            if name in self.cold_start:
+                self.cold_start[name]['warm_up'] = seconds
+        if latencies:
+            self.cold_start_seconds += max(latencies.values())
+
+    def format_cold_start(self) -> str:
+        """格式化冷启动耗时用于显示"""
+        lines = [f"   总计: {self.cold_start_seconds * 1000:.0f}ms"]
+        for name, timings in self.cold_start.items():
+            lines.append(f"   {name}: 导入 {timings['import'] * 1000:.0f}ms "
+                         f"构造 {timings['construct'] * 1000:.0f}ms "
+                         f"预热 {timings['warm_up'] * 1000:.0f}ms")
+        return "\n".join(lines)
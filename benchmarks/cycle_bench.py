@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+端到端周期基准
+用交易所桩与LLM桩离线跑完整周期（取价 → 并行决策 → 模拟撮合），
+在(模型数 × 代币数 × 并发竞技场数)网格上报告周期延迟与吞吐
+
+用法：
+    python -m benchmarks.cycle_bench --models 1,2,4 --symbols 5,50 --concurrency 1,4 \\
+        --llm-latency lognormal:0.05,0.5 --llm-failure 0.05 --cycles 20
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, Any
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.stubs import StubExchangeAPI, StubLLMAdapter
+from core.decision import DecisionMaker
+from core.market import MarketData
+from core.orchestrator import Orchestrator
+from core.prompt import PromptRenderer
+from core.tokens import estimate_tokens
+from core.universe import DEFAULT_SYMBOLS, PromptCompressor
+
+
+def make_symbols(count: int) -> List[str]:
+    """生成count个代币符号（前5个为默认币种）"""
+    symbols = DEFAULT_SYMBOLS[:count]
+    symbols += [f"SYM{k:03d}USDT" for k in range(count - len(symbols))]
+    return symbols
+
+
+def quantile(values: List[float], q: float) -> float:
+    """最近秩分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def run_cell(models: int, symbols: int, concurrency: int, args) -> Dict[str, Any]:
+    """
+    运行网格中的一个单元
+
+    Args:
+        models: 每个竞技场的模型数
+        symbols: 代币数
+        concurrency: 并发运行的竞技场数（共享同一个交易所桩）
+        args: 命令行参数
+
+    Returns:
+        {models, symbols, concurrency, cycles, p50_ms, p95_ms, p99_ms, cycles_per_s, decisions_per_s,
+         llm_failures, prompt_tokens}
+    """
+    universe = make_symbols(symbols)
+    exchange = StubExchangeAPI(latency=args.exchange_latency, seed=args.seed)
+
+    arenas = []
+    renderers = []
+    for a in range(concurrency):
+        market_data = MarketData(price_ttl=0, exchange_api=exchange, symbols=universe)
+        renderer = PromptRenderer(universe)
+        if not args.no_compress:
+            renderer.set_compressor(PromptCompressor(market_data.bars, turnover=market_data.get_turnover,
+                                                     token_budget=args.prompt_tokens, top_k=args.top_k))
+        renderers.append(renderer)
+        makers = {}
+        for m in range(models):
+            adapter = StubLLMAdapter(f"Stub-{m}", latency=args.llm_latency,
+                                     failure_rate=args.llm_failure, corpus=args.corpus,
+                                     symbols=universe, seed=args.seed + a * 1000 + m)
+            makers[adapter.get_model_name()] = DecisionMaker(adapter, renderer=renderer,
+                                                             streaming=args.streaming)
+        arenas.append(Orchestrator(market_data, makers, interval=args.interval,
+                                   timeout=args.timeout))
+
+    latencies: List[float] = []
+    lock = threading.Lock()
+
+    def drive(orchestrator: Orchestrator):
+        for k in range(args.cycles):
+            started = time.perf_counter()
+            orchestrator.run_cycle(k * args.interval)
+            elapsed = time.perf_counter() - started
+            orchestrator.cycles += 1
+            with lock:
+                latencies.append(elapsed)
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        started = time.perf_counter()
+        threads = [threading.Thread(target=drive, args=(arena,)) for arena in arenas]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - started
+        for arena in arenas:
+            arena.close()
+
+    failures = sum(maker.llm_adapter.failures for arena in arenas
+                   for maker in arena.decision_makers.values())
+    prompts = [renderer._last_prompt for renderer in renderers if renderer._last_prompt is not None]
+    prompt_tokens = max((estimate_tokens(prompt.market) for prompt in prompts), default=0)
+    total = len(latencies)
+    return {
+        'models': models,
+        'symbols': symbols,
+        'concurrency': concurrency,
+        'cycles': total,
+        'p50_ms': quantile(latencies, 0.50) * 1000,
+        'p95_ms': quantile(latencies, 0.95) * 1000,
+        'p99_ms': quantile(latencies, 0.99) * 1000,
+        'cycles_per_s': total / wall if wall > 0 else 0.0,
+        'decisions_per_s': total * models / wall if wall > 0 else 0.0,
+        'llm_failures': failures,
+        'prompt_tokens': prompt_tokens,
+    }
+
+
+def parse_grid(value: str) -> List[int]:
+    return [int(x) for x in value.split(',') if x]
+
+
+def main():
+    """运行基准网格并输出表格"""
+    parser = argparse.ArgumentParser(description="Alpha Arena 端到端周期基准")
+    parser.add_argument('--models', type=parse_grid, default=[1, 2, 4], help="模型数网格")
+    parser.add_argument('--symbols', type=parse_grid, default=[5, 50], help="代币数网格")
+    parser.add_argument('--concurrency', type=parse_grid, default=[1, 4], help="并发竞技场数网格")
+    parser.add_argument('--cycles', type=int, default=10, help="每个竞技场运行的周期数")
+    parser.add_argument('--llm-latency', default="lognormal:0.05,0.5", help="LLM延迟分布")
+    parser.add_argument('--llm-failure', type=float, default=0.0, help="LLM失败率")
+    parser.add_argument('--exchange-latency', default="const:0.01", help="交易所快照延迟分布")
+    parser.add_argument('--corpus', default=None, help="LLM响应语料jsonl，默认生成合法随机决策")
+    parser.add_argument('--timeout', type=float, default=8.0, help="决策截止时间（秒）")
+    parser.add_argument('--interval', type=int, default=300, help="模拟周期（秒）")
+    parser.add_argument('--streaming', action='store_true', help="使用流式决策路径")
+    parser.add_argument('--prompt-tokens', type=int, default=None, help="行情提示词token预算")
+    parser.add_argument('--top-k', type=int, default=None, help="提示词保留的代币数")
+    parser.add_argument('--no-compress', action='store_true', help="不压缩提示词，逐行列出全部价格")
+    parser.add_argument('--seed', type=int, default=42, help="随机种子")
+    parser.add_argument('--json', default=None, help="将结果写入JSON文件")
+    args = parser.parse_args()
+
+    print(f"LLM延迟 {args.llm_latency}，失败率 {args.llm_failure:.0%}，交易所延迟 {args.exchange_latency}")
+    header = (f"{'模型':>4} {'代币':>5} {'并发':>4} {'周期':>5} {'p50(ms)':>9} {'p95(ms)':>9} "
+              f"{'p99(ms)':>9} {'周期/s':>8} {'决策/s':>8} {'失败':>5} {'提示词token':>8}")
+    print(header)
+    print("-" * len(header))
+
+    results = []
+    for models in args.models:
+        for symbols in args.symbols:
+            for concurrency in args.concurrency:
+                r = run_cell(models, symbols, concurrency, args)
+                results.append(r)
+                print(f"{r['models']:>6} {r['symbols']:>7} {r['concurrency']:>6} {r['cycles']:>7} "
+                      f"{r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} {r['p99_ms']:>9.1f} "
+                      f"{r['cycles_per_s']:>9.2f} {r['decisions_per_s']:>9.2f} {r['llm_failures']:>6} "
+                      f"{r['prompt_tokens']:>11}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': {k: v for k, v in vars(args).items() if k != 'json'},
+                       'results': results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
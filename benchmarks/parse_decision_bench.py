@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+决策解析基准
+在响应语料上对比旧版解析（去除```json后json.loads）与单遍提取+schema校验的
+接受率、误判数与单条耗时
+
+用法：
+    python -m benchmarks.parse_decision_bench [语料.jsonl]
+"""
+
+import json
+import os
+import sys
+import time
+from typing import Dict, Any, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.universe import DEFAULT_SYMBOLS
+from core.schema import DecisionValidator
+
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              "corpus", "decision_responses.jsonl")
+REPEAT = 2000
+
+
+def legacy_parse(response: str) -> Optional[Dict[str, Any]]:
+    """旧版DecisionMaker.parse_decision的提取逻辑"""
+    try:
+        response = response.strip()
+        if response.startswith('```json'):
+            response = response[7:]
+        if response.endswith('```'):
+            response = response[:-3]
+        decision = json.loads(response)
+        for field in ('symbol', 'action', 'confidence', 'rationale'):
+            if field not in decision:
+                return None
+        return decision
+    except Exception:
+        return None
+
+
+def load_corpus(path: str) -> List[Dict[str, Any]]:
+    """读取语料：每行{response, valid}"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def run(path: str = DEFAULT_CORPUS):
+    """运行基准并打印结果"""
+    corpus = load_corpus(path)
+    validator = DecisionValidator(DEFAULT_SYMBOLS)
+
+    parsers = {
+        'legacy': lambda text: legacy_parse(text),
+        'validator': lambda text: validator.parse(text)[0],
+    }
+
+    print(f"📚 语料: {path} ({len(corpus)}条)")
+    for name, parse in parsers.items():
+        accepted = false_accept = false_reject = 0
+        for item in corpus:
+            ok = parse(item['response']) is not None
+            accepted += ok
+            if ok and not item['valid']:
+                false_accept += 1
+            if not ok and item['valid']:
+                false_reject += 1
+
+        started = time.perf_counter()
+        for _ in range(REPEAT):
+            for item in corpus:
+                parse(item['response'])
+        per_item_us = (time.perf_counter() - started) / (REPEAT * len(corpus)) * 1e6
+
+        print(f"   {name:<10} 接受 {accepted:>3}/{len(corpus)}  "
+              f"误拒 {false_reject:>2}  误收 {false_accept:>2}  {per_item_us:7.2f} µs/条")
+
+    print("\n🔍 拒绝原因:")
+    for item in corpus:
+        decision, reason = validator.parse(item['response'])
+        if decision is None:
+            preview = item['response'].replace("\n", " ")[:40]
+            print(f"   {reason}  <- {preview}")
+
+
+if __name__ == "__main__":
+    run(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_CORPUS)
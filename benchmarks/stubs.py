@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基准测试桩
+离线的交易所API与LLM适配器：延迟分布、失败率与响应语料均可配置，不需要任何API密钥
+"""
+
+import asyncio
+import json
+import math
+import random
+import threading
+import time
+from typing import Dict, List, Any, Optional
+
+from adapters.llm_base import LLMAdapter, LLMAPIError
+
+
+class LatencyDistribution:
+    """
+    延迟分布
+
+    规格字符串：
+        const:0.05            固定50ms
+        uniform:0.02,0.08     均匀分布
+        lognormal:0.8,0.5     对数正态，中位数0.8s，sigma 0.5
+    """
+
+    def __init__(self, spec: str = "const:0"):
+        """
+        Args:
+            spec: 分布规格字符串
+        """
+        kind, _, args = spec.partition(':')
+        self.kind = kind
+        self.params = [float(x) for x in args.split(',')] if args else [0.0]
+        if kind not in ('const', 'uniform', 'lognormal'):
+            raise ValueError(f"未知的延迟分布: {spec}")
+        self.spec = spec
+
+    def sample(self, rng: random.Random) -> float:
+        """采样一次延迟（秒）"""
+        if self.kind == 'const':
+            return self.params[0]
+        if self.kind == 'uniform':
+            return rng.uniform(self.params[0], self.params[1])
+        median, sigma = self.params
+        return rng.lognormvariate(math.log(median), sigma) if median > 0 else 0.0
+
+    def __repr__(self) -> str:
+        return self.spec
+
+
+class StubExchangeAPI:
+    """交易所API桩：价格随机游走，接口与ExchangeAPI一致"""
+
+    def __init__(self, latency: str = "const:0.02", failure_rate: float = 0.0,
+                 seed: Optional[int] = None):
+        """
+        Args:
+            latency: 一次快照请求的延迟分布规格
+            failure_rate: 单个代币取价失败（返回0）的概率
+            seed: 随机种子
+        """
+        self.latency = LatencyDistribution(latency)
+        self.failure_rate = failure_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._prices: Dict[str, float] = {}
+        self._volumes: Dict[str, float] = {}
+        self.last_snapshot: Dict[str, Any] = {}
+        self.requests = 0
+
+    def _next_price(self, symbol: str) -> float:
+        price = self._prices.get(symbol)
+        if price is None:
+            price = 10 ** self._rng.uniform(-1, 4.5)
+        price *= math.exp(self._rng.gauss(0, 0.002))
+        self._prices[symbol] = price
+        return price
+
+    def _volume(self, symbol: str) -> float:
+        volume = self._volumes.get(symbol)
+        if volume is None:
+            volume = self._volumes[symbol] = 10 ** self._rng.uniform(4, 9)
+        return volume
+
+    def get_snapshot(self, symbols: List[str]) -> Dict[str, Any]:
+        """获取价格快照（格式同ExchangeAPI.get_snapshot）"""
+        with self._lock:
+            delay = self.latency.sample(self._rng)
+            prices = {symbol: 0.0 if self._rng.random() < self.failure_rate else self._next_price(symbol)
+                      for symbol in symbols}
+            volumes = {symbol: self._volume(symbol) for symbol in symbols}
+            self.requests += 1
+        time.sleep(delay)
+        snapshot = {'prices': prices, 'volumes': volumes, 'timestamp': time.time(),
+                    'skew_ms': 0.0, 'source': 'stub'}
+        self.last_snapshot = snapshot
+        return snapshot
+
+    def get_latest_prices(self, symbols: List[str]) -> Dict[str, float]:
+        """获取多个代币的最新价格"""
+        return self.get_snapshot(symbols)['prices']
+
+    def get_single_price(self, symbol: str) -> float:
+        """获取单个代币价格"""
+        return self.get_snapshot([symbol])['prices'][symbol]
+
+    def is_available(self) -> bool:
+        """桩始终可用"""
+        return True
+
+
+class StubLLMAdapter(LLMAdapter):
+    """LLM适配器桩：按延迟分布休眠后从语料中取响应，按失败率抛出LLMAPIError"""
+
+    provider = "stub"
+
+    def __init__(self, name: str = "Stub", latency: str = "const:0.05",
+                 failure_rate: float = 0.0, corpus: Optional[str] = None,
+                 symbols: Optional[List[str]] = None, seed: Optional[int] = None):
+        """
+        Args:
+            name: 模型名称
+            latency: 单次调用的延迟分布规格
+            failure_rate: 调用失败的概率
+            corpus: 响应语料（jsonl，每行含response字段），None则生成合法的随机决策
+            symbols: 生成随机决策时可选的标的
+            seed: 随机种子
+        """
+        super().__init__(api_key="stub")
+        self.name = name
+        self.latency = LatencyDistribution(latency)
+        self.failure_rate = failure_rate
+        self.symbols = list(symbols or ['BTCUSDT'])
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.responses: List[str] = []
+        if corpus:
+            with open(corpus, 'r', encoding='utf-8') as f:
+                self.responses = [json.loads(line)['response'] for line in f if line.strip()]
+        self.calls = 0
+        self.failures = 0
+
+    def _draw(self):
+        """采样本次调用的延迟与结果"""
+        with self._lock:
+            self.calls += 1
+            delay = self.latency.sample(self._rng)
+            if self._rng.random() < self.failure_rate:
+                self.failures += 1
+                return delay, None
+            if self.responses:
+                return delay, self._rng.choice(self.responses)
+            action = self._rng.choice(('BUY', 'SELL', 'HOLD'))
+            decision = {
+                'symbol': self._rng.choice(self.symbols) if action != 'HOLD' else None,
+                'action': action,
+                'position_size_pct': round(self._rng.uniform(1, 20), 1) if action == 'BUY' else 0.0,
+                'confidence': round(self._rng.uniform(0.3, 0.9), 2),
+                'rationale': "基准测试桩响应",
+            }
+            return delay, json.dumps(decision, ensure_ascii=False)
+
+    def call(self, prompt: str, prefix: Optional[str] = None) -> str:
+        """同步调用（阻塞休眠）"""
+        delay, response = self._draw()
+        time.sleep(delay)
+        if response is None:
+            raise LLMAPIError(f"{self.name}桩注入的失败", provider=self.provider, status_code=503)
+        return response
+
+    async def acall(self, prompt: str, prefix: Optional[str] = None) -> str:
+        """异步调用（不占用线程）"""
+        delay, response = self._draw()
+        await asyncio.sleep(delay)
+        if response is None:
+            raise LLMAPIError(f"{self.name}桩注入的失败", provider=self.provider, status_code=503)
+        return response
+
+    def get_model_name(self) -> str:
+        """获取模型名称"""
+        return self.name
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+决策审计日志
+热路径只把记录放入无锁队列，后台线程批量写入只追加的压缩分段文件；
+每个分段附带(时间戳, 模型)定长索引，按时间查询单条决策只需二分 + 一次seek
+"""
+
+import json
+import os
+import struct
+import time
+import zlib
+from bisect import bisect_left, bisect_right
+from typing import Dict, Any, List, Optional, Iterator, Tuple
+
+from core.batch import BatchWriter, DEFAULT_BATCH_SIZE, DEFAULT_FLUSH_INTERVAL
+
+
+DEFAULT_SEGMENT_BYTES = 64 * 1024 * 1024
+
+# 数据帧头：压缩后长度
+FRAME_HEADER = struct.Struct('<I')
+# 索引行：时间戳, 模型编号, 帧偏移, 帧长度
+INDEX_ROW = struct.Struct('<dIQI')
+
+
+def _segment_name(number: int) -> str:
+    return f"seg-{number:06d}"
+
+
+class AuditLog(BatchWriter):
+    """
+    审计日志写入器
+
+    目录结构：
+        models.json        模型名称 -> 编号
+        seg-000001.log     zlib压缩的JSON帧序列（[长度][数据]...）
+        seg-000001.idx     定长索引行（ts, model_id, offset, length）
+    进程每次打开都从新的分段开始写，已有分段不再修改。
+    """
+
+    failure_message = "审计日志写入失败"
+
+    def __init__(self, path: str, segment_bytes: int = DEFAULT_SEGMENT_BYTES,
+                 batch_size: int = DEFAULT_BATCH_SIZE,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL):
+        """
+        初始化审计日志并启动后台写入线程
+
+        Args:
+            path: 审计目录
+            segment_bytes: 单个分段的最大字节数，超过后切换新分段
+            batch_size: 每批最多写入的记录数
+            flush_interval: 最长刷盘间隔（秒）
+        """
+        super().__init__(batch_size, flush_interval)
+        self.path = path
+        self.segment_bytes = segment_bytes
+        os.makedirs(path, exist_ok=True)
+
+        self._models_path = os.path.join(path, "models.json")
+        self._models = _load_models(path)
+        existing = _segment_numbers(path)
+        self._segment = (existing[-1] if existing else 0)
+        self._log = None
+        self._idx = None
+        self._offset = 0
+
+        self.written = 0
+        self._start("audit-writer")
+
+    def record(self, model: str, ts: Optional[float] = None, **fields):
+        """
+        提交一条审计记录（热路径，只入队不做IO）
+
+        Args:
+            model: 模型名称
+            ts: 记录时间戳，默认当前时间
+            **fields: 记录内容（prompt、market、response、decision、fill等），需可JSON序列化
+        """
+        self._put((ts if ts is not None else time.time(), model, fields))
+
+    def _write_batch(self, batch: List[Tuple[float, str, Dict[str, Any]]]):
+        """一批记录：压缩 -> 追加写 -> 刷盘"""
+        frames = bytearray()
+        rows = bytearray()
+        if self._log is None or self._offset >= self.segment_bytes:
+            self._open_segment()
+
+        for ts, model, fields in batch:
+            payload = json.dumps({'ts': ts, 'model': model, **fields},
+                                 ensure_ascii=False, default=str).encode('utf-8')
+            data = zlib.compress(payload, 6)
+            offset = self._offset + len(frames)
+            frames += FRAME_HEADER.pack(len(data))
+            frames += data
+            rows += INDEX_ROW.pack(ts, self._model_id(model), offset, len(data))
+
+        # 先写数据再写索引：崩溃时索引不会指向不完整的帧
+        self._log.write(frames)
+        self._log.flush()
+        self._idx.write(rows)
+        self._idx.flush()
+        self._offset += len(frames)
+        self.written += len(batch)
+
+    def _model_id(self, model: str) -> int:
+        model_id = self._models.get(model)
+        if model_id is None:
+            model_id = len(self._models)
+            self._models[model] = model_id
+            tmp_path = self._models_path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._models, f, ensure_ascii=False)
+            os.replace(tmp_path, self._models_path)
+        return model_id
+
+    def _open_segment(self):
+        self._close_segment()
+        self._segment += 1
+        base = os.path.join(self.path, _segment_name(self._segment))
+        self._log = open(base + ".log", 'ab')
+        self._idx = open(base + ".idx", 'ab')
+        self._offset = 0
+
+    def _close_segment(self):
+        for f in (self._log, self._idx):
+            if f is not None:
+                f.close()
+        self._log = self._idx = None
+
+    def _on_stop(self):
+        self._close_segment()
+
+
+class AuditReader:
+    """审计日志读取器（索引按需加载，读取单条记录为一次seek）"""
+
+    def __init__(self, path: str):
+        """
+        打开审计目录
+
+        Args:
+            path: AuditLog写入的目录
+        """
+        self.path = path
+        self.models = _load_models(path)
+        self.segments = _segment_numbers(path)
+        # {分段编号: {模型编号: (ts列表, [(offset, length)])}}
+        self._indexes: Dict[int, Dict[int, Tuple[List[float], List[Tuple[int, int]]]]] = {}
+        self._bounds: Dict[int, Tuple[float, float]] = {}
+
+    def _index(self, segment: int) -> Dict[int, Tuple[List[float], List[Tuple[int, int]]]]:
+        index = self._indexes.get(segment)
+        if index is not None:
+            return index
+
+        with open(os.path.join(self.path, _segment_name(segment) + ".idx"), 'rb') as f:
+            raw = f.read()
+        # 忽略崩溃时写了一半的尾行
+        raw = raw[:len(raw) - len(raw) % INDEX_ROW.size]
+        grouped: Dict[int, List[Tuple[float, int, int]]] = {}
+        lo, hi = float('inf'), float('-inf')
+        for ts, model_id, offset, length in INDEX_ROW.iter_unpack(raw):
+            grouped.setdefault(model_id, []).append((ts, offset, length))
+            lo, hi = min(lo, ts), max(hi, ts)
+
+        index = {}
+        for model_id, rows in grouped.items():
+            rows.sort()
+            index[model_id] = ([row[0] for row in rows], [(row[1], row[2]) for row in rows])
+        self._indexes[segment] = index
+        self._bounds[segment] = (lo, hi)
+        return index
+
+    def _read_frame(self, segment: int, offset: int, length: int) -> Dict[str, Any]:
+        with open(os.path.join(self.path, _segment_name(segment) + ".log"), 'rb') as f:
+            f.seek(offset + FRAME_HEADER.size)
+            return json.loads(zlib.decompress(f.read(length)).decode('utf-8'))
+
+    def find(self, model: str, ts: float) -> Optional[Dict[str, Any]]:
+        """
+        查询某模型在ts时刻（含）之前的最后一条记录
+
+        Args:
+            model: 模型名称
+            ts: 时间戳
+
+        Returns:
+            审计记录，不存在时返回None
+        """
+        model_id = self.models.get(model)
+        if model_id is None:
+            return None
+        # 分段按时间先后编号，从最新的分段往前找
+        for segment in reversed(self.segments):
+            index = self._index(segment)
+            if self._bounds[segment][0] > ts or model_id not in index:
+                continue
+            stamps, locations = index[model_id]
+            k = bisect_right(stamps, ts) - 1
+            if k >= 0:
+                return self._read_frame(segment, *locations[k])
+        return None
+
+    def range(self, model: str, start: float, end: float) -> Iterator[Dict[str, Any]]:
+        """
+        按时间顺序遍历某模型在[start, end)内的记录
+
+        Args:
+            model: 模型名称
+            start: 起始时间戳（含）
+            end: 结束时间戳（不含）
+
+        Returns:
+            审计记录迭代器
+        """
+        model_id = self.models.get(model)
+        if model_id is None:
+            return
+        for segment in self.segments:
+            index = self._index(segment)
+            lo, hi = self._bounds[segment]
+            if hi < start or lo >= end or model_id not in index:
+                continue
+            stamps, locations = index[model_id]
+            for k in range(bisect_left(stamps, start), bisect_left(stamps, end)):
+                yield self._read_frame(segment, *locations[k])
+
+
+def audit_cycle(audit: AuditLog, ts: float, decision_makers: Dict[str, Any],
+                market: Dict[str, float], decisions: Dict[str, Dict[str, Any]],
+                fills: List[Dict[str, Any]], latencies: Optional[Dict[str, float]] = None,
+                risk_rejections: Optional[Dict[str, str]] = None):
+    """
+    记录一个决策周期：每个模型一条（提示词、行情快照、原始输出、决策JSON、成交、对冲路由）
+
+    Args:
+        audit: 审计日志
+        ts: 周期时间戳
+        decision_makers: {模型: DecisionMaker}
+        market: 本周期行情快照
+        decisions: {模型: 决策}
+        fills: 本周期成交记录
+        latencies: {模型: 决策耗时}
+        risk_rejections: {模型: 风控拒单原因}
+    """
+    fills_by_model = {fill['model']: fill for fill in fills}
+    for model, decision in decisions.items():
+        decision_maker = decision_makers[model]
+        prompt = decision_maker.last_prompt
+        audit.record(
+            model, ts,
+            llm=decision_maker.model_name,
+            prompt_hash=prompt.hash if prompt else None,
+            prompt=prompt.text if prompt else None,
+            market=market,
+            response=decision_maker.last_response,
+            rejection=decision_maker.last_rejection,
+            risk_rejection=(risk_rejections or {}).get(model),
+            decision=decision,
+            fill=fills_by_model.get(model),
+            latency=(latencies or {}).get(model),
+            route=decision_maker.last_call_info,
+        )
+
+
+def _load_models(path: str) -> Dict[str, int]:
+    try:
+        with open(os.path.join(path, "models.json"), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _segment_numbers(path: str) -> List[int]:
+    numbers = []
+    for name in os.listdir(path):
+        if name.startswith("seg-") and name.endswith(".idx"):
+            numbers.append(int(name[4:-4]))
+    return sorted(numbers)
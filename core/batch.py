@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+后台批量写入
+热路径只把记录放入无锁队列，单个写线程把排队的记录攒成一批后交给子类写入；
+审计日志与SQLite持久化共用这一写入循环
+"""
+
+import queue
+import threading
+from typing import Any, List, Optional
+
+
+DEFAULT_BATCH_SIZE = 256
+DEFAULT_FLUSH_INTERVAL = 1.0
+_STOP = object()
+
+
+class BatchWriter:
+    """
+    单写线程批量写入器基类
+
+    子类实现_write_batch(batch)，可选实现_on_stop()释放资源；
+    子类初始化完成后调用_start()启动写线程。
+    """
+
+    # 写入失败时的提示文字
+    failure_message = "批量写入失败"
+
+    def __init__(self, batch_size: int = DEFAULT_BATCH_SIZE,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL):
+        """
+        Args:
+            batch_size: 每批最多合并的记录数
+            flush_interval: 写线程等待新记录的最长时间（秒）
+        """
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue: 'queue.SimpleQueue' = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+
+    def _start(self, name: str):
+        """启动后台写线程"""
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _put(self, item: Any):
+        """入队一条记录（热路径，不做IO）"""
+        self._queue.put(item)
+
+    def close(self):
+        """写完队列中剩余的记录并停止后台线程"""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    def _run(self):
+        """后台写入循环：取出排队的记录 -> 攒批 -> _write_batch"""
+        stopping = False
+        while not stopping:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = []
+            while True:
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                try:
+                    self._write_batch(batch)
+                except Exception as e:
+                    self.dropped += len(batch)
+                    print(f"⚠️ {self.failure_message}: {e}")
+        self._on_stop()
+
+    def _write_batch(self, batch: List[Any]):
+        """写入一批记录（在写线程中调用）"""
+        raise NotImplementedError
+
+    def _on_stop(self):
+        """写线程退出前调用"""
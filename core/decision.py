@@ -6,22 +6,64 @@
 """
 
 import json
-from typing import Dict, Any
-from adapters.llm_base import LLMAdapter
+import time
+from typing import Dict, Any, Optional, Iterator, AsyncIterator, Tuple
+from adapters.llm_base import LLMAdapter, get_call_info, set_call_info
+from core.json_extract import JSONObjectScanner
+from core.latency import LatencyRegistry
+from core.prompt import PromptRenderer, RenderedPrompt
+from core.schema import DecisionValidator
+
+
+class DecisionSample:
+    """单次LLM调用的决策及其响应元数据"""
+
+    __slots__ = ('decision', 'response', 'call_info', 'rejection', 'stopped_early')
+
+    def __init__(self, decision: Dict[str, Any], response: Optional[str] = None,
+                 call_info: Optional[Dict[str, Any]] = None, rejection: Optional[str] = None,
+                 stopped_early: bool = False):
+        """
+        Args:
+            decision: 解析后的决策（失败时为默认决策）
+            response: LLM原始响应，调用失败时为None
+            call_info: 本次调用的路由信息（llm_base.get_call_info）
+            rejection: schema校验的拒绝原因
+            stopped_early: 流式模式下是否提前终止
+        """
+        self.decision = decision
+        self.response = response
+        self.call_info = call_info
+        self.rejection = rejection
+        self.stopped_early = stopped_early
 
 
 class DecisionMaker:
     """交易决策引擎"""
     
-    def __init__(self, llm_adapter: LLMAdapter):
+    def __init__(self, llm_adapter: LLMAdapter, renderer: Optional[PromptRenderer] = None,
+                 streaming: bool = False):
         """
         初始化决策引擎
         
         Args:
             llm_adapter: LLM适配器实例
+            renderer: 提示词渲染器，默认使用进程内共享的渲染器，
+                      同一快照的行情部分在所有模型间只渲染一次
+            streaming: 流式模式，收到完整且有效的决策JSON后立即终止生成
         """
         self.llm_adapter = llm_adapter
         self.model_name = llm_adapter.get_model_name()
+        self.renderer = renderer or PromptRenderer.shared()
+        self.streaming = streaming
+        self.validator = DecisionValidator(self.renderer.symbols)
+        self.last_prompt: Optional[RenderedPrompt] = None
+        self.last_stopped_early = False
+        self.last_rejection: Optional[str] = None
+        self.last_response: Optional[str] = None
+        self.last_call_info: Optional[Dict[str, Any]] = None
+        self.latency = LatencyRegistry.shared()
+        self._labels = {'model': self.model_name, 'provider': llm_adapter.provider}
     
     def build_prompt(self, market_data: Dict[str, float]) -> str:
         """
@@ -33,33 +75,26 @@ class DecisionMaker:
         Returns:
             构建的提示词
         """
-        prompt = f"""
-你是专业的量化交易分析师，请根据当前市场价格给出交易决策。
-
-当前市场价格：
-- BTCUSDT: ${market_data.get('BTCUSDT', 0):.4f}
-- ETHUSDT: ${market_data.get('ETHUSDT', 0):.4f}
-- XRPUSDT: ${market_data.get('XRPUSDT', 0):.4f}
-- BNBUSDT: ${market_data.get('BNBUSDT', 0):.4f}
-- SOLUSDT: ${market_data.get('SOLUSDT', 0):.4f}
-
-请以JSON格式返回你的交易决策：
-{{
-    "symbol": "BTCUSDT|ETHUSDT|XRPUSDT|BNBUSDT|SOLUSDT|null",
-    "action": "BUY|SELL|HOLD",
-    "confidence": 0.0-1.0,
-    "rationale": "简短理由（不超过50字）"
-}}
-
-注意事项：
-1. 只返回JSON，不要其他文字
-2. symbol为null表示不选择任何代币
-3. action为HOLD表示持有/观望
-4. confidence表示决策信心度
-5. rationale给出决策理由
-
-JSON:
-"""
+        return self.render_prompt(market_data).text
+    
+    def render_prompt(self, market_data: Dict[str, float]) -> RenderedPrompt:
+        """
+        渲染交易决策提示词（静态前缀与行情部分分开，附内容哈希）
+        
+        Args:
+            market_data: 市场数据字典
+            
+        Returns:
+            渲染结果
+        """
+        with self.latency.timer('build_prompt', **self._labels):
+            prompt = self.renderer.render(market_data)
+        self.last_prompt = prompt
+        # 新一次决策开始：清空上一次的响应状态，本次被超时取消时审计不会沿用旧值
+        self.last_response = None
+        self.last_call_info = None
+        self.last_rejection = None
+        self.last_stopped_early = False
         return prompt
     
     def get_decision(self, market_data: Dict[str, float]) -> Dict[str, Any]:
@@ -72,66 +107,169 @@ JSON:
         Returns:
             解析后的决策字典
         """
-        prompt = self.build_prompt(market_data)
+        return self._record(self.sample(self.render_prompt(market_data)))
+    
+    def sample(self, prompt: RenderedPrompt) -> DecisionSample:
+        """
+        调用一次LLM并解析（不修改last_*状态，可在同一实例上并发调用）
         
+        Args:
+            prompt: 渲染后的提示词
+            
+        Returns:
+            决策样本
+        """
+        started = time.perf_counter()
+        # 路由信息按调用上下文传回（并发样本共用同一适配器时互不覆盖）
+        set_call_info(None)
         try:
-            response = self.llm_adapter.call(prompt)
-            return self.parse_decision(response)
+            stopped_early = False
+            if self.streaming:
+                response, stopped_early = self._collect_stream(
+                    self.llm_adapter.stream(prompt.market, prefix=prompt.static))
+            else:
+                response = self.llm_adapter.call(prompt.market, prefix=prompt.static)
+            self.latency.observe('llm_call', time.perf_counter() - started, **self._labels)
+            call_info = get_call_info()
+            decision, rejection = self._parse(response)
+            return DecisionSample(decision, response, call_info, rejection, stopped_early)
         except Exception as e:
+            self.latency.inc('llm_error', **self._labels)
             print(f"❌ {self.model_name}决策获取失败: {e}")
-            return self.get_default_decision()
+            return DecisionSample(self.get_default_decision())
     
-    def parse_decision(self, response: str) -> Dict[str, Any]:
+    async def aget_decision(self, market_data: Dict[str, float]) -> Dict[str, Any]:
         """
-        解析LLM响应
+        异步获取交易决策（使用适配器的常驻异步客户端）
         
         Args:
-            response: LLM响应文本
+            market_data: 市场数据
             
         Returns:
             解析后的决策字典
         """
-        try:
-            # 尝试提取JSON
-            response = response.strip()
-            if response.startswith('```json'):
-                response = response[7:]
-            if response.endswith('```'):
-                response = response[:-3]
-            
-            decision = json.loads(response)
-            
-            # 验证必要字段
-            required_fields = ['symbol', 'action', 'confidence', 'rationale']
-            for field in required_fields:
-                if field not in decision:
-                    print(f"⚠️ 决策缺少字段: {field}")
-                    return self.get_default_decision()
+        return self._record(await self.asample(self.render_prompt(market_data)))
+    
+    async def asample(self, prompt: RenderedPrompt) -> DecisionSample:
+        """
+        异步调用一次LLM并解析（不修改last_*状态，可并发调用）
+        
+        Args:
+            prompt: 渲染后的提示词
             
-            # 验证字段值
-            if decision['action'] not in ['BUY', 'SELL', 'HOLD']:
-                print(f"⚠️ 无效的action: {decision['action']}")
-                decision['action'] = 'HOLD'
+        Returns:
+            决策样本
+        """
+        started = time.perf_counter()
+        # 路由信息按调用上下文传回（并发样本共用同一适配器时互不覆盖）
+        set_call_info(None)
+        try:
+            stopped_early = False
+            if self.streaming:
+                response, stopped_early = await self._acollect_stream(
+                    self.llm_adapter.astream(prompt.market, prefix=prompt.static))
+            else:
+                response = await self.llm_adapter.acall(prompt.market, prefix=prompt.static)
+            self.latency.observe('llm_call', time.perf_counter() - started, **self._labels)
+            call_info = get_call_info()
+            decision, rejection = self._parse(response)
+            return DecisionSample(decision, response, call_info, rejection, stopped_early)
+        except Exception as e:
+            self.latency.inc('llm_error', **self._labels)
+            print(f"❌ {self.model_name}决策获取失败: {e}")
+            return DecisionSample(self.get_default_decision())
+    
+    def _record(self, sample: DecisionSample) -> Dict[str, Any]:
+        """把采用的样本记为本次决策的last_*状态（供审计与持久化）"""
+        self.last_response = sample.response
+        self.last_call_info = sample.call_info
+        self.last_rejection = sample.rejection
+        self.last_stopped_early = sample.stopped_early
+        return sample.decision
+    
+    def _collect_stream(self, chunks: Iterator[str]) -> Tuple[str, bool]:
+        """
+        读取流式响应，出现完整有效的决策对象时立即关闭流
+        
+        Args:
+            chunks: 响应片段迭代器
             
-            if not isinstance(decision['confidence'], (int, float)) or not (0 <= decision['confidence'] <= 1):
-                print(f"⚠️ 无效的confidence: {decision['confidence']}")
-                decision['confidence'] = 0.5
+        Returns:
+            (决策对象文本，未提前终止时为完整响应; 是否提前终止)
+        """
+        scanner = JSONObjectScanner()
+        try:
+            for chunk in chunks:
+                for candidate in scanner.feed(chunk):
+                    if self._is_complete_decision(candidate):
+                        return candidate, True
+        finally:
+            chunks.close()
+        return scanner.text, False
+    
+    async def _acollect_stream(self, chunks: AsyncIterator[str]) -> Tuple[str, bool]:
+        """
+        异步读取流式响应，出现完整有效的决策对象时立即关闭流
+        
+        Args:
+            chunks: 响应片段异步迭代器
             
-            return decision
+        Returns:
+            (决策对象文本，未提前终止时为完整响应; 是否提前终止)
+        """
+        scanner = JSONObjectScanner()
+        try:
+            async for chunk in chunks:
+                for candidate in scanner.feed(chunk):
+                    if self._is_complete_decision(candidate):
+                        return candidate, True
+        finally:
+            await chunks.aclose()
+        return scanner.text, False
+    
+    def _is_complete_decision(self, text: str) -> bool:
+        """判断文本是否为通过schema校验的决策对象"""
+        try:
+            obj = json.loads(text)
+        except ValueError:
+            return False
+        return self.validator.validate(obj)[0] is not None
+    
+    def parse_decision(self, response: str) -> Dict[str, Any]:
+        """
+        解析LLM响应
+        
+        单遍提取响应中的JSON对象（容忍前后说明文字、代码块标记与尾随注释），
+        再按输出schema校验；被拒绝时记录原因并返回默认决策。
+        
+        Args:
+            response: LLM响应文本
             
-        except json.JSONDecodeError as e:
-            print(f"❌ JSON解析失败: {e}")
+        Returns:
+            解析后的决策字典
+        """
+        decision, self.last_rejection = self._parse(response)
+        return decision
+    
+    def _parse(self, response: str) -> Tuple[Dict[str, Any], Optional[str]]:
+        """解析并校验响应，返回(决策, 拒绝原因)，不修改实例状态"""
+        with self.latency.timer('parse', **self._labels):
+            decision, reason = self.validator.parse(response)
+        if decision is None:
+            self.latency.inc('json_violation', **self._labels)
+            print(f"⚠️ {self.model_name}决策被拒绝: {reason}")
             print(f"原始响应: {response}")
-            return self.get_default_decision()
-        except Exception as e:
-            print(f"❌ 决策解析失败: {e}")
-            return self.get_default_decision()
+            return self.get_default_decision(), reason
+        return decision, reason
     
     def get_default_decision(self) -> Dict[str, Any]:
         """获取默认决策"""
         return {
             "symbol": None,
             "action": "HOLD",
+            "position_size_pct": 0.0,
+            "take_profit": None,
+            "stop_loss": None,
             "confidence": 0.0,
             "rationale": "解析失败，默认观望"
         }
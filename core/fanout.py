@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多模型并行决策调度
+在同一截止时间内同时向所有模型请求决策，超时即HOLD
+"""
+
+import asyncio
+import threading
+import time
+from typing import Dict, Any, Optional
+
+from core.decision import DecisionMaker
+from core.latency import LatencyRegistry
+
+
+# README约定：LLM超时8s即HOLD
+DEFAULT_DECISION_TIMEOUT = 8.0
+
+
+class DecisionFanout:
+    """多模型并行决策调度器"""
+
+    def __init__(self, decision_makers: Dict[str, DecisionMaker],
+                 timeout: float = DEFAULT_DECISION_TIMEOUT):
+        """
+        初始化并行决策调度器
+
+        Args:
+            decision_makers: {显示名称: 决策引擎} 字典
+            timeout: 整个决策周期的截止时间（秒），超时的模型记为HOLD
+        """
+        self.decision_makers = dict(decision_makers)
+        self.timeout = timeout
+
+        # 常驻事件循环，跨周期复用（适配器的异步连接池绑定在此循环上）
+        self._loop = asyncio.new_event_loop()
+        self._loop_thread = threading.Thread(target=self._loop.run_forever,
+                                             name="arena-fanout-loop", daemon=True)
+        self._loop_thread.start()
+
+        self.last_latencies: Dict[str, float] = {}
+        self.last_timeouts: Dict[str, bool] = {}
+        self.last_wall_time = 0.0
+        self.last_warm_up_latencies: Dict[str, float] = {}
+
+    def run(self, market_data: Dict[str, float]) -> Dict[str, Dict[str, Any]]:
+        """
+        并行获取所有模型的决策
+
+        Args:
+            market_data: 市场数据（所有模型共享同一份快照）
+
+        Returns:
+            {显示名称: 决策字典}，超时或失败的模型返回HOLD
+        """
+        future = asyncio.run_coroutine_threadsafe(self._gather(market_data), self._loop)
+        # 协程内部已按截止时间收尾，这里额外留一点调度余量
+        return future.result(timeout=self.timeout + 1.0)
+
+    def warm_up(self, timeout: Optional[float] = None) -> Dict[str, bool]:
+        """
+        在常驻事件循环上并发预热各适配器的异步连接池（首个tick之前调用）
+
+        Args:
+            timeout: 预热截止时间（秒），默认为决策截止时间
+
+        Returns:
+            {显示名称: 是否预热成功}
+        """
+        timeout = self.timeout if timeout is None else timeout
+        future = asyncio.run_coroutine_threadsafe(self._awarm_up(timeout), self._loop)
+        return future.result(timeout=timeout + 1.0)
+
+    async def _awarm_up(self, timeout: float) -> Dict[str, bool]:
+        """并发预热，超时的适配器记为失败"""
+        tasks = {name: asyncio.ensure_future(self._timed_warm_up(name, decision_maker))
+                 for name, decision_maker in self.decision_makers.items()}
+        if tasks:
+            await asyncio.wait(tasks.values(), timeout=timeout)
+        results = {}
+        for name, task in tasks.items():
+            if not task.done():
+                task.cancel()
+            results[name] = (task.done() and not task.cancelled()
+                             and task.exception() is None and bool(task.result()))
+        return results
+
+    async def _timed_warm_up(self, name: str, decision_maker) -> bool:
+        """记录单个模型的预热耗时（超时被取消时记到取消为止）"""
+        started = time.perf_counter()
+        try:
+            return await decision_maker.llm_adapter.awarm_up()
+        finally:
+            self.last_warm_up_latencies[name] = time.perf_counter() - started
+
+    async def _gather(self, market_data: Dict[str, float]) -> Dict[str, Dict[str, Any]]:
+        """在截止时间内并发执行所有模型，迟到的结果直接丢弃"""
+        started = time.perf_counter()
+        tasks = {}
+        for name, decision_maker in self.decision_makers.items():
+            tasks[name] = asyncio.ensure_future(
+                self._timed(name, decision_maker.aget_decision(market_data)))
+
+        if tasks:
+            await asyncio.wait(tasks.values(), timeout=self.timeout)
+
+        decisions = {}
+        self.last_timeouts = {}
+        for name, task in tasks.items():
+            decision_maker = self.decision_makers[name]
+            if task.done() and not task.cancelled() and task.exception() is None:
+                decisions[name] = task.result()
+                self.last_timeouts[name] = False
+                continue
+
+            if not task.done():
+                # 取消迟到的请求，不阻塞本周期
+                task.cancel()
+                self.last_timeouts[name] = True
+                self.last_latencies[name] = self.timeout
+                LatencyRegistry.shared().inc('timeout', model=decision_maker.model_name,
+                                             provider=decision_maker.llm_adapter.provider)
+                print(f"⏰ {name}决策超时({self.timeout:.0f}s)，默认HOLD")
+                decision = decision_maker.get_default_decision()
+                decision['rationale'] = "决策超时，默认观望"
+            else:
+                self.last_timeouts[name] = False
+                print(f"❌ {name}决策获取失败: {task.exception()}")
+                decision = decision_maker.get_default_decision()
+            decisions[name] = decision
+
+        self.last_wall_time = time.perf_counter() - started
+        return decisions
+
+    async def _timed(self, name: str, awaitable) -> Dict[str, Any]:
+        """记录单个模型的决策延迟"""
+        started = time.perf_counter()
+        result = await awaitable
+        self.last_latencies[name] = time.perf_counter() - started
+        decision_maker = self.decision_makers[name]
+        LatencyRegistry.shared().observe('decision', self.last_latencies[name],
+                                         model=decision_maker.model_name,
+                                         provider=decision_maker.llm_adapter.provider)
+        return result
+
+    async def _aclose_adapters(self):
+        """关闭各适配器的异步连接池"""
+        for decision_maker in self.decision_makers.values():
+            try:
+                await decision_maker.llm_adapter.aclose()
+            except Exception as e:
+                print(f"⚠️ {decision_maker.model_name}连接池关闭失败: {e}")
+
+    def close(self):
+        """关闭适配器连接池并停止事件循环"""
+        if self._loop.is_running():
+            future = asyncio.run_coroutine_threadsafe(self._aclose_adapters(), self._loop)
+            try:
+                future.result(timeout=2.0)
+            except Exception:
+                pass
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop_thread.join(timeout=1.0)
+        if not self._loop.is_running():
+            self._loop.close()
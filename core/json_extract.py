@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+增量JSON对象提取
+在流式输出中按括号配对找出完整的顶层JSON对象，无需等待整个响应结束
+"""
+
+import re
+from typing import List
+
+
+# 只有这几个字符会改变扫描状态，其余字符整段跳过
+_STRUCTURAL = re.compile(r'[{}"\\]')
+
+
+class JSONObjectScanner:
+    """增量JSON对象扫描器（感知字符串与转义，单遍扫描）"""
+
+    def __init__(self):
+        """初始化扫描器"""
+        self.text = ""
+        self._pos = 0
+        self._depth = 0
+        self._start = -1
+        self._in_string = False
+        # 字符串内最近一个未消费的反斜杠位置，-1表示无
+        self._escape_at = -1
+
+    def feed(self, chunk: str) -> List[str]:
+        """
+        追加一段文本
+
+        Args:
+            chunk: 新到达的文本片段
+
+        Returns:
+            本次新闭合的顶层JSON对象文本列表（可能为空）
+        """
+        self.text += chunk
+        text = self.text
+        objects = []
+
+        depth = self._depth
+        start = self._start
+        in_string = self._in_string
+        escape_at = self._escape_at
+
+        for match in _STRUCTURAL.finditer(text, self._pos):
+            i = match.start()
+            ch = text[i]
+            if in_string:
+                if escape_at >= 0:
+                    # 紧跟在反斜杠之后的字符被转义
+                    escaped = i == escape_at + 1
+                    escape_at = -1
+                    if escaped:
+                        continue
+                if ch == '\\':
+                    escape_at = i
+                elif ch == '"':
+                    in_string = False
+            elif ch == '{':
+                if depth == 0:
+                    start = i
+                depth += 1
+            elif ch == '}':
+                if depth > 0:
+                    depth -= 1
+                    if depth == 0:
+                        objects.append(text[start:i + 1])
+                        start = -1
+            elif ch == '"' and depth > 0:
+                # 对象外的引号属于正文，不进入字符串状态
+                in_string = True
+
+        self._pos = len(text)
+        self._depth = depth
+        self._start = start
+        self._in_string = in_string
+        self._escape_at = escape_at
+        return objects
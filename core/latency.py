@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分阶段延迟统计
+各阶段（取价、构建提示词、LLM调用、解析）的耗时计入按标签(模型/服务商)区分的固定桶直方图，
+附超时与JSON违规计数；可导出为Prometheus文本格式或JSON快照
+"""
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Tuple
+
+
+# 固定桶上界（秒），覆盖微秒级解析到数十秒的LLM调用
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0,
+)
+METRIC_PREFIX = "arena"
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class LatencyHistogram:
+    """固定桶直方图（counts为各桶的非累积计数，最后一桶为+Inf）"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        初始化直方图
+
+        Args:
+            buckets: 递增的桶上界（秒）
+        """
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        """记录一次耗时"""
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> float:
+        """
+        估计分位数（桶内线性插值）
+
+        Args:
+            q: 分位点，0~1
+
+        Returns:
+            耗时估计（秒），无样本时为0
+        """
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for k, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.buckets[k - 1] if k > 0 else 0.0
+                upper = self.buckets[k] if k < len(self.buckets) else self.max
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return self.max
+
+
+class LatencyRegistry:
+    """延迟直方图与事件计数的注册表（线程安全）"""
+
+    _shared: Optional['LatencyRegistry'] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        初始化注册表
+
+        Args:
+            buckets: 直方图桶上界（秒）
+        """
+        self.buckets = buckets
+        self._histograms: Dict[Tuple[str, LabelKey], LatencyHistogram] = {}
+        self._counters: Dict[Tuple[str, LabelKey], int] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls) -> 'LatencyRegistry':
+        """获取进程内共享的注册表"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def observe(self, stage: str, seconds: float, **labels: str):
+        """
+        记录一个阶段的耗时
+
+        Args:
+            stage: 阶段名称（exchange_fetch / build_prompt / llm_call / parse / decision）
+            seconds: 耗时（秒）
+            **labels: 标签，如model、provider
+        """
+        key = (stage, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = LatencyHistogram(self.buckets)
+            histogram.observe(seconds)
+
+    def inc(self, event: str, amount: int = 1, **labels: str):
+        """
+        事件计数加一
+
+        Args:
+            event: 事件名称（timeout / json_violation / llm_error）
+            amount: 增量
+            **labels: 标签
+        """
+        key = (event, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    @contextmanager
+    def timer(self, stage: str, **labels: str):
+        """
+        计时上下文：with registry.timer('parse', model=...): ...
+
+        Args:
+            stage: 阶段名称
+            **labels: 标签
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started, **labels)
+
+    def to_json(self) -> Dict[str, Any]:
+        """
+        导出JSON快照
+
+        Returns:
+            {histograms: [{stage, labels, count, sum, mean, max, p50, p95, p99}],
+             counters: [{event, labels, value}]}
+        """
+        with self._lock:
+            histograms = [
+                {
+                    'stage': stage,
+                    'labels': dict(labels),
+                    'count': h.count,
+                    'sum': h.sum,
+                    'mean': h.sum / h.count if h.count else 0.0,
+                    'max': h.max,
+                    'p50': h.quantile(0.50),
+                    'p95': h.quantile(0.95),
+                    'p99': h.quantile(0.99),
+                }
+                for (stage, labels), h in sorted(self._histograms.items())
+            ]
+            counters = [
+                {'event': event, 'labels': dict(labels), 'value': value}
+                for (event, labels), value in sorted(self._counters.items())
+            ]
+        return {'histograms': histograms, 'counters': counters}
+
+    def to_prometheus(self) -> str:
+        """
+        导出Prometheus文本格式
+
+        Returns:
+            {prefix}_stage_seconds直方图与{prefix}_events_total计数器
+        """
+        name = f"{METRIC_PREFIX}_stage_seconds"
+        lines = [f"# HELP {name} Per-stage latency in seconds.", f"# TYPE {name} histogram"]
+        with self._lock:
+            for (stage, labels), h in sorted(self._histograms.items()):
+                base = (('stage', stage),) + labels
+                cumulative = 0
+                for bound, n in zip(self.buckets, h.counts):
+                    cumulative += n
+                    lines.append(f"{name}_bucket{_labels(base + (('le', repr(bound)),))} {cumulative}")
+                lines.append(f"{name}_bucket{_labels(base + (('le', '+Inf'),))} {h.count}")
+                lines.append(f"{name}_sum{_labels(base)} {h.sum!r}")
+                lines.append(f"{name}_count{_labels(base)} {h.count}")
+
+            name = f"{METRIC_PREFIX}_events_total"
+            lines += [f"# HELP {name} Event counters (timeouts, JSON violations, errors).",
+                      f"# TYPE {name} counter"]
+            for (event, labels), value in sorted(self._counters.items()):
+                lines.append(f"{name}{_labels((('event', event),) + labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: str):
+        """
+        原子写出到文件（.json为JSON快照，其余为Prometheus文本，可供node_exporter textfile采集）
+
+        Args:
+            path: 输出路径
+        """
+        if path.endswith('.json'):
+            content = json.dumps(self.to_json(), ensure_ascii=False, indent=2)
+        else:
+            content = self.to_prometheus()
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def format_for_display(self, stages: Optional[List[str]] = None) -> str:
+        """格式化各阶段p50/p95/p99用于显示"""
+        lines = []
+        for item in self.to_json()['histograms']:
+            if stages and item['stage'] not in stages:
+                continue
+            label = ",".join(str(v) for v in item['labels'].values())
+            lines.append(f"   {item['stage']}[{label}]: n={item['count']} "
+                         f"p50 {item['p50'] * 1000:.1f}ms p95 {item['p95'] * 1000:.1f}ms "
+                         f"p99 {item['p99'] * 1000:.1f}ms")
+        return "\n".join(lines)
+
+
+def _labels(pairs: Tuple[Tuple[str, str], ...]) -> str:
+    """格式化Prometheus标签（转义反斜杠、引号与换行）"""
+    escaped = []
+    for key, value in pairs:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        escaped.append(f'{key}="{value}"')
+    return "{" + ",".join(escaped) + "}"
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+模拟交易账本
+所有模型的现金、持仓、均价与净值按列存放在NumPy数组中，逐tick一次向量化盯市
+"""
+
+import time
+from typing import Dict, List, Any, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    print("❌ 请安装numpy: pip install numpy")
+    np = None
+
+
+# README交易规范：初始资金10,000 USDT/模型，手续费万5，滑点10bp
+INITIAL_CASH = 10000.0
+FEE_RATE = 0.0005
+SLIPPAGE_RATE = 0.001
+
+
+class PaperLedger:
+    """模拟交易账本（每个模型一个独立账户）"""
+
+    def __init__(self, models: List[str], symbols: List[str],
+                 initial_cash: float = INITIAL_CASH,
+                 fee_rate: float = FEE_RATE,
+                 slippage_rate: float = SLIPPAGE_RATE):
+        """
+        初始化账本
+
+        Args:
+            models: 模型名称列表（行）
+            symbols: 交易标的列表（列）
+            initial_cash: 每个模型的初始资金
+            fee_rate: 手续费率
+            slippage_rate: 固定滑点率（买入加价、卖出减价）
+        """
+        if np is None:
+            raise ImportError("NumPy库未安装")
+
+        self.models = list(models)
+        self.symbols = list(symbols)
+        self.model_index = {model: i for i, model in enumerate(self.models)}
+        self.symbol_index = {symbol: j for j, symbol in enumerate(self.symbols)}
+        self.initial_cash = initial_cash
+        self.fee_rate = fee_rate
+        self.slippage_rate = slippage_rate
+
+        m, n = len(self.models), len(self.symbols)
+        self.cash = np.full(m, initial_cash, dtype=np.float64)
+        self.qty = np.zeros((m, n), dtype=np.float64)
+        self.avg_price = np.zeros((m, n), dtype=np.float64)
+        # 模型给出的止盈/止损价，未设置为NaN
+        self.take_profit = np.full((m, n), np.nan, dtype=np.float64)
+        self.stop_loss = np.full((m, n), np.nan, dtype=np.float64)
+        self.nav = np.full(m, initial_cash, dtype=np.float64)
+        self.fees_paid = np.zeros(m, dtype=np.float64)
+        self.realized_pnl = np.zeros(m, dtype=np.float64)
+        self.trade_count = np.zeros(m, dtype=np.int64)
+        # 最近一次有效价格，缺价的标的沿用上次价格盯市
+        self.last_prices = np.zeros(n, dtype=np.float64)
+
+    def price_vector(self, prices: Dict[str, float]):
+        """
+        将价格字典转换为与symbols对齐的向量
+
+        Returns:
+            形如(n,)的数组，缺失或无效价格为0
+        """
+        return np.array([prices.get(symbol, 0.0) or 0.0 for symbol in self.symbols],
+                        dtype=np.float64)
+
+    def mark_to_market(self, prices):
+        """
+        按最新价格对所有模型盯市（一次向量化运算）
+
+        Args:
+            prices: 价格字典，或与symbols对齐的价格向量
+
+        Returns:
+            所有模型的净值数组
+        """
+        if isinstance(prices, dict):
+            prices = self.price_vector(prices)
+        np.copyto(self.last_prices, prices, where=prices > 0)
+        np.add(self.cash, self.qty @ self.last_prices, out=self.nav)
+        return self.nav
+
+    def apply_decision(self, model: str, decision: Dict[str, Any],
+                       prices: Dict[str, float]) -> Optional[Dict[str, Any]]:
+        """
+        执行一个模型的决策（市价单 + 固定滑点）
+
+        BUY按position_size_pct（占净值百分比）买入，受可用现金限制；
+        SELL卖出该标的全部持仓（只做多）；HOLD不操作。
+
+        Args:
+            model: 模型名称
+            decision: DecisionMaker输出的决策
+            prices: 价格字典
+
+        Returns:
+            成交记录，未成交时返回None
+        """
+        action = decision.get('action')
+        symbol = decision.get('symbol')
+        if action not in ('BUY', 'SELL') or symbol not in self.symbol_index:
+            return None
+
+        i = self.model_index[model]
+        j = self.symbol_index[symbol]
+        price = prices.get(symbol, 0.0) or 0.0
+        if price <= 0:
+            print(f"⚠️ {model} {symbol}无有效价格，跳过执行")
+            return None
+
+        if action == 'BUY':
+            fill = self._buy(i, j, price, decision.get('position_size_pct') or 0.0)
+            if fill is not None:
+                self.take_profit[i, j] = decision.get('take_profit') or np.nan
+                self.stop_loss[i, j] = decision.get('stop_loss') or np.nan
+        else:
+            fill = self._sell(i, j, price)
+
+        if fill is not None:
+            fill.update({'model': model, 'symbol': symbol, 'ts': time.time()})
+            self.trade_count[i] += 1
+        return fill
+
+    def apply_decisions(self, decisions: Dict[str, Dict[str, Any]],
+                        prices: Dict[str, float]) -> List[Dict[str, Any]]:
+        """
+        执行所有模型的决策并盯市
+
+        Args:
+            decisions: {模型名称: 决策}
+            prices: 价格字典
+
+        Returns:
+            成交记录列表
+        """
+        self.mark_to_market(prices)
+        fills = []
+        for model, decision in decisions.items():
+            if model not in self.model_index:
+                continue
+            fill = self.apply_decision(model, decision, prices)
+            if fill is not None:
+                fills.append(fill)
+        self.mark_to_market(prices)
+        return fills
+
+    def _buy(self, i: int, j: int, price: float, size_pct: float) -> Optional[Dict[str, Any]]:
+        """按净值百分比买入，手续费从投入金额中扣除"""
+        spend = min(self.nav[i] * size_pct / 100.0, self.cash[i])
+        if spend <= 0:
+            return None
+
+        fill_price = price * (1 + self.slippage_rate)
+        fee = spend * self.fee_rate
+        qty = (spend - fee) / fill_price
+
+        held = self.qty[i, j]
+        self.avg_price[i, j] = (held * self.avg_price[i, j] + qty * fill_price) / (held + qty)
+        self.qty[i, j] = held + qty
+        self.cash[i] -= spend
+        self.fees_paid[i] += fee
+        return {'side': 'BUY', 'qty': float(qty), 'price': fill_price, 'fee': float(fee),
+                'notional': float(spend), 'realized_pnl': 0.0}
+
+    def _sell(self, i: int, j: int, price: float) -> Optional[Dict[str, Any]]:
+        """卖出全部持仓"""
+        qty = self.qty[i, j]
+        if qty <= 0:
+            return None
+
+        fill_price = price * (1 - self.slippage_rate)
+        proceeds = qty * fill_price
+        fee = proceeds * self.fee_rate
+        pnl = (fill_price - self.avg_price[i, j]) * qty - fee
+
+        self.cash[i] += proceeds - fee
+        self.qty[i, j] = 0.0
+        self.avg_price[i, j] = 0.0
+        self.take_profit[i, j] = np.nan
+        self.stop_loss[i, j] = np.nan
+        self.fees_paid[i] += fee
+        self.realized_pnl[i] += pnl
+        return {'side': 'SELL', 'qty': float(qty), 'price': fill_price, 'fee': float(fee),
+                'notional': float(proceeds), 'realized_pnl': float(pnl)}
+
+    def close_position(self, i: int, j: int, price: float, reason: str) -> Optional[Dict[str, Any]]:
+        """
+        平掉一个模型在某标的上的全部持仓（风控触发的市价卖出）
+
+        Args:
+            i: 模型下标
+            j: 标的下标
+            price: 触发时的价格
+            reason: 平仓原因（take_profit / stop_loss / liquidation / kill_switch）
+
+        Returns:
+            成交记录，无持仓时返回None
+        """
+        fill = self._sell(i, j, price)
+        if fill is not None:
+            fill.update({'model': self.models[i], 'symbol': self.symbols[j],
+                         'ts': time.time(), 'reason': reason})
+            self.trade_count[i] += 1
+        return fill
+
+    def get_account(self, model: str) -> Dict[str, Any]:
+        """
+        获取单个模型的账户信息
+
+        Returns:
+            {cash, nav, positions: [{symbol, qty, avg_px}]}
+        """
+        i = self.model_index[model]
+        positions = [
+            {'symbol': symbol, 'qty': float(self.qty[i, j]), 'avg_px': float(self.avg_price[i, j])}
+            for j, symbol in enumerate(self.symbols) if self.qty[i, j] > 0
+        ]
+        return {'cash': float(self.cash[i]), 'nav': float(self.nav[i]), 'positions': positions}
+
+    def format_for_display(self) -> str:
+        """格式化所有模型的净值用于显示"""
+        lines = []
+        for i, model in enumerate(self.models):
+            pnl_pct = (self.nav[i] / self.initial_cash - 1) * 100
+            lines.append(f"   {model}: 净值 ${self.nav[i]:.2f} ({pnl_pct:+.2f}%) "
+                         f"现金 ${self.cash[i]:.2f} 成交 {self.trade_count[i]}笔")
+        return "\n".join(lines)
@@ -5,26 +5,275 @@
 获取和管理市场数据
 """
 
-from typing import Dict, List
+import threading
+import time
+from typing import Dict, List, Any, Optional
 from adapters.exchange_api import ExchangeAPI
+from core.latency import LatencyRegistry
+from core.universe import load_universe
+
+try:
+    import numpy as np
+except ImportError:
+    print("❌ 请安装numpy: pip install numpy")
+    np = None
+
+
+# 价格缓存有效期（秒）：同一时刻的看板、风控与决策共享一次行情请求
+DEFAULT_PRICE_TTL = 2.0
+# Prompt使用最近60根1分钟K线
+DEFAULT_BAR_WINDOW = 60
+BAR_INTERVAL = 60
+BAR_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+
+class BarStore:
+    """
+    滚动1分钟OHLCV K线存储
+    
+    每个代币一段预分配的NumPy数组，每根K线同时写入k和k+capacity两个位置，
+    因此任意"最近n根"窗口都是一段连续切片，查询为O(1)且不复制数据。
+    单写线程：由tick增量更新当前K线。
+    """
+    
+    def __init__(self, symbols: List[str], capacity: int = 4 * DEFAULT_BAR_WINDOW,
+                 interval: int = BAR_INTERVAL):
+        """
+        初始化K线存储
+        
+        Args:
+            symbols: 代币列表
+            capacity: 每个代币保留的K线根数
+            interval: K线周期（秒）
+        """
+        if np is None:
+            raise ImportError("NumPy库未安装")
+        
+        self.symbols = list(symbols)
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.capacity = capacity
+        self.interval = interval
+        
+        n = len(self.symbols)
+        self._bars = np.zeros((n, 2 * capacity, len(BAR_FIELDS)), dtype=np.float64)
+        self._starts = np.zeros((n, 2 * capacity), dtype=np.int64)
+        # 当前K线的序号（累计根数-1）与起始周期，-1表示尚无数据
+        self._current = np.full(n, -1, dtype=np.int64)
+        self._period = np.full(n, -1, dtype=np.int64)
+        # 每次K线数据变化时递增，供提示词渲染的缓存判断是否过期
+        self.version = 0
+    
+    def on_tick(self, symbol: str, ts: float, price: float, volume: float = 0.0):
+        """
+        用一个tick更新K线
+        
+        Args:
+            symbol: 代币符号
+            ts: tick时间戳（秒）
+            price: 成交价
+            volume: 该tick的成交量增量
+        """
+        i = self.index.get(symbol)
+        if i is None or price <= 0:
+            return
+        
+        period = int(ts // self.interval)
+        current_period = self._period[i]
+        
+        if period == current_period:
+            slot = self._current[i] % self.capacity
+            bar = self._bars[i, slot]
+            if price > bar[1]:
+                bar[1] = price
+            if price < bar[2]:
+                bar[2] = price
+            bar[3] = price
+            bar[4] += volume
+            self._bars[i, slot + self.capacity] = bar
+            self.version += 1
+            return
+        
+        if period < current_period:
+            # 迟到的tick，所属K线已收盘
+            return
+        
+        if current_period >= 0:
+            # 中间无成交的周期用前收盘价补平，最多补满整个缓冲区
+            last_close = self._bars[i, self._current[i] % self.capacity, 3]
+            gap = min(period - current_period - 1, self.capacity)
+            for missing in range(period - gap, period):
+                self._open_bar(i, missing, last_close, 0.0)
+        
+        self._open_bar(i, period, price, volume)
+        self.version += 1
+    
+    def _open_bar(self, i: int, period: int, price: float, volume: float):
+        """开一根新K线"""
+        self._current[i] += 1
+        self._period[i] = period
+        slot = self._current[i] % self.capacity
+        bar = (price, price, price, price, volume)
+        start = period * self.interval
+        self._bars[i, slot] = bar
+        self._bars[i, slot + self.capacity] = bar
+        self._starts[i, slot] = start
+        self._starts[i, slot + self.capacity] = start
+    
+    def load_bars(self, symbol: str, starts, bars):
+        """
+        批量导入历史K线（如启动时从REST拉取的klines）
+        
+        Args:
+            symbol: 代币符号
+            starts: K线起始时间戳序列（秒，升序）
+            bars: 形如(n, 5)的OHLCV序列
+        """
+        i = self.index[symbol]
+        starts = np.asarray(starts, dtype=np.int64)[-self.capacity:]
+        bars = np.asarray(bars, dtype=np.float64)[-self.capacity:]
+        for start, bar in zip(starts, bars):
+            period = int(start // self.interval)
+            if period <= self._period[i]:
+                continue
+            self._open_bar(i, period, bar[0], bar[4])
+            slot = self._current[i] % self.capacity
+            self._bars[i, slot] = bar
+            self._bars[i, slot + self.capacity] = bar
+        self.version += 1
+    
+    def window(self, symbol: str, n: int = DEFAULT_BAR_WINDOW):
+        """
+        获取最近n根K线（含当前未收盘K线）
+        
+        Args:
+            symbol: 代币符号
+            n: K线根数，不超过capacity
+            
+        Returns:
+            形如(m, 5)的只读视图，列为open/high/low/close/volume，m<=n
+        """
+        i = self.index[symbol]
+        end, size = self._range(i, n)
+        view = self._bars[i, end - size:end]
+        view.flags.writeable = False
+        return view
+    
+    def window_starts(self, symbol: str, n: int = DEFAULT_BAR_WINDOW):
+        """
+        获取最近n根K线的起始时间戳（与window对齐）
+        
+        Returns:
+            形如(m,)的只读视图
+        """
+        i = self.index[symbol]
+        end, size = self._range(i, n)
+        view = self._starts[i, end - size:end]
+        view.flags.writeable = False
+        return view
+    
+    def _range(self, i: int, n: int):
+        """返回窗口在双写数组中的结束位置与长度"""
+        current = self._current[i]
+        size = int(min(n, self.capacity, current + 1))
+        end = int(current % self.capacity) + self.capacity + 1
+        return end, size
+    
+    def stack(self, n: int = DEFAULT_BAR_WINDOW):
+        """
+        所有代币最近n根K线堆叠为一个数组（一次花式索引，不逐币切片），供向量化特征计算
+        
+        Args:
+            n: K线根数，不超过capacity
+            
+        Returns:
+            形如(S, n, 5)的数组副本，K线不足n根的代币左侧以NaN填充
+        """
+        n = min(n, self.capacity)
+        size = np.minimum(self._current + 1, n)
+        end = self._current % self.capacity + self.capacity + 1
+        positions = end[:, None] - n + np.arange(n)[None, :]
+        out = self._bars[np.arange(len(self.symbols))[:, None], positions]
+        out[np.arange(n)[None, :] < (n - size)[:, None]] = np.nan
+        return out
+    
+    def windows(self, n: int = DEFAULT_BAR_WINDOW) -> Dict[str, Any]:
+        """
+        获取所有代币最近n根K线
+        
+        Returns:
+            {symbol: (m, 5)视图}
+        """
+        return {symbol: self.window(symbol, n) for symbol in self.symbols}
 
 
 class MarketData:
     """市场数据管理器"""
     
-    def __init__(self):
-        """初始化市场数据管理器"""
-        self.exchange_api = ExchangeAPI()
-        self.symbols = ['BTCUSDT', 'ETHUSDT', 'XRPUSDT', 'BNBUSDT', 'SOLUSDT']
+    def __init__(self, price_ttl: float = DEFAULT_PRICE_TTL, stream=None,
+                 exchange_api=None, symbols: Optional[List[str]] = None):
+        """
+        初始化市场数据管理器
+        
+        Args:
+            price_ttl: 价格缓存有效期（秒），0表示每次都请求交易所
+            stream: 可选的流式行情（adapters.market_stream.MarketStream），
+                    连接正常且数据新鲜时优先使用，否则回退到REST轮询
+            exchange_api: 交易所API实例，默认创建ExchangeAPI（基准测试可注入桩实现）
+            symbols: 交易标的列表，默认为配置的标的池（ARENA_SYMBOLS / ARENA_SYMBOLS_FILE）
+        """
+        self.exchange_api = exchange_api if exchange_api is not None else ExchangeAPI()
+        self.symbols = list(symbols or load_universe())
+        self.price_ttl = price_ttl
+        self.stream = stream
+        
+        # 滚动1分钟K线：有流式行情时按tick更新，否则由每次REST快照更新
+        self.bars = BarStore(self.symbols) if np is not None else None
+        if self.bars is not None and self.stream is not None:
+            self.stream.add_listener(self.bars.on_tick)
+        
+        # 共享快照缓存；_inflight非空表示已有请求在途，其他调用方等待其结果
+        self._cache_lock = threading.Lock()
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._fetched_at = 0.0
+        self._inflight: Optional[threading.Event] = None
     
     def get_current_prices(self) -> Dict[str, float]:
         """
         获取当前所有代币的价格
         
         Returns:
-            价格字典
+            价格字典，获取失败的代币为0.0
         """
-        return self.exchange_api.get_latest_prices(self.symbols)
+        return dict(self._get_snapshot()['prices'])
+    
+    def get_quotes(self, max_age: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        获取带时效信息的报价
+        
+        Args:
+            max_age: 可接受的最大数据年龄（秒），超过则标记为stale
+            
+        Returns:
+            {symbol: {price, ts, age, stale}}：
+                price: 价格，获取失败为None
+                ts: 行情源时间戳（秒）
+                age: 数据年龄（秒）
+                stale: 是否超过max_age（未指定max_age时恒为False）
+        """
+        snapshot = self._get_snapshot()
+        ts = snapshot['timestamp']
+        age = max(0.0, time.time() - ts)
+        stale = max_age is not None and age > max_age
+        
+        quotes = {}
+        for symbol, price in snapshot['prices'].items():
+            quotes[symbol] = {
+                'price': price if price > 0 else None,
+                'ts': ts,
+                'age': age,
+                'stale': stale,
+            }
+        return quotes
     
     def get_price(self, symbol: str) -> float:
         """
@@ -36,8 +285,107 @@ class MarketData:
         Returns:
             价格
         """
+        if symbol in self.symbols:
+            return self._get_snapshot()['prices'].get(symbol, 0.0)
         return self.exchange_api.get_single_price(symbol)
     
+    def get_bars(self, n: int = DEFAULT_BAR_WINDOW) -> Dict[str, Any]:
+        """
+        获取所有代币最近n根1分钟K线
+        
+        Args:
+            n: K线根数
+            
+        Returns:
+            {symbol: (m, 5) OHLCV视图}，NumPy不可用时返回空字典
+        """
+        if self.bars is None:
+            return {}
+        return self.bars.windows(n)
+    
+    def get_turnover(self):
+        """
+        获取最近一次快照中各代币的24小时成交额（USDT）
+        
+        Returns:
+            与symbols对齐的(S,)数组，行情源未提供时返回None
+        """
+        snapshot = self._snapshot
+        volumes = snapshot.get('volumes') if snapshot else None
+        if not volumes or np is None:
+            return None
+        return np.array([volumes.get(symbol, 0.0) for symbol in self.symbols], dtype=np.float64)
+    
+    def get_live_ticker(self, symbol: str) -> Optional[Dict[str, float]]:
+        """
+        获取实时盘口（bid/ask/mid/spread_bp），仅流式行情可用
+        
+        Args:
+            symbol: 代币符号
+            
+        Returns:
+            盘口字典，无流式行情时返回None
+        """
+        if self.stream is None:
+            return None
+        return self.stream.get_ticker(symbol)
+    
+    def invalidate_cache(self):
+        """使价格缓存失效，下次调用强制请求交易所"""
+        with self._cache_lock:
+            self._snapshot = None
+    
+    def _get_snapshot(self) -> Dict[str, Any]:
+        """
+        获取共享行情快照
+        
+        流式行情可用时直接读取环形缓冲区；否则缓存未过期时直接返回，
+        过期时只有一个调用方请求交易所，并发的其他调用方等待并复用同一结果。
+        """
+        if self.stream is not None:
+            snapshot = self.stream.snapshot_prices(self.symbols, max_age=max(self.price_ttl, 1.0))
+            if snapshot is not None:
+                return snapshot
+        
+        while True:
+            with self._cache_lock:
+                if (self._snapshot is not None and
+                        time.monotonic() - self._fetched_at <= self.price_ttl):
+                    return self._snapshot
+                
+                inflight = self._inflight
+                if inflight is None:
+                    inflight = self._inflight = threading.Event()
+                    leader = True
+                else:
+                    leader = False
+            
+            if not leader:
+                inflight.wait()
+                with self._cache_lock:
+                    if self._snapshot is not None:
+                        return self._snapshot
+                # 在途请求失败，重新竞争
+                continue
+            
+            snapshot = None
+            started = time.perf_counter()
+            try:
+                snapshot = self.exchange_api.get_snapshot(self.symbols)
+                LatencyRegistry.shared().observe('exchange_fetch', time.perf_counter() - started,
+                                                 source=snapshot['source'])
+                return snapshot
+            finally:
+                with self._cache_lock:
+                    if snapshot is not None:
+                        self._snapshot = snapshot
+                        self._fetched_at = time.monotonic()
+                        if self.bars is not None and self.stream is None:
+                            for symbol, price in snapshot['prices'].items():
+                                self.bars.on_tick(symbol, snapshot['timestamp'], price)
+                    self._inflight = None
+                inflight.set()
+    
     def get_symbols(self) -> List[str]:
         """获取支持的代币列表"""
         return self.symbols.copy()
@@ -46,6 +394,11 @@ class MarketData:
         """检查API是否可用"""
         return self.exchange_api.is_available()
     
+    def close(self):
+        """停止流式行情订阅（未使用流式行情时无操作）"""
+        if self.stream is not None:
+            self.stream.stop()
+    
     def format_prices_for_display(self, prices: Dict[str, float]) -> str:
         """
         格式化价格用于显示
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+绩效指标
+每个模型维护滚动累加器（Welford方差、峰值与回撤、平仓盈亏计数），每个tick O(1)更新；
+附向量化的批量回填接口
+"""
+
+import math
+from typing import Dict, List, Any, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    print("❌ 请安装numpy: pip install numpy")
+    np = None
+
+from core.ledger import INITIAL_CASH
+
+
+SECONDS_PER_YEAR = 365 * 24 * 3600
+# 默认按5分钟决策周期年化
+DEFAULT_TICK_SECONDS = 300
+
+
+class PerformanceTracker:
+    """多模型在线绩效统计（各累加器按模型存放在NumPy数组中）"""
+
+    def __init__(self, models: List[str], initial_cash: float = INITIAL_CASH,
+                 tick_seconds: float = DEFAULT_TICK_SECONDS):
+        """
+        初始化绩效统计
+
+        Args:
+            models: 模型名称列表
+            initial_cash: 初始资金
+            tick_seconds: 每个收益率样本对应的时长（秒），用于Sharpe年化
+        """
+        if np is None:
+            raise ImportError("NumPy库未安装")
+
+        self.models = list(models)
+        self.model_index = {model: i for i, model in enumerate(self.models)}
+        self.initial_cash = initial_cash
+        self.periods_per_year = SECONDS_PER_YEAR / tick_seconds
+
+        m = len(self.models)
+        # 逐tick收益率的Welford累加器
+        self.count = np.zeros(m, dtype=np.int64)
+        self.mean = np.zeros(m, dtype=np.float64)
+        self.m2 = np.zeros(m, dtype=np.float64)
+        # 净值、峰值与回撤
+        self.nav = np.full(m, initial_cash, dtype=np.float64)
+        self.peak = np.full(m, initial_cash, dtype=np.float64)
+        self.max_drawdown = np.zeros(m, dtype=np.float64)
+        # 平仓交易统计
+        self.wins = np.zeros(m, dtype=np.int64)
+        self.losses = np.zeros(m, dtype=np.int64)
+        self.gross_profit = np.zeros(m, dtype=np.float64)
+        self.gross_loss = np.zeros(m, dtype=np.float64)
+        self.first_ts: Optional[float] = None
+        self.last_ts: Optional[float] = None
+
+    def update(self, nav, ts: float):
+        """
+        计入一个tick的净值（所有模型一次向量化更新，每个模型O(1)）
+
+        Args:
+            nav: 与models对齐的净值数组（如PaperLedger.nav）
+            ts: tick时间戳
+        """
+        nav = np.asarray(nav, dtype=np.float64)
+        ret = nav / self.nav - 1.0
+        self.count += 1
+        delta = ret - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (ret - self.mean)
+
+        np.copyto(self.nav, nav)
+        np.maximum(self.peak, nav, out=self.peak)
+        np.maximum(self.max_drawdown, 1.0 - nav / self.peak, out=self.max_drawdown)
+        self._touch(ts, ts)
+
+    def update_batch(self, navs, ts):
+        """
+        向量化回填一段净值历史（与逐tick调用update结果一致）
+
+        Args:
+            navs: 形如(T, M)的净值矩阵，列与models对齐
+            ts: 形如(T,)的时间戳
+        """
+        navs = np.asarray(navs, dtype=np.float64)
+        ts = np.asarray(ts, dtype=np.float64)
+        if len(navs) == 0:
+            return
+
+        prev = np.vstack([self.nav[None, :], navs[:-1]])
+        rets = navs / prev - 1.0
+        n = len(rets)
+        batch_mean = rets.mean(axis=0)
+        batch_m2 = ((rets - batch_mean) ** 2).sum(axis=0)
+
+        # Chan并行合并：已有累加器 + 本批统计量
+        total = self.count + n
+        delta = batch_mean - self.mean
+        self.m2 += batch_m2 + delta ** 2 * self.count * n / total
+        self.mean += delta * n / total
+        self.count = total
+
+        peaks = np.maximum.accumulate(np.vstack([self.peak[None, :], navs]), axis=0)[1:]
+        np.maximum(self.max_drawdown, np.max(1.0 - navs / peaks, axis=0), out=self.max_drawdown)
+        np.copyto(self.peak, peaks[-1])
+        np.copyto(self.nav, navs[-1])
+        self._touch(ts[0], ts[-1])
+
+    def _touch(self, first: float, last: float):
+        if self.first_ts is None:
+            self.first_ts = float(first)
+        self.last_ts = float(last)
+
+    def record_fill(self, fill: Dict[str, Any]):
+        """
+        计入一笔成交（只有平仓的SELL计入胜率与盈亏比）
+
+        Args:
+            fill: PaperLedger返回的成交记录
+        """
+        if fill.get('side') != 'SELL' or fill.get('model') not in self.model_index:
+            return
+        i = self.model_index[fill['model']]
+        pnl = fill.get('realized_pnl', 0.0)
+        if pnl > 0:
+            self.wins[i] += 1
+            self.gross_profit[i] += pnl
+        else:
+            self.losses[i] += 1
+            self.gross_loss[i] -= pnl
+
+    def record_fills(self, fills: List[Dict[str, Any]]):
+        """计入多笔成交"""
+        for fill in fills:
+            self.record_fill(fill)
+
+    def get_metrics(self, model: str) -> Dict[str, Any]:
+        """
+        获取单个模型的绩效指标（O(1)）
+
+        Returns:
+            {nav, total_return, max_drawdown, drawdown, volatility, sharpe, calmar,
+             win_rate, profit_factor, closed_trades}；
+            尚无亏损平仓时盈亏比无定义，profit_factor为None（JSON中为null，SQLite中为NULL）
+        """
+        i = self.model_index[model]
+        nav = float(self.nav[i])
+        total_return = nav / self.initial_cash - 1.0
+        max_drawdown = float(self.max_drawdown[i])
+
+        std = math.sqrt(self.m2[i] / (self.count[i] - 1)) if self.count[i] > 1 else 0.0
+        sharpe = (float(self.mean[i]) / std * math.sqrt(self.periods_per_year)) if std > 0 else 0.0
+
+        elapsed = (self.last_ts - self.first_ts) if self.first_ts is not None else 0.0
+        if elapsed > 0 and nav > 0:
+            annual_return = (nav / self.initial_cash) ** (SECONDS_PER_YEAR / elapsed) - 1.0
+        else:
+            annual_return = 0.0
+        calmar = annual_return / max_drawdown if max_drawdown > 0 else 0.0
+
+        closed = int(self.wins[i] + self.losses[i])
+        gross_profit, gross_loss = float(self.gross_profit[i]), float(self.gross_loss[i])
+        profit_factor = gross_profit / gross_loss if gross_loss > 0 else None
+        return {
+            'nav': nav,
+            'total_return': total_return,
+            'max_drawdown': max_drawdown,
+            'drawdown': 1.0 - nav / float(self.peak[i]),
+            'volatility': std * math.sqrt(self.periods_per_year),
+            'sharpe': sharpe,
+            'calmar': calmar,
+            'win_rate': int(self.wins[i]) / closed if closed else 0.0,
+            'profit_factor': profit_factor,
+            'closed_trades': closed,
+        }
+
+    def get_all_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """获取所有模型的绩效指标"""
+        return {model: self.get_metrics(model) for model in self.models}
+
+    def format_for_display(self) -> str:
+        """格式化所有模型的绩效指标用于显示"""
+        lines = []
+        for model in self.models:
+            metrics = self.get_metrics(model)
+            lines.append(f"   {model}: 收益 {metrics['total_return'] * 100:+.2f}% "
+                         f"MDD {metrics['max_drawdown'] * 100:.2f}% "
+                         f"Sharpe {metrics['sharpe']:.2f} Calmar {metrics['calmar']:.2f} "
+                         f"胜率 {metrics['win_rate'] * 100:.0f}% ({metrics['closed_trades']}笔)")
+        return "\n".join(lines)
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+常驻调度器
+组件只构建一次，按对齐墙钟的固定周期（默认5分钟）循环：取价 → 并行决策 → 模拟撮合
+"""
+
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+from core.market import MarketData
+from core.decision import DecisionMaker
+from core.fanout import DecisionFanout, DEFAULT_DECISION_TIMEOUT
+from core.ledger import PaperLedger
+from core.risk import RiskEngine, DEFAULT_RISK_POLL_INTERVAL
+from core.metrics import PerformanceTracker
+from core.latency import LatencyRegistry
+from core.replay import SnapshotRecorder
+from core.audit import AuditLog, audit_cycle
+from core.shm import ProcessArena
+from core.storage import ArenaStore
+
+
+DEFAULT_CYCLE_INTERVAL = 300
+
+
+class Orchestrator:
+    """常驻调度器"""
+
+    def __init__(self, market_data: MarketData, decision_makers: Dict[str, DecisionMaker],
+                 interval: int = DEFAULT_CYCLE_INTERVAL,
+                 timeout: float = DEFAULT_DECISION_TIMEOUT,
+                 recorder: Optional[SnapshotRecorder] = None,
+                 audit: Optional[AuditLog] = None,
+                 latency_export: Optional[str] = None,
+                 workers: Optional[ProcessArena] = None,
+                 risk_interval: float = DEFAULT_RISK_POLL_INTERVAL,
+                 storage: Optional[ArenaStore] = None):
+        """
+        初始化调度器
+
+        Args:
+            market_data: 市场数据管理器（常驻，复用连接与缓存）
+            decision_makers: {显示名称: 决策引擎}；使用workers时忽略
+            interval: 周期（秒），tick对齐到墙钟的整倍数（如每个整5分钟）
+            timeout: 单周期决策截止时间（秒）
+            recorder: 可选的行情快照录制器
+            audit: 可选的决策审计日志
+            latency_export: 每个周期结束后写出分阶段延迟的文件路径（.json或Prometheus文本）
+            workers: 可选的进程级模型工作者池，给出时每个模型的决策与账本在独立进程中运行
+            risk_interval: 无流式行情时风控轮询价格的间隔（秒）；有流式行情时逐tick检查
+            storage: 可选的SQLite持久化（每个周期一次入队，由写线程批量提交）
+        """
+        self.market_data = market_data
+        self.decision_makers = decision_makers
+        self.interval = interval
+        self.recorder = recorder
+        self.audit = audit
+        self.storage = storage
+        self.latency_export = latency_export
+        self.workers = workers
+        if workers is not None:
+            models = list(workers.models)
+            self.fanout = None
+            self.ledger = None
+            self.risk = None
+        else:
+            models = list(decision_makers)
+            self.fanout = DecisionFanout(decision_makers, timeout=timeout)
+            self.ledger = PaperLedger(models, market_data.get_symbols())
+            self.risk = RiskEngine(self.ledger)
+            if market_data.stream is not None:
+                market_data.stream.add_listener(self.risk.on_tick)
+        self.risk_interval = risk_interval
+        self.warmed_up: Optional[Dict[str, bool]] = None
+        self.performance = PerformanceTracker(models, tick_seconds=interval)
+        self._stop = threading.Event()
+
+        # 调度指标
+        self.cycles = 0
+        self.missed_ticks = 0
+        self.overruns = 0
+        self.last_jitter = 0.0
+        self.max_jitter = 0.0
+        self._jitter_sum = 0.0
+        self.last_cycle_seconds = 0.0
+
+    def warm_up(self) -> Dict[str, bool]:
+        """
+        首个tick之前建立好异步连接池，避免首周期的TLS握手计入决策延迟（只执行一次）
+
+        Returns:
+            {显示名称: 是否预热成功}；使用workers时为空（工作者进程各自预热）
+        """
+        if self.fanout is None:
+            return {}
+        if self.warmed_up is None:
+            started = time.perf_counter()
+            self.warmed_up = self.fanout.warm_up()
+            print(f"🔥 连接池预热 {sum(self.warmed_up.values())}/{len(self.warmed_up)} 个模型，"
+                  f"耗时 {(time.perf_counter() - started) * 1000:.0f}ms")
+        return self.warmed_up
+
+    def next_tick(self, now: float) -> float:
+        """
+        计算下一个对齐墙钟的tick时刻
+
+        Args:
+            now: 当前Unix时间戳
+
+        Returns:
+            下一个interval整倍数的时间戳
+        """
+        return (now // self.interval + 1) * self.interval
+
+    def run(self, max_cycles: Optional[int] = None):
+        """
+        阻塞运行调度循环，直到stop()或达到max_cycles
+
+        每个tick的计划时刻都按墙钟对齐独立计算：慢周期不会推迟下一个tick，
+        错过的tick直接跳过并计数。
+
+        Args:
+            max_cycles: 最多运行的周期数，None表示一直运行
+        """
+        self.warm_up()
+
+        if self.risk is not None and self.market_data.stream is None:
+            self.risk.start_polling(self.market_data, self.risk_interval)
+
+        target = self.next_tick(time.time())
+        print(f"⏰ 调度器启动，周期 {self.interval}s，首个tick: "
+              f"{datetime.fromtimestamp(target).strftime('%H:%M:%S')}")
+
+        while not self._stop.is_set():
+            # Event.wait基于单调时钟计时，墙钟跳变只影响下一次对齐计算
+            remaining = target - time.time()
+            if remaining > 0 and self._stop.wait(remaining):
+                break
+
+            jitter = time.time() - target
+            self._record_jitter(jitter)
+
+            started = time.monotonic()
+            try:
+                self.run_cycle(target)
+            except Exception as e:
+                print(f"❌ 周期执行出错: {e}")
+            self.last_cycle_seconds = time.monotonic() - started
+            self.cycles += 1
+            LatencyRegistry.shared().observe('cycle', self.last_cycle_seconds)
+            if self.latency_export:
+                try:
+                    LatencyRegistry.shared().export(self.latency_export)
+                except OSError as e:
+                    print(f"⚠️ 延迟指标导出失败: {e}")
+
+            if self.last_cycle_seconds > self.interval:
+                self.overruns += 1
+                print(f"⚠️ 周期超时: 耗时 {self.last_cycle_seconds:.1f}s > {self.interval}s")
+
+            next_target = self.next_tick(time.time())
+            missed = int(round((next_target - target) / self.interval)) - 1
+            if missed > 0:
+                self.missed_ticks += missed
+                print(f"⚠️ 错过{missed}个tick，下一个tick: "
+                      f"{datetime.fromtimestamp(next_target).strftime('%H:%M:%S')}")
+            target = next_target
+
+            if max_cycles is not None and self.cycles >= max_cycles:
+                break
+
+    def run_cycle(self, tick: float) -> Dict[str, Any]:
+        """
+        执行一个周期
+
+        Args:
+            tick: 本周期的计划时刻
+
+        Returns:
+            {prices, decisions, fills, exits}，exits为风控触发的平仓
+        """
+        print(f"\n🕐 周期 #{self.cycles + 1} @ {datetime.fromtimestamp(tick).strftime('%Y-%m-%d %H:%M:%S')} "
+              f"(抖动 {self.last_jitter * 1000:.0f}ms)")
+
+        prices = self.market_data.get_current_prices()
+        valid_prices = {k: v for k, v in prices.items() if v > 0}
+        if not valid_prices:
+            print("❌ 没有获取到有效价格，本周期跳过")
+            return {'prices': prices, 'decisions': {}, 'fills': []}
+
+        if self.recorder is not None:
+            self.recorder.append(tick, valid_prices)
+
+        if self.workers is not None:
+            decisions, fills = self.workers.run(tick, valid_prices)
+            latencies = self.workers.last_latencies
+            exits = self.workers.last_exits
+        else:
+            # 周期内tick检查触发的平仓，加上本周期价格的一次检查
+            self.risk.check(valid_prices)
+            exits = self.risk.drain_fills()
+            decisions = self.fanout.run(valid_prices)
+            latencies = self.fanout.last_latencies
+            fills = self.risk.execute(decisions, valid_prices)
+        for model_name, decision in decisions.items():
+            latency = latencies.get(model_name, 0.0)
+            print(f"   {model_name} ({latency:.2f}s): {decision.get('action')} {decision.get('symbol')}")
+
+        if self.audit is not None:
+            self._audit(tick, valid_prices, decisions, fills, latencies)
+            for fill in exits:
+                self.audit.record(fill['model'], fill['ts'], risk_exit=fill)
+        for fill in fills:
+            print(f"   💱 {fill['model']}: {fill['side']} {fill['symbol']} "
+                  f"{fill['qty']:.6f} @ ${fill['price']:.4f}")
+        accounts = self.workers if self.workers is not None else self.ledger
+        self.performance.update(accounts.nav, tick)
+        self.performance.record_fills(exits + fills)
+        print(accounts.format_for_display())
+        if self.risk is not None:
+            print(self.risk.format_for_display())
+        print(self.performance.format_for_display())
+        if self.storage is not None:
+            self._store(tick, decisions, exits + fills, latencies)
+        return {'prices': prices, 'decisions': decisions, 'fills': fills, 'exits': exits}
+
+    def _audit(self, tick: float, prices: Dict[str, float], decisions: Dict[str, Dict[str, Any]],
+               fills: List[Dict[str, Any]], latencies: Dict[str, float]):
+        """写入本周期的审计记录（工作者模式下提示词与原始输出由工作者回传）"""
+        if self.workers is None:
+            audit_cycle(self.audit, tick, self.decision_makers, prices, decisions, fills, latencies,
+                        risk_rejections=self.risk.last_rejections)
+            return
+        fills_by_model = {fill['model']: fill for fill in fills}
+        for model, decision in decisions.items():
+            result = self.workers.last_results.get(model, {})
+            self.audit.record(
+                model, tick,
+                llm=self.workers.model_names.get(model),
+                prompt_hash=result.get('prompt_hash'),
+                prompt=result.get('prompt'),
+                market=prices,
+                response=result.get('response'),
+                rejection=result.get('rejection'),
+                risk_rejection=result.get('risk_rejection'),
+                decision=decision,
+                fill=fills_by_model.get(model),
+                latency=latencies.get(model),
+                route=result.get('route'),
+            )
+
+    def _store(self, tick: float, decisions: Dict[str, Dict[str, Any]],
+               trades: List[Dict[str, Any]], latencies: Dict[str, float]):
+        """本周期的决策、成交、净值、持仓、提示词与绩效指标一次入队"""
+        details = {}
+        for model in decisions:
+            if self.workers is not None:
+                result = self.workers.last_results.get(model, {})
+                details[model] = {key: result.get(key) for key in
+                                  ('prompt_hash', 'prompt', 'rejection', 'risk_rejection')}
+            else:
+                decision_maker = self.decision_makers[model]
+                prompt = decision_maker.last_prompt
+                details[model] = {
+                    'prompt_hash': prompt.hash if prompt else None,
+                    'prompt': prompt.text if prompt else None,
+                    'rejection': decision_maker.last_rejection,
+                    'risk_rejection': self.risk.last_rejections.get(model),
+                }
+            details[model]['latency'] = latencies.get(model)
+        accounts = self.workers if self.workers is not None else self.ledger
+        self.storage.write_cycle(tick, decisions,
+                                 {model: accounts.get_account(model) for model in self.performance.models},
+                                 trades, details, self.performance.get_all_metrics())
+
+    def _record_jitter(self, jitter: float):
+        """记录tick启动抖动（实际启动时刻 - 计划时刻）"""
+        self.last_jitter = jitter
+        self.max_jitter = max(self.max_jitter, jitter)
+        self._jitter_sum += jitter
+
+    def get_metrics(self) -> Dict[str, float]:
+        """
+        获取调度指标
+
+        Returns:
+            {cycles, missed_ticks, overruns, jitter_last, jitter_mean, jitter_max, last_cycle_seconds}
+        """
+        count = self.cycles or 1
+        return {
+            'cycles': self.cycles,
+            'missed_ticks': self.missed_ticks,
+            'overruns': self.overruns,
+            'jitter_last': self.last_jitter,
+            'jitter_mean': self._jitter_sum / count,
+            'jitter_max': self.max_jitter,
+            'last_cycle_seconds': self.last_cycle_seconds,
+        }
+
+    def stop(self):
+        """请求停止（当前周期结束后退出）"""
+        self._stop.set()
+
+    def close(self):
+        """释放常驻资源"""
+        self.stop()
+        if self.workers is not None:
+            self.workers.close()
+        else:
+            self.risk.stop()
+            self.fanout.close()
+        self.market_data.close()
+        if self.audit is not None:
+            self.audit.close()
+        if self.storage is not None:
+            self.storage.close()
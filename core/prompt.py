@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+提示词渲染
+静态指令与输出schema只构建一次，行情部分每个快照只渲染一次并在所有模型间共享
+"""
+
+import hashlib
+import threading
+from typing import Dict, List, Optional
+
+from core.universe import load_universe
+
+
+# 标的池不超过此数量时在schema中逐个列出，否则只约束为行情中出现的代币
+MAX_INLINE_SYMBOLS = 20
+
+
+class RenderedPrompt:
+    """渲染后的提示词"""
+
+    __slots__ = ('static', 'market', 'text', 'hash')
+
+    def __init__(self, static: str, market: str):
+        """
+        Args:
+            static: 静态前缀（指令与schema），跨周期不变，供服务端提示词缓存复用
+            market: 本周期的行情部分
+        """
+        self.static = static
+        self.market = market
+        self.text = static + market
+        # 内容哈希，供响应缓存与审计日志作为键
+        self.hash = hashlib.sha256(self.text.encode('utf-8')).hexdigest()
+
+    def __str__(self) -> str:
+        return self.text
+
+
+class PromptRenderer:
+    """提示词渲染器"""
+
+    _shared: Optional['PromptRenderer'] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, symbols: Optional[List[str]] = None, compressor=None):
+        """
+        初始化渲染器并预构建静态前缀
+
+        Args:
+            symbols: 交易标的列表，默认为配置的标的池（见core.universe.load_universe）
+            compressor: 可选的行情压缩器（core.universe.PromptCompressor），
+                        给出时行情部分按token预算只保留排名靠前的代币及其K线
+        """
+        self.symbols = list(symbols or load_universe())
+        self.compressor = compressor
+        self.static = self._build_static()
+        # 每行的格式串预先拼好，渲染时只做数值格式化
+        self._price_lines = [(symbol, f"- {symbol}: ${{:.4f}}") for symbol in self.symbols]
+
+        self._lock = threading.Lock()
+        self._last_key = None
+        self._last_prompt: Optional[RenderedPrompt] = None
+
+    @classmethod
+    def shared(cls) -> 'PromptRenderer':
+        """进程内共享的默认渲染器"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def set_compressor(self, compressor):
+        """
+        设置行情压缩器（代币顺序须与本渲染器一致）
+
+        Args:
+            compressor: core.universe.PromptCompressor，None表示逐行列出全部价格
+        """
+        if compressor is not None and list(compressor.symbols) != self.symbols:
+            raise ValueError("压缩器的代币列表与渲染器不一致")
+        with self._lock:
+            self.compressor = compressor
+            self._last_key = None
+            self._last_prompt = None
+
+    def _build_static(self) -> str:
+        """构建静态前缀：角色、输出schema与注意事项"""
+        if len(self.symbols) <= MAX_INLINE_SYMBOLS:
+            symbol_choices = "|".join(self.symbols + ['null'])
+        else:
+            symbol_choices = "行情中列出的代币代码|null"
+        return f"""
+你是专业的量化交易分析师，请根据当前市场价格给出交易决策。
+
+请以JSON格式返回你的交易决策：
+{{
+    "symbol": "{symbol_choices}",
+    "action": "BUY|SELL|HOLD",
+    "position_size_pct": 0.0-20.0,
+    "take_profit": 止盈价格或null,
+    "stop_loss": 止损价格或null,
+    "confidence": 0.0-1.0,
+    "rationale": "简短理由（不超过50字）"
+}}
+
+注意事项：
+1. 只返回JSON，不要其他文字
+2. symbol为null表示不选择任何代币
+3. action为HOLD表示持有/观望
+4. position_size_pct为本次下单占净值的百分比，单次不超过20
+5. take_profit/stop_loss为绝对价格
+6. confidence表示决策信心度
+7. rationale给出决策理由
+"""
+
+    def render(self, market_data: Dict[str, float]) -> RenderedPrompt:
+        """
+        渲染提示词
+
+        同一份行情快照只渲染一次，之后的调用（包括其他模型）直接复用结果；
+        设置了压缩器时，K线或成交额变化也会使缓存失效。
+
+        Args:
+            market_data: 市场数据字典
+
+        Returns:
+            渲染结果
+        """
+        key = tuple(market_data.get(symbol, 0) for symbol in self.symbols)
+        compressor = self.compressor
+        if compressor is not None:
+            key += compressor.state_key()
+        with self._lock:
+            if key == self._last_key:
+                return self._last_prompt
+
+        if compressor is not None:
+            market = compressor.render(market_data)
+        else:
+            lines = [template.format(market_data.get(symbol, 0))
+                     for symbol, template in self._price_lines]
+            market = "\n当前市场价格：\n" + "\n".join(lines) + "\n\nJSON:\n"
+        prompt = RenderedPrompt(self.static, market)
+
+        with self._lock:
+            self._last_key = key
+            self._last_prompt = prompt
+        return prompt
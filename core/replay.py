@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+历史回放/回测引擎
+将录制的行情快照按模拟的5分钟时钟喂给DecisionMaker，按(模型, 时间段)分片在进程池中并行回放
+"""
+
+import importlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Optional, Callable
+
+try:
+    import numpy as np
+except ImportError:
+    print("❌ 请安装numpy: pip install numpy")
+    np = None
+
+from core.ledger import PaperLedger, INITIAL_CASH
+from core.risk import RiskEngine
+
+
+# 决策周期（秒）
+DECISION_INTERVAL = 300
+DEFAULT_FACTORY = "core.replay:default_decision_maker"
+
+
+class SnapshotRecorder:
+    """
+    行情快照录制器
+
+    列式追加写入：ts.f64为(T,)的时间戳，prices.f64为(T, S)的价格矩阵，
+    meta.json记录标的顺序。文件只追加，可被SnapshotStore内存映射读取。
+    """
+
+    def __init__(self, path: str, symbols: List[str]):
+        """
+        初始化录制器
+
+        Args:
+            path: 录制目录
+            symbols: 标的列表（决定价格矩阵的列顺序）
+        """
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+        meta_path = os.path.join(path, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                self.symbols = json.load(f)['symbols']
+        else:
+            self.symbols = list(symbols)
+            with open(meta_path, 'w', encoding='utf-8') as f:
+                json.dump({'symbols': self.symbols, 'dtype': 'float64'}, f)
+
+    def append(self, ts: float, prices: Dict[str, float]):
+        """
+        追加一条快照
+
+        Args:
+            ts: 快照时间戳（秒）
+            prices: 价格字典，缺失的标的记为0
+        """
+        row = np.array([prices.get(symbol, 0.0) or 0.0 for symbol in self.symbols],
+                       dtype=np.float64)
+        # 先写价格再写时间戳，读取方以时间戳长度为准，不会读到半行
+        with open(os.path.join(self.path, "prices.f64"), 'ab') as f:
+            f.write(row.tobytes())
+        with open(os.path.join(self.path, "ts.f64"), 'ab') as f:
+            f.write(np.float64(ts).tobytes())
+
+
+class SnapshotStore:
+    """内存映射的行情快照只读存储"""
+
+    def __init__(self, path: str):
+        """
+        打开录制目录
+
+        Args:
+            path: SnapshotRecorder写入的目录
+        """
+        if np is None:
+            raise ImportError("NumPy库未安装")
+
+        with open(os.path.join(path, "meta.json"), 'r', encoding='utf-8') as f:
+            self.symbols = json.load(f)['symbols']
+
+        ts_path = os.path.join(path, "ts.f64")
+        count = os.path.getsize(ts_path) // 8 if os.path.exists(ts_path) else 0
+        if count == 0:
+            self.ts = np.zeros(0, dtype=np.float64)
+            self.prices = np.zeros((0, len(self.symbols)), dtype=np.float64)
+            return
+        self.ts = np.memmap(ts_path, dtype=np.float64, mode='r', shape=(count,))
+        self.prices = np.memmap(os.path.join(path, "prices.f64"), dtype=np.float64,
+                                mode='r', shape=(count, len(self.symbols)))
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def slice(self, start: Optional[float] = None, end: Optional[float] = None):
+        """
+        按时间范围切片（不复制数据）
+
+        Args:
+            start: 起始时间戳（含）
+            end: 结束时间戳（不含）
+
+        Returns:
+            (ts视图, prices视图)
+        """
+        lo = 0 if start is None else int(np.searchsorted(self.ts, start, side='left'))
+        hi = len(self.ts) if end is None else int(np.searchsorted(self.ts, end, side='left'))
+        return self.ts[lo:hi], self.prices[lo:hi]
+
+
+def default_decision_maker(model: str):
+    """
+    默认的决策引擎工厂：按模型名称构建带响应缓存的适配器
+
+    设置LLM_CACHE_OFFLINE=1时回放完全离线、结果可复现。
+
+    Args:
+        model: 模型名称（模型注册表中的键，如OpenAI / Claude）
+
+    Returns:
+        DecisionMaker实例
+    """
+    from adapters.cached_adapter import CachedLLMAdapter
+    from adapters.gateway import GatewayLLMAdapter
+    from adapters.registry import ModelRegistry
+    from core.decision import DecisionMaker
+    from core.prompt import PromptRenderer
+    from core.schema import DecisionValidator
+
+    adapter = ModelRegistry.from_env().create_adapter(model)
+    validator = DecisionValidator(PromptRenderer.shared().symbols)
+    return DecisionMaker(CachedLLMAdapter(GatewayLLMAdapter(adapter), validator=validator.is_valid))
+
+
+def _load_factory(path: str) -> Callable[[str], Any]:
+    """按"模块:函数"加载决策引擎工厂（子进程中只能传递可导入的名称）"""
+    module_name, _, attr = path.partition(':')
+    return getattr(importlib.import_module(module_name), attr)
+
+
+def run_shard(shard: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    回放单个分片（在子进程中执行）
+
+    每个分片从空仓、初始资金开始；每个快照经风控引擎盯市并检查止盈/止损/强平/回撤熔断，
+    每隔interval秒请求一次决策并做事前校验，与实盘调度器的执行路径一致。
+
+    Args:
+        shard: {store, model, start, end, factory, interval}
+
+    Returns:
+        {model, start, end, ts, nav, fills, decisions, elapsed}
+    """
+    started = time.perf_counter()
+    store = SnapshotStore(shard['store'])
+    ts, prices = store.slice(shard.get('start'), shard.get('end'))
+    model = shard['model']
+    interval = shard.get('interval', DECISION_INTERVAL)
+
+    decision_maker = _load_factory(shard.get('factory', DEFAULT_FACTORY))(model)
+    ledger = PaperLedger([model], store.symbols)
+    risk = RiskEngine(ledger)
+
+    nav = np.empty(len(ts), dtype=np.float64)
+    fills = []
+    decisions = 0
+    next_decision = None
+
+    for k in range(len(ts)):
+        row = prices[k]
+        risk.check(row)
+        step_fills = risk.drain_fills()
+        if next_decision is None or ts[k] >= next_decision:
+            snapshot = {symbol: float(row[j]) for j, symbol in enumerate(store.symbols)
+                        if row[j] > 0}
+            decision = decision_maker.get_decision(snapshot)
+            decisions += 1
+            step_fills += risk.execute({model: decision}, snapshot)
+            # 模拟时钟对齐到决策周期边界
+            next_decision = (ts[k] // interval + 1) * interval
+        for fill in step_fills:
+            fill['ts'] = float(ts[k])
+        fills.extend(step_fills)
+        nav[k] = ledger.nav[0]
+
+    return {
+        'model': model,
+        'start': float(ts[0]) if len(ts) else shard.get('start'),
+        'end': float(ts[-1]) if len(ts) else shard.get('end'),
+        'ts': np.asarray(ts, dtype=np.float64).copy(),
+        'nav': nav,
+        'fills': fills,
+        'decisions': decisions,
+        'elapsed': time.perf_counter() - started,
+    }
+
+
+class ReplayEngine:
+    """回放引擎"""
+
+    def __init__(self, store_path: str, factory: str = DEFAULT_FACTORY,
+                 interval: int = DECISION_INTERVAL, processes: Optional[int] = None):
+        """
+        初始化回放引擎
+
+        Args:
+            store_path: 行情录制目录
+            factory: 决策引擎工厂，"模块:函数"格式，接收模型名称返回DecisionMaker
+            interval: 模拟决策周期（秒）
+            processes: 进程数，默认CPU核数；1表示在当前进程内串行回放
+        """
+        self.store_path = store_path
+        self.factory = factory
+        self.interval = interval
+        self.processes = processes
+
+    def build_shards(self, models: List[str], start: Optional[float] = None,
+                     end: Optional[float] = None, shard_seconds: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        按(模型, 时间段)切分回放任务
+
+        Args:
+            models: 模型名称列表
+            start: 回放起始时间戳，默认为录制起点
+            end: 回放结束时间戳，默认为录制终点
+            shard_seconds: 每个分片的时长，None表示每个模型一个分片
+
+        Returns:
+            分片列表
+        """
+        store = SnapshotStore(self.store_path)
+        if len(store) == 0:
+            return []
+        start = float(store.ts[0]) if start is None else start
+        end = float(store.ts[-1]) + 1 if end is None else end
+
+        bounds = [start]
+        if shard_seconds:
+            # 分片边界对齐到决策周期，保证与单分片回放的决策时刻一致
+            step = max(self.interval, shard_seconds // self.interval * self.interval)
+            edge = (start // self.interval + 1) * self.interval
+            while edge + step < end:
+                edge += step
+                bounds.append(edge)
+        bounds.append(end)
+
+        return [
+            {'store': self.store_path, 'model': model, 'start': lo, 'end': hi,
+             'factory': self.factory, 'interval': self.interval}
+            for model in models
+            for lo, hi in zip(bounds[:-1], bounds[1:])
+        ]
+
+    def run(self, models: List[str], start: Optional[float] = None,
+            end: Optional[float] = None, shard_seconds: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        并行回放并合并结果
+
+        Args:
+            models: 模型名称列表
+            start: 回放起始时间戳
+            end: 回放结束时间戳
+            shard_seconds: 分片时长
+
+        Returns:
+            {模型: {ts, nav, fills, decisions, total_return, max_drawdown}}
+        """
+        shards = self.build_shards(models, start, end, shard_seconds)
+        print(f"⏪ 回放 {len(models)}个模型，共{len(shards)}个分片")
+
+        started = time.perf_counter()
+        if self.processes == 1:
+            results = [run_shard(shard) for shard in shards]
+        else:
+            with ProcessPoolExecutor(max_workers=self.processes) as pool:
+                results = list(pool.map(run_shard, shards))
+
+        merged = self.merge(results)
+        print(f"✅ 回放完成，耗时 {time.perf_counter() - started:.2f}s")
+        return merged
+
+    @staticmethod
+    def merge(results: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+        按模型合并分片结果
+
+        各分片独立从初始资金开始，合并时按上一分片的期末净值对下一分片等比缩放，
+        将分片收益率首尾相接成连续净值曲线（分片边界处不延续持仓）。
+
+        Args:
+            results: run_shard的返回值列表
+
+        Returns:
+            {模型: 合并后的结果}
+        """
+        by_model: Dict[str, List[Dict[str, Any]]] = {}
+        for result in results:
+            by_model.setdefault(result['model'], []).append(result)
+
+        merged = {}
+        for model, parts in by_model.items():
+            parts.sort(key=lambda part: part['start'])
+            navs, stamps, fills = [], [], []
+            scale = 1.0
+            decisions = 0
+            for part in parts:
+                if len(part['nav']):
+                    navs.append(part['nav'] * scale)
+                    stamps.append(part['ts'])
+                    for fill in part['fills']:
+                        fills.append(dict(fill, qty=fill['qty'] * scale, notional=fill['notional'] * scale,
+                                          fee=fill['fee'] * scale, realized_pnl=fill['realized_pnl'] * scale))
+                    scale *= part['nav'][-1] / INITIAL_CASH
+                decisions += part['decisions']
+
+            nav = np.concatenate(navs) if navs else np.zeros(0)
+            ts = np.concatenate(stamps) if stamps else np.zeros(0)
+            if len(nav):
+                peak = np.maximum.accumulate(nav)
+                max_drawdown = float(np.max(1 - nav / peak))
+                total_return = float(nav[-1] / INITIAL_CASH - 1)
+            else:
+                max_drawdown = total_return = 0.0
+
+            merged[model] = {
+                'ts': ts,
+                'nav': nav,
+                'fills': fills,
+                'decisions': decisions,
+                'total_return': total_return,
+                'max_drawdown': max_drawdown,
+            }
+        return merged
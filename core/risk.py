@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+风控引擎
+与LLM决策节奏解耦：每个价格tick对所有模型做一次向量化检查（止盈/止损、-5%强平、10%回撤熔断），
+决策执行前逐条做微秒级的事前校验（单笔≤20% NAV、最多1个持仓标的）
+"""
+
+import threading
+from typing import Dict, List, Any, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    print("❌ 请安装numpy: pip install numpy")
+    np = None
+
+from core.ledger import PaperLedger
+
+
+# README风控规则
+MAX_ORDER_NAV_PCT = 20.0
+MAX_OPEN_SYMBOLS = 1
+FORCED_LIQUIDATION_PCT = 5.0
+KILL_SWITCH_DRAWDOWN = 0.10
+# 无流式行情时的轮询周期（秒）
+DEFAULT_RISK_POLL_INTERVAL = 5.0
+
+
+class RiskEngine:
+    """向量化风控引擎（包装一个PaperLedger）"""
+
+    def __init__(self, ledger: PaperLedger,
+                 max_order_pct: float = MAX_ORDER_NAV_PCT,
+                 max_open_symbols: int = MAX_OPEN_SYMBOLS,
+                 liquidation_pct: float = FORCED_LIQUIDATION_PCT,
+                 kill_drawdown: float = KILL_SWITCH_DRAWDOWN):
+        """
+        初始化风控引擎
+
+        Args:
+            ledger: 模拟交易账本（所有修改都应经过本引擎，以便与tick检查互斥）
+            max_order_pct: 单笔买入占净值的上限（%）
+            max_open_symbols: 同时持仓的标的数上限
+            liquidation_pct: 单个持仓相对均价亏损达到该百分比时强平
+            kill_drawdown: 净值自峰值回撤达到该比例时全平并停止该模型交易
+        """
+        if np is None:
+            raise ImportError("NumPy库未安装")
+
+        self.ledger = ledger
+        self.max_order_pct = max_order_pct
+        self.max_open_symbols = max_open_symbols
+        self.liquidation_ratio = 1.0 - liquidation_pct / 100.0
+        self.kill_drawdown = kill_drawdown
+
+        m = len(ledger.models)
+        self.peak_nav = ledger.nav.copy()
+        self.halted = np.zeros(m, dtype=bool)
+        # 预分配的tick价格向量，流式行情逐币更新
+        self._prices = ledger.last_prices.copy()
+        # 风控与决策执行共用的账本锁
+        self.lock = threading.Lock()
+
+        self.checks = 0
+        self.exits: Dict[str, int] = {'take_profit': 0, 'stop_loss': 0, 'liquidation': 0, 'kill_switch': 0}
+        self.rejections = 0
+        self.last_rejections: Dict[str, str] = {}
+        self._pending_fills: List[Dict[str, Any]] = []
+        self._poll_stop = threading.Event()
+        self._poll_thread: Optional[threading.Thread] = None
+
+    def validate(self, model: str, decision: Dict[str, Any],
+                 prices: Dict[str, float]) -> Tuple[bool, Optional[str]]:
+        """
+        事前校验一个决策（纯标量运算，微秒级；调用方须持有lock）
+
+        Args:
+            model: 模型名称
+            decision: 通过schema校验的决策
+            prices: 价格字典
+
+        Returns:
+            (是否放行, 拒绝原因)
+        """
+        action = decision.get('action')
+        if action not in ('BUY', 'SELL'):
+            return True, None
+
+        ledger = self.ledger
+        i = ledger.model_index[model]
+        if self.halted[i]:
+            return False, f"回撤超过{self.kill_drawdown:.0%}，已停止交易"
+
+        symbol = decision.get('symbol')
+        j = ledger.symbol_index.get(symbol)
+        if j is None:
+            return False, f"symbol不在标的范围内: {symbol!r}"
+        price = prices.get(symbol, 0.0) or 0.0
+        if price <= 0:
+            return False, f"{symbol}无有效价格"
+
+        row = ledger.qty[i]
+        if action == 'SELL':
+            return (True, None) if row[j] > 0 else (False, f"{symbol}无持仓")
+
+        size = decision.get('position_size_pct') or 0.0
+        if size > self.max_order_pct:
+            return False, f"单笔下单{size:.1f}%超过上限{self.max_order_pct:.0f}% NAV"
+        if row[j] <= 0 and np.count_nonzero(row) >= self.max_open_symbols:
+            return False, f"已持有{self.max_open_symbols}个标的，不能再开新仓"
+
+        take_profit = decision.get('take_profit')
+        stop_loss = decision.get('stop_loss')
+        if take_profit is not None and take_profit <= price:
+            return False, f"止盈价{take_profit}不高于现价{price}"
+        if stop_loss is not None and stop_loss >= price:
+            return False, f"止损价{stop_loss}不低于现价{price}"
+        return True, None
+
+    def execute(self, decisions: Dict[str, Dict[str, Any]],
+                prices: Dict[str, float]) -> List[Dict[str, Any]]:
+        """
+        事前校验并执行所有模型的决策（替代PaperLedger.apply_decisions）
+
+        Args:
+            decisions: {模型名称: 决策}
+            prices: 价格字典
+
+        Returns:
+            成交记录列表；被拒绝的决策原因见last_rejections
+        """
+        self.last_rejections = {}
+        fills = []
+        with self.lock:
+            self.ledger.mark_to_market(prices)
+            for model, decision in decisions.items():
+                if model not in self.ledger.model_index:
+                    continue
+                ok, reason = self.validate(model, decision, prices)
+                if not ok:
+                    self.rejections += 1
+                    self.last_rejections[model] = reason
+                    print(f"🛡️ {model}决策被风控拒绝: {reason}")
+                    continue
+                fill = self.ledger.apply_decision(model, decision, prices)
+                if fill is not None:
+                    fills.append(fill)
+            self.ledger.mark_to_market(prices)
+            np.maximum(self.peak_nav, self.ledger.nav, out=self.peak_nav)
+        return fills
+
+    def check(self, prices=None) -> List[Dict[str, Any]]:
+        """
+        对所有模型做一次向量化风控检查，触发的持仓按当前价市价平掉
+
+        Args:
+            prices: 价格字典或与symbols对齐的向量，None表示使用tick累积的价格
+
+        Returns:
+            本次触发的平仓成交记录
+        """
+        ledger = self.ledger
+        with self.lock:
+            self.checks += 1
+            ledger.mark_to_market(self._prices if prices is None else prices)
+            last = ledger.last_prices
+            held = ledger.qty > 0
+            # NaN比较恒为False：未设置止盈/止损的持仓不会触发
+            take_profit = held & (last >= ledger.take_profit)
+            stop_loss = held & (last <= ledger.stop_loss)
+            liquidation = held & (last <= ledger.avg_price * self.liquidation_ratio)
+
+            np.maximum(self.peak_nav, ledger.nav, out=self.peak_nav)
+            kill = ~self.halted & (ledger.nav <= self.peak_nav * (1.0 - self.kill_drawdown))
+            kill_exits = held & kill[:, None]
+
+            if not (take_profit.any() or stop_loss.any() or liquidation.any() or kill.any()):
+                return []
+
+            fills = []
+            for reason, mask in (('kill_switch', kill_exits), ('stop_loss', stop_loss),
+                                 ('liquidation', liquidation), ('take_profit', take_profit)):
+                for i, j in zip(*np.nonzero(mask)):
+                    fill = ledger.close_position(i, j, last[j], reason)
+                    if fill is not None:
+                        self.exits[reason] += 1
+                        fills.append(fill)
+            for i in np.nonzero(kill)[0]:
+                print(f"🛑 {ledger.models[i]}回撤超过{self.kill_drawdown:.0%}，已全平并停止交易")
+            self.halted |= kill
+            ledger.mark_to_market(last)
+            self._pending_fills.extend(fills)
+
+        for fill in fills:
+            print(f"🛡️ 风控平仓 {fill['model']}: {fill['reason']} {fill['symbol']} "
+                  f"{fill['qty']:.6f} @ ${fill['price']:.4f}")
+        return fills
+
+    def on_tick(self, symbol: str, ts: float, price: float):
+        """
+        流式行情的tick回调（MarketStream.add_listener）：更新价格后立即检查
+
+        Args:
+            symbol: 代币符号
+            ts: tick时间戳
+            price: 最新成交价
+        """
+        j = self.ledger.symbol_index.get(symbol)
+        if j is None or price <= 0:
+            return
+        self._prices[j] = price
+        self.check()
+
+    def start_polling(self, market_data, interval: float = DEFAULT_RISK_POLL_INTERVAL):
+        """
+        无流式行情时在后台线程中按固定间隔取价检查
+
+        Args:
+            market_data: 市场数据管理器（复用其价格缓存）
+            interval: 轮询间隔（秒）
+        """
+        def poll():
+            while not self._poll_stop.wait(interval):
+                try:
+                    self.check(market_data.get_current_prices())
+                except Exception as e:
+                    print(f"⚠️ 风控轮询失败: {e}")
+
+        self._poll_stop.clear()
+        self._poll_thread = threading.Thread(target=poll, name="arena-risk", daemon=True)
+        self._poll_thread.start()
+
+    def stop(self):
+        """停止后台轮询"""
+        self._poll_stop.set()
+        if self._poll_thread is not None:
+            self._poll_thread.join(timeout=2.0)
+
+    def drain_fills(self) -> List[Dict[str, Any]]:
+        """
+        取出自上次调用以来由tick检查触发的平仓成交
+
+        Returns:
+            成交记录列表
+        """
+        with self.lock:
+            fills, self._pending_fills = self._pending_fills, []
+        return fills
+
+    def format_for_display(self) -> str:
+        """格式化风控统计用于显示"""
+        halted = [model for model, flag in zip(self.ledger.models, self.halted) if flag]
+        exits = " ".join(f"{reason} {count}" for reason, count in self.exits.items())
+        line = f"   🛡️ 风控: 检查 {self.checks}次，拒单 {self.rejections}，平仓 {exits}"
+        if halted:
+            line += f"，已停止: {', '.join(halted)}"
+        return line
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+决策输出schema校验
+按README的输出schema预编译字段检查，返回规范化决策或拒绝原因
+"""
+
+import json
+from typing import Dict, Any, List, Optional, Tuple, Callable
+
+from core.json_extract import JSONObjectScanner
+
+
+ACTIONS = ('BUY', 'SELL', 'HOLD')
+# rationale长度上限（README: <=200 chars），超出部分截断
+MAX_RATIONALE_CHARS = 200
+# 单次下单上限（占NAV百分比），超出由风控拒绝，schema只校验取值范围
+MAX_POSITION_SIZE_PCT = 100.0
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class DecisionValidator:
+    """决策schema校验器"""
+
+    def __init__(self, symbols: List[str]):
+        """
+        初始化校验器并预编译字段检查
+
+        Args:
+            symbols: 允许的交易标的
+        """
+        self.symbols = frozenset(symbols)
+        self._checks = self._compile()
+
+    def _compile(self) -> List[Tuple[str, bool, Any, Callable[[Any], Optional[str]]]]:
+        """
+        编译字段检查表
+
+        Returns:
+            [(字段名, 是否必填, 缺省值, 检查函数)]，检查函数返回错误原因或None
+        """
+        symbols = self.symbols
+
+        def check_symbol(value):
+            if value is None or value in symbols:
+                return None
+            return f"symbol不在标的范围内: {value!r}"
+
+        def check_action(value):
+            return None if value in ACTIONS else f"无效的action: {value!r}"
+
+        def check_unit(value):
+            if _is_number(value) and 0 <= value <= 1:
+                return None
+            return f"confidence应为0-1的数值: {value!r}"
+
+        def check_size(value):
+            if _is_number(value) and 0 <= value <= MAX_POSITION_SIZE_PCT:
+                return None
+            return f"position_size_pct应为0-{MAX_POSITION_SIZE_PCT:.0f}的数值: {value!r}"
+
+        def check_price(name):
+            def check(value):
+                if value is None or (_is_number(value) and value >= 0):
+                    return None
+                return f"{name}应为非负价格或null: {value!r}"
+            return check
+
+        def check_text(value):
+            return None if isinstance(value, str) else f"rationale应为字符串: {value!r}"
+
+        return [
+            ('symbol', True, None, check_symbol),
+            ('action', True, None, check_action),
+            ('position_size_pct', False, 0.0, check_size),
+            ('take_profit', False, None, check_price('take_profit')),
+            ('stop_loss', False, None, check_price('stop_loss')),
+            ('confidence', True, None, check_unit),
+            ('rationale', True, None, check_text),
+        ]
+
+    def validate(self, obj: Any) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """
+        校验并规范化决策对象
+
+        Args:
+            obj: json.loads得到的对象
+
+        Returns:
+            (规范化的决策, None) 或 (None, 拒绝原因)
+        """
+        if not isinstance(obj, dict):
+            return None, "决策不是JSON对象"
+
+        decision = {}
+        for field, required, default, check in self._checks:
+            if field not in obj:
+                if required:
+                    return None, f"决策缺少字段: {field}"
+                decision[field] = default
+                continue
+            value = obj[field]
+            error = check(value)
+            if error:
+                return None, error
+            decision[field] = value
+
+        action = decision['action']
+        if action != 'HOLD' and decision['symbol'] is None:
+            return None, f"{action}必须指定symbol"
+        if action == 'BUY':
+            if not decision['position_size_pct']:
+                return None, "BUY必须给出position_size_pct"
+            take_profit, stop_loss = decision['take_profit'], decision['stop_loss']
+            if take_profit and stop_loss and stop_loss >= take_profit:
+                return None, f"stop_loss({stop_loss})应低于take_profit({take_profit})"
+
+        if len(decision['rationale']) > MAX_RATIONALE_CHARS:
+            decision['rationale'] = decision['rationale'][:MAX_RATIONALE_CHARS]
+        return decision, None
+
+    def parse(self, text: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """
+        提取并校验决策（返回第一个通过校验的对象）
+
+        Args:
+            text: LLM响应文本
+
+        Returns:
+            (决策, None) 或 (None, 拒绝原因)
+        """
+        error = None
+        for candidate in JSONObjectScanner().feed(text):
+            try:
+                obj = json.loads(candidate)
+            except ValueError as e:
+                error = error or f"JSON语法错误: {e}"
+                continue
+            decision, reason = self.validate(obj)
+            if decision is not None:
+                return decision, None
+            error = error or reason
+        return None, error or "响应中没有JSON对象"
+
+    def is_valid(self, text: str) -> bool:
+        """
+        响应中是否含有通过校验的决策（供对冲、缓存等适配器判断响应有效性）
+
+        Args:
+            text: LLM响应文本
+
+        Returns:
+            是否有效
+        """
+        return self.parse(text)[0] is not None
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共享内存行情快照与进程级模型工作者
+调度器每个tick把快照写入一次multiprocessing.shared_memory中的定长数组，
+每个DecisionMaker及其账本运行在独立进程中，按序号直接读取共享内存（不经pickle），
+所有模型看到逐字节相同的数据
+"""
+
+import multiprocessing
+import time
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait
+from typing import Dict, List, Any, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    print("❌ 请安装numpy: pip install numpy")
+    np = None
+
+from core.fanout import DEFAULT_DECISION_TIMEOUT
+from core.latency import LatencyRegistry
+from core.ledger import PaperLedger, INITIAL_CASH
+from core.market import BarStore
+from core.risk import RiskEngine
+from core.universe import PromptCompressor
+
+
+# 共享内存布局（float64）：[seq, ts, price_0, ..., price_{S-1}]
+# seq为seqlock序号：写入期间为奇数，写完为偶数
+HEADER_SLOTS = 2
+DEFAULT_WORKER_FACTORY = "main:build_decision_maker"
+# 执行阶段（风控校验+记账，微秒级）等待工作者回报的最长时间（秒）
+EXECUTE_TIMEOUT = 5.0
+
+
+class SharedSnapshot:
+    """共享内存中的定长行情快照（单写多读seqlock）"""
+
+    def __init__(self, symbols: List[str], name: Optional[str] = None):
+        """
+        创建或附加共享快照
+
+        Args:
+            symbols: 标的列表（决定价格数组的列顺序）
+            name: 已有共享内存的名称；None表示新建（调度器端）
+        """
+        if np is None:
+            raise ImportError("NumPy库未安装")
+
+        self.symbols = list(symbols)
+        size = (HEADER_SLOTS + len(self.symbols)) * 8
+        self.owner = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=size)
+        self._slots = np.ndarray((HEADER_SLOTS + len(self.symbols),), dtype=np.float64,
+                                 buffer=self.shm.buf)
+        if self.owner:
+            self._slots[:] = 0.0
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def publish(self, ts: float, prices) -> int:
+        """
+        写入一个快照（调度器端）
+
+        Args:
+            ts: 快照时间戳
+            prices: 价格字典，或与symbols对齐的价格向量
+
+        Returns:
+            本次快照的序号
+        """
+        if isinstance(prices, dict):
+            prices = [prices.get(symbol, 0.0) or 0.0 for symbol in self.symbols]
+        seq = int(self._slots[0])
+        self._slots[0] = seq + 1
+        self._slots[1] = ts
+        self._slots[HEADER_SLOTS:] = prices
+        self._slots[0] = seq + 2
+        return seq + 2
+
+    def read(self) -> Tuple[int, float, Any]:
+        """
+        读取当前快照（工作者端），与写入冲突时重试
+
+        Returns:
+            (序号, 时间戳, 价格数组副本)
+        """
+        while True:
+            before = int(self._slots[0])
+            if not before % 2:
+                ts = float(self._slots[1])
+                prices = self._slots[HEADER_SLOTS:].copy()
+                if int(self._slots[0]) == before:
+                    return before, ts, prices
+            # 写入进行中：让出CPU，避免与写入方争抢同一核心时空转
+            time.sleep(0)
+
+    def close(self):
+        """释放映射；创建方同时删除共享内存"""
+        del self._slots
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _worker_main(model: str, factory: str, shm_name: str, symbols: List[str], conn):
+    """
+    工作者进程入口：构建DecisionMaker与单模型账本，按tick序号读取共享快照并决策
+
+    消息协议（决策与执行分两步，超时的决策不会改动工作者账本）：
+        调度器 -> 工作者: ('tick', seq) / ('execute', seq) / ('abort', seq) / ('stop',)
+        工作者 -> 调度器: ('ready', {model_name, provider}) / ('error', 信息)
+                          / ('decision', {seq, ...}) / ('result', {seq, ...})
+    调度器对每个tick必定先发出execute或abort，再发出下一个tick
+    """
+    from core.replay import _load_factory
+
+    try:
+        decision_maker = _load_factory(factory)(model)
+        snapshot = SharedSnapshot(symbols, name=shm_name)
+        ledger = PaperLedger([model], symbols)
+        risk = RiskEngine(ledger)
+        # 工作者由每个tick的共享快照自行累积K线，提示词同样按token预算压缩
+        bars = BarStore(symbols)
+        if decision_maker.renderer.symbols == list(symbols):
+            decision_maker.renderer.set_compressor(PromptCompressor(bars))
+    except Exception as e:
+        conn.send(('error', f"{model}初始化失败: {e}"))
+        return
+    # 就绪前预热本进程的连接池，首个tick不再付出连接建立开销
+    decision_maker.llm_adapter.warm_up()
+    conn.send(('ready', {'model_name': decision_maker.model_name,
+                         'provider': decision_maker.llm_adapter.provider}))
+
+    try:
+        while True:
+            message = conn.recv()
+            if message[0] == 'stop':
+                break
+            if message[0] != 'tick':
+                # 已跳过的tick的执行/放弃指令
+                continue
+            expected = message[1]
+            started = time.perf_counter()
+            seq, ts, row = snapshot.read()
+            if seq != expected:
+                # 决策太慢积压的旧tick：调度器已按超时处理，直接跳过
+                continue
+
+            prices = {symbol: float(row[j]) for j, symbol in enumerate(symbols) if row[j] > 0}
+            for symbol, price in prices.items():
+                bars.on_tick(symbol, ts, price)
+            # 工作者只在tick上收到价格，风控检查与决策同频；
+            # 触发的平仓留在引擎中，随下一次被执行的周期回报
+            risk.check(row)
+            decision = decision_maker.get_decision(prices)
+            prompt = decision_maker.last_prompt
+            conn.send(('decision', {
+                'seq': seq,
+                'decision': decision,
+                'latency': time.perf_counter() - started,
+                'prompt_hash': prompt.hash if prompt else None,
+                'prompt': prompt.text if prompt else None,
+                'response': decision_maker.last_response,
+                'rejection': decision_maker.last_rejection,
+                'route': decision_maker.last_call_info,
+            }))
+
+            # 等待调度器的裁决：截止时间内到达才执行，否则账本保持不变
+            while True:
+                message = conn.recv()
+                if message[0] == 'stop':
+                    return
+                if message[0] in ('execute', 'abort') and message[1] == seq:
+                    break
+            if message[0] == 'abort':
+                continue
+            exits = risk.drain_fills()
+            fills = risk.execute({model: decision}, prices)
+            conn.send(('result', {
+                'seq': seq,
+                'fill': fills[0] if fills else None,
+                'exits': exits,
+                'risk_rejection': risk.last_rejections.get(model),
+                'nav': float(ledger.nav[0]),
+                'cash': float(ledger.cash[0]),
+                'trades': int(ledger.trade_count[0]),
+                'positions': ledger.get_account(model)['positions'],
+            }))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        snapshot.close()
+
+
+class ProcessArena:
+    """进程级模型工作者池：每个模型一个进程，行情经共享内存分发"""
+
+    def __init__(self, models: List[str], symbols: List[str],
+                 factory: str = DEFAULT_WORKER_FACTORY,
+                 timeout: float = DEFAULT_DECISION_TIMEOUT,
+                 start_timeout: float = 60.0):
+        """
+        启动工作者进程
+
+        Args:
+            models: 模型名称列表（传给工厂）
+            symbols: 标的列表
+            factory: 决策引擎工厂，"模块:函数"格式，接收模型名称返回DecisionMaker
+            timeout: 单周期决策截止时间（秒），超时的模型记为HOLD且其账本不执行该决策
+            start_timeout: 等待工作者初始化完成的最长时间（秒）
+        """
+        self.symbols = list(symbols)
+        self.timeout = timeout
+        self.snapshot = SharedSnapshot(self.symbols)
+        # spawn：子进程不继承调度器的线程与连接池
+        context = multiprocessing.get_context('spawn')
+
+        self._workers: Dict[str, Tuple[Any, Any]] = {}
+        for model in models:
+            parent_conn, child_conn = context.Pipe()
+            process = context.Process(target=_worker_main, name=f"arena-{model}",
+                                      args=(model, factory, self.snapshot.name, self.symbols, child_conn),
+                                      daemon=True)
+            process.start()
+            child_conn.close()
+            self._workers[model] = (process, parent_conn)
+
+        self.models: List[str] = []
+        self.model_names: Dict[str, str] = {}
+        self.providers: Dict[str, str] = {}
+        deadline = time.monotonic() + start_timeout
+        for model, (process, conn) in list(self._workers.items()):
+            remaining = max(0.0, deadline - time.monotonic())
+            try:
+                status, detail = conn.recv() if conn.poll(remaining) else ('error', f"{model}启动超时")
+            except EOFError:
+                status, detail = 'error', f"{model}工作者进程启动失败 (exitcode {process.exitcode})"
+            if status == 'ready':
+                self.models.append(model)
+                self.model_names[model] = detail['model_name']
+                self.providers[model] = detail['provider']
+                print(f"✅ {model}工作者进程已就绪 (pid {process.pid})")
+            else:
+                print(f"❌ {detail}")
+                self._stop_worker(model)
+
+        self.nav = np.full(len(self.models), INITIAL_CASH, dtype=np.float64)
+        self.last_latencies: Dict[str, float] = {}
+        self.last_timeouts: Dict[str, bool] = {}
+        self.last_results: Dict[str, Dict[str, Any]] = {}
+        self.last_exits: List[Dict[str, Any]] = []
+        self._accounts: Dict[str, Dict[str, Any]] = {}
+
+    def run(self, ts: float, prices: Dict[str, float]) -> Tuple[Dict[str, Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        发布快照，截止时间内收集所有工作者的决策，再让按时到达的工作者执行
+
+        Args:
+            ts: 快照时间戳
+            prices: 价格字典
+
+        Returns:
+            ({模型: 决策}, 成交记录列表)，超时的模型记为HOLD，其工作者不执行迟到的决策
+        """
+        seq = self.snapshot.publish(ts, prices)
+        for model in self.models:
+            self._workers[model][1].send(('tick', seq))
+
+        results = self._collect('decision', seq, time.monotonic() + self.timeout)
+        # 裁决：按时到达的执行，其余放弃（工作者在决策完成后读到abort，账本不变）
+        for model in self.models:
+            verdict = 'execute' if model in results else 'abort'
+            try:
+                self._workers[model][1].send((verdict, seq))
+            except (OSError, EOFError):
+                results.pop(model, None)
+        executed = self._collect('result', seq, time.monotonic() + EXECUTE_TIMEOUT, list(results))
+        for model, account in executed.items():
+            results[model].update(account)
+
+        decisions, fills = {}, []
+        self.last_results = {model: result for model, result in results.items() if model in executed}
+        self.last_exits = [fill for result in self.last_results.values() for fill in result['exits']]
+        for i, model in enumerate(self.models):
+            result = self.last_results.get(model)
+            self.last_timeouts[model] = result is None
+            if result is None:
+                LatencyRegistry.shared().inc('timeout', model=self.model_names[model],
+                                             provider=self.providers[model])
+                print(f"⏰ {model}决策超时({self.timeout:.0f}s)，默认HOLD")
+                decisions[model] = {'symbol': None, 'action': 'HOLD', 'position_size_pct': 0.0,
+                                    'take_profit': None, 'stop_loss': None, 'confidence': 0.0,
+                                    'rationale': "决策超时，默认观望"}
+                self.last_latencies[model] = self.timeout
+                continue
+            decisions[model] = result['decision']
+            self.last_latencies[model] = result['latency']
+            self.nav[i] = result['nav']
+            self._accounts[model] = result
+            if result['fill'] is not None:
+                fills.append(result['fill'])
+        return decisions, fills
+
+    def _collect(self, kind: str, seq: int, deadline: float,
+                 models: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """截止时间前收集指定类型、指定序号的工作者消息（丢弃上一周期迟到的决策）"""
+        pending = {self._workers[model][1]: model for model in (self.models if models is None else models)}
+        results: Dict[str, Dict[str, Any]] = {}
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            for conn in wait(list(pending), timeout=remaining):
+                try:
+                    message_kind, result = conn.recv()
+                except EOFError:
+                    model = pending.pop(conn)
+                    print(f"❌ {model}工作者进程已退出")
+                    continue
+                if message_kind != kind or result.get('seq') != seq:
+                    continue
+                results[pending.pop(conn)] = result
+        return results
+
+    def get_account(self, model: str) -> Dict[str, Any]:
+        """
+        获取单个模型最近一次回报的账户信息（格式同PaperLedger.get_account）
+
+        Returns:
+            {cash, nav, positions: [{symbol, qty, avg_px}]}
+        """
+        account = self._accounts.get(model)
+        if account is None:
+            return {'cash': INITIAL_CASH, 'nav': INITIAL_CASH, 'positions': []}
+        return {'cash': account['cash'], 'nav': account['nav'], 'positions': account['positions']}
+
+    def format_for_display(self) -> str:
+        """格式化各工作者账户净值用于显示"""
+        lines = []
+        for model in self.models:
+            account = self._accounts.get(model)
+            if account is None:
+                lines.append(f"   {model}: 暂无数据")
+                continue
+            pnl_pct = (account['nav'] / INITIAL_CASH - 1) * 100
+            lines.append(f"   {model}: 净值 ${account['nav']:.2f} ({pnl_pct:+.2f}%) "
+                         f"现金 ${account['cash']:.2f} 成交 {account['trades']}笔")
+        return "\n".join(lines)
+
+    def _stop_worker(self, model: str):
+        process, conn = self._workers.pop(model)
+        try:
+            conn.send(('stop',))
+        except (OSError, EOFError):
+            pass
+        process.join(timeout=2.0)
+        if process.is_alive():
+            process.terminate()
+        conn.close()
+
+    def close(self):
+        """停止所有工作者并释放共享内存"""
+        for model in list(self._workers):
+            self._stop_worker(model)
+        self.snapshot.close()
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+嵌入式持久化
+README中的trades/positions/nav/prompts/decisions/metrics表落在WAL模式的SQLite上：
+调度器只把每个周期的行入队，单个后台写线程把排队的周期合并为一个事务写入，
+看板与分析可用只读连接并发查询，各表均有(model, ts)索引
+"""
+
+import sqlite3
+from typing import Dict, Any, List, Optional, Tuple
+
+from core.batch import BatchWriter, DEFAULT_FLUSH_INTERVAL
+
+
+# 一个事务最多合并的周期数
+DEFAULT_CYCLES_PER_TRANSACTION = 64
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trades (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    model TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    side TEXT NOT NULL,
+    qty REAL NOT NULL,
+    price REAL NOT NULL,
+    fee REAL NOT NULL,
+    notional REAL NOT NULL,
+    realized_pnl REAL NOT NULL,
+    reason TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_trades_model_ts ON trades (model, ts);
+
+CREATE TABLE IF NOT EXISTS positions (
+    ts REAL NOT NULL,
+    model TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    qty REAL NOT NULL,
+    avg_px REAL NOT NULL,
+    PRIMARY KEY (model, ts, symbol)
+);
+
+CREATE TABLE IF NOT EXISTS nav (
+    ts REAL NOT NULL,
+    model TEXT NOT NULL,
+    nav REAL NOT NULL,
+    cash REAL NOT NULL,
+    PRIMARY KEY (model, ts)
+);
+
+CREATE TABLE IF NOT EXISTS prompts (
+    hash TEXT PRIMARY KEY,
+    ts REAL NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_prompts_ts ON prompts (ts);
+
+CREATE TABLE IF NOT EXISTS decisions (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    model TEXT NOT NULL,
+    symbol TEXT,
+    action TEXT NOT NULL,
+    position_size_pct REAL,
+    take_profit REAL,
+    stop_loss REAL,
+    confidence REAL,
+    rationale TEXT,
+    prompt_hash TEXT,
+    latency REAL,
+    rejection TEXT,
+    risk_rejection TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_decisions_model_ts ON decisions (model, ts);
+
+CREATE TABLE IF NOT EXISTS metrics (
+    ts REAL NOT NULL,
+    model TEXT NOT NULL,
+    nav REAL,
+    total_return REAL,
+    max_drawdown REAL,
+    drawdown REAL,
+    volatility REAL,
+    sharpe REAL,
+    calmar REAL,
+    win_rate REAL,
+    profit_factor REAL,
+    closed_trades INTEGER,
+    PRIMARY KEY (model, ts)
+);
+"""
+
+INSERT_TRADE = ("INSERT INTO trades (ts, model, symbol, side, qty, price, fee, notional, realized_pnl, reason) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)")
+INSERT_POSITION = "INSERT OR REPLACE INTO positions (ts, model, symbol, qty, avg_px) VALUES (?, ?, ?, ?, ?)"
+INSERT_NAV = "INSERT OR REPLACE INTO nav (ts, model, nav, cash) VALUES (?, ?, ?, ?)"
+INSERT_PROMPT = "INSERT OR IGNORE INTO prompts (hash, ts, text) VALUES (?, ?, ?)"
+INSERT_DECISION = ("INSERT INTO decisions (ts, model, symbol, action, position_size_pct, take_profit, stop_loss, "
+                   "confidence, rationale, prompt_hash, latency, rejection, risk_rejection) "
+                   "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)")
+METRIC_COLUMNS = ('nav', 'total_return', 'max_drawdown', 'drawdown', 'volatility', 'sharpe',
+                  'calmar', 'win_rate', 'profit_factor', 'closed_trades')
+INSERT_METRICS = (f"INSERT OR REPLACE INTO metrics (ts, model, {', '.join(METRIC_COLUMNS)}) "
+                  f"VALUES (?, ?, {', '.join('?' * len(METRIC_COLUMNS))})")
+
+Statements = List[Tuple[str, List[tuple]]]
+
+
+def _connect(path: str, readonly: bool = False) -> sqlite3.Connection:
+    """打开连接：WAL模式，写连接使用synchronous=NORMAL（WAL下仍保证一致性）"""
+    if readonly:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+    else:
+        conn = sqlite3.connect(path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=5000")
+    return conn
+
+
+class ArenaStore(BatchWriter):
+    """SQLite持久化写入器（单写线程，按周期批量提交）"""
+
+    failure_message = "数据库写入失败"
+
+    def __init__(self, path: str, batch_size: int = DEFAULT_CYCLES_PER_TRANSACTION,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL):
+        """
+        建表并启动后台写入线程
+
+        Args:
+            path: 数据库文件路径
+            batch_size: 一个事务最多合并的周期数
+            flush_interval: 写线程等待新数据的最长时间（秒）
+        """
+        super().__init__(batch_size, flush_interval)
+        self.path = path
+
+        self._conn = _connect(path)
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+        self.transactions = 0
+        self.rows = 0
+        self._start("storage-writer")
+
+    def write_cycle(self, ts: float, decisions: Dict[str, Dict[str, Any]],
+                    accounts: Dict[str, Dict[str, Any]], trades: List[Dict[str, Any]],
+                    details: Optional[Dict[str, Dict[str, Any]]] = None,
+                    metrics: Optional[Dict[str, Dict[str, Any]]] = None):
+        """
+        提交一个周期的全部数据（热路径，只构建行并入队，写线程以一个事务写入）
+
+        Args:
+            ts: 周期时间戳
+            decisions: {模型: 决策}
+            accounts: {模型: {cash, nav, positions: [{symbol, qty, avg_px}]}}
+            trades: 成交记录（含风控平仓）
+            details: {模型: {prompt_hash, prompt, latency, rejection, risk_rejection}}
+            metrics: {模型: PerformanceTracker.get_metrics()的返回值}
+        """
+        details = details or {}
+        prompts = {}
+        decision_rows = []
+        for model, decision in decisions.items():
+            info = details.get(model, {})
+            if info.get('prompt_hash') and info.get('prompt'):
+                prompts[info['prompt_hash']] = (info['prompt_hash'], ts, info['prompt'])
+            decision_rows.append((
+                ts, model, decision.get('symbol'), decision.get('action'),
+                decision.get('position_size_pct'), decision.get('take_profit'), decision.get('stop_loss'),
+                decision.get('confidence'), decision.get('rationale'), info.get('prompt_hash'),
+                info.get('latency'), info.get('rejection'), info.get('risk_rejection'),
+            ))
+
+        statements: Statements = [
+            (INSERT_PROMPT, list(prompts.values())),
+            (INSERT_DECISION, decision_rows),
+            (INSERT_TRADE, [
+                (fill.get('ts', ts), fill['model'], fill['symbol'], fill['side'], fill['qty'], fill['price'],
+                 fill['fee'], fill['notional'], fill['realized_pnl'], fill.get('reason'))
+                for fill in trades
+            ]),
+            (INSERT_NAV, [(ts, model, account['nav'], account['cash']) for model, account in accounts.items()]),
+            (INSERT_POSITION, [
+                (ts, model, position['symbol'], position['qty'], position['avg_px'])
+                for model, account in accounts.items() for position in account.get('positions', ())
+            ]),
+        ]
+        if metrics:
+            statements.append((INSERT_METRICS, [
+                (ts, model) + tuple(values.get(column) for column in METRIC_COLUMNS)
+                for model, values in metrics.items()
+            ]))
+        self._put(statements)
+
+    def _write_batch(self, batch: List[Statements]):
+        """排队的周期合并为一个事务提交"""
+        rows = 0
+        with self._conn:
+            for statements in batch:
+                for sql, params in statements:
+                    if params:
+                        self._conn.executemany(sql, params)
+                        rows += len(params)
+        self.transactions += 1
+        self.rows += rows
+
+    def _on_stop(self):
+        self._conn.close()
+
+
+class ArenaReader:
+    """SQLite只读查询（WAL模式下与写线程并发，不阻塞写入）"""
+
+    TABLES = ('trades', 'positions', 'nav', 'decisions', 'metrics')
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: 数据库文件路径
+        """
+        self.conn = _connect(path, readonly=True)
+        self.conn.row_factory = sqlite3.Row
+
+    def range(self, table: str, model: str, start: Optional[float] = None,
+              end: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        按(model, ts)索引查询一个模型在时间段内的记录
+
+        Args:
+            table: 表名（trades / positions / nav / decisions / metrics）
+            model: 模型名称
+            start: 起始时间戳（含），None表示不限
+            end: 结束时间戳（含），None表示不限
+
+        Returns:
+            按时间升序的记录字典列表
+        """
+        if table not in self.TABLES:
+            raise ValueError(f"未知的表: {table}")
+        start = float('-inf') if start is None else start
+        end = float('inf') if end is None else end
+        cursor = self.conn.execute(f"SELECT * FROM {table} WHERE model = ? AND ts BETWEEN ? AND ? ORDER BY ts",
+                                   (model, start, end))
+        return [dict(row) for row in cursor]
+
+    def latest_nav(self) -> Dict[str, Tuple[float, float]]:
+        """
+        获取各模型最新的净值
+
+        Returns:
+            {模型: (时间戳, 净值)}
+        """
+        cursor = self.conn.execute("SELECT model, MAX(ts), nav FROM nav GROUP BY model")
+        return {model: (ts, nav) for model, ts, nav in cursor}
+
+    def prompt(self, prompt_hash: str) -> Optional[str]:
+        """按哈希查询提示词全文"""
+        row = self.conn.execute("SELECT text FROM prompts WHERE hash = ?", (prompt_hash,)).fetchone()
+        return row[0] if row else None
+
+    def close(self):
+        self.conn.close()
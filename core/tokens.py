@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+token估计
+不依赖任何SDK的纯函数，供网关的token限流与提示词压缩的预算共用
+"""
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    粗略估计文本的token数（中英混合：ASCII约4字符/token，其余约1字符/token）
+
+    Args:
+        text: 文本
+
+    Returns:
+        估计的token数
+    """
+    ascii_chars = sum(1 for ch in text if ch < '\x80')
+    return ascii_chars // 4 + (len(text) - ascii_chars) + 1
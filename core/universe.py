@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+交易标的池与提示词压缩
+标的池可配置到数百个代币；渲染提示词前按向量化的波动率与成交额特征预排名，只保留前K个，
+K线序列编码为相对现价的整数基点并按token预算降采样，提示词长度不随标的池增长
+"""
+
+import os
+from typing import Dict, List, Any, Optional, Callable
+
+try:
+    import numpy as np
+except ImportError:
+    print("❌ 请安装numpy: pip install numpy")
+    np = None
+
+from core.tokens import estimate_tokens
+
+
+DEFAULT_SYMBOLS = ['BTCUSDT', 'ETHUSDT', 'XRPUSDT', 'BNBUSDT', 'SOLUSDT']
+# 行情部分的token预算与保留的代币数
+DEFAULT_PROMPT_TOKENS = 1500
+DEFAULT_TOP_K = 20
+# 参与排名与编码的K线根数（与market.DEFAULT_BAR_WINDOW一致）
+DEFAULT_FEATURE_WINDOW = 60
+# K线序列的降采样步长（分钟），依次尝试直到放进预算；最后一档只保留汇总列
+SERIES_STRIDES = (1, 2, 3, 5, 10, 15, 30, None)
+
+
+def load_universe() -> List[str]:
+    """
+    读取交易标的池
+
+    ARENA_SYMBOLS_FILE: 文本文件，每行一个代币（#开头为注释）
+    ARENA_SYMBOLS: 逗号分隔的代币列表
+    均未设置时为默认的5个代币
+
+    Returns:
+        代币列表（去重，保持顺序）
+    """
+    symbols_file = os.getenv('ARENA_SYMBOLS_FILE')
+    if symbols_file:
+        with open(symbols_file, 'r', encoding='utf-8') as f:
+            symbols = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    else:
+        symbols = [s.strip() for s in os.getenv('ARENA_SYMBOLS', '').split(',') if s.strip()]
+    return list(dict.fromkeys(symbol.upper() for symbol in symbols)) or list(DEFAULT_SYMBOLS)
+
+
+def symbol_features(bars, last, turnover=None) -> Dict[str, Any]:
+    """
+    向量化计算所有代币的排名特征
+
+    Args:
+        bars: 形如(S, W, 5)的OHLCV数组，缺失K线为NaN
+        last: 形如(S,)的现价向量，无价格为0
+        turnover: 可选的(S,)成交额向量（如24小时成交额），K线没有成交量时使用
+
+    Returns:
+        {volatility: 1分钟对数收益率标准差, change: 窗口涨跌幅, turnover: 成交额}，均为(S,)
+    """
+    closes = bars[:, :, 3]
+    valid = ~np.isnan(closes) & (closes > 0)
+    log_closes = np.log(np.where(valid, closes, 1.0))
+    steps = valid[:, 1:] & valid[:, :-1]
+    returns = np.where(steps, log_closes[:, 1:] - log_closes[:, :-1], 0.0)
+    count = steps.sum(axis=1)
+    mean = returns.sum(axis=1) / np.maximum(count, 1)
+    deviation = np.where(steps, returns - mean[:, None], 0.0)
+    volatility = np.sqrt((deviation ** 2).sum(axis=1) / np.maximum(count - 1, 1))
+
+    first = closes[np.arange(len(closes)), valid.argmax(axis=1)]
+    has_history = valid.any(axis=1) & (last > 0)
+    change = np.where(has_history, last / np.where(has_history, first, 1.0) - 1.0, 0.0)
+
+    dollar = np.where(valid, closes * np.nan_to_num(bars[:, :, 4]), 0.0).sum(axis=1)
+    if turnover is not None:
+        dollar = np.where(dollar > 0, dollar, turnover)
+    return {'volatility': volatility, 'change': change, 'turnover': dollar}
+
+
+def _zscore(values):
+    std = values.std()
+    return (values - values.mean()) / std if std > 0 else np.zeros_like(values)
+
+
+def rank_symbols(features: Dict[str, Any], last, k: int):
+    """
+    按波动率与成交额（对数）的z分数之和取前k个代币
+
+    Args:
+        features: symbol_features的返回值
+        last: (S,)现价向量，无价格的代币不参与排名
+        k: 保留的代币数
+
+    Returns:
+        按得分降序的代币下标数组
+    """
+    score = _zscore(features['volatility']) + _zscore(np.log1p(features['turnover']))
+    score = np.where(last > 0, score, -np.inf)
+    k = min(k, int((last > 0).sum()))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    top = np.argpartition(-score, k - 1)[:k]
+    return top[np.argsort(-score[top], kind='stable')]
+
+
+class PromptCompressor:
+    """按token预算压缩行情提示词"""
+
+    def __init__(self, bars, turnover: Optional[Callable[[], Any]] = None,
+                 token_budget: Optional[int] = None, top_k: Optional[int] = None,
+                 window: int = DEFAULT_FEATURE_WINDOW):
+        """
+        初始化压缩器
+
+        Args:
+            bars: K线存储（core.market.BarStore），代币顺序即标的池顺序
+            turnover: 返回(S,)成交额向量的函数（如MarketData.get_turnover），可为None
+            token_budget: 行情部分的token预算，None则从ARENA_PROMPT_TOKENS环境变量获取
+            top_k: 最多保留的代币数，None则从ARENA_TOP_K环境变量获取
+            window: 参与排名与编码的K线根数
+        """
+        if np is None:
+            raise ImportError("NumPy库未安装")
+        self.bars = bars
+        self.symbols = list(bars.symbols)
+        self.turnover = turnover
+        if token_budget is None:
+            token_budget = int(os.getenv('ARENA_PROMPT_TOKENS', DEFAULT_PROMPT_TOKENS))
+        if top_k is None:
+            top_k = int(os.getenv('ARENA_TOP_K', DEFAULT_TOP_K))
+        self.token_budget = token_budget
+        self.top_k = top_k
+        self.window = window
+        self.last_stats: Dict[str, Any] = {}
+
+    def state_key(self) -> tuple:
+        """
+        渲染结果除价格外所依赖的状态（K线版本与成交额），供渲染器的缓存键使用
+
+        Returns:
+            可比较的元组，状态不变时相等
+        """
+        turnover = self.turnover() if self.turnover is not None else None
+        return (self.bars.version, None if turnover is None else turnover.tobytes())
+
+    def render(self, market_data: Dict[str, float]) -> str:
+        """
+        渲染压缩后的行情部分
+
+        Args:
+            market_data: 价格字典
+
+        Returns:
+            行情文本（以"JSON:"结尾），估计token数不超过预算
+        """
+        last = np.array([market_data.get(symbol, 0.0) or 0.0 for symbol in self.symbols],
+                        dtype=np.float64)
+        bars = self.bars.stack(self.window)
+        turnover = self.turnover() if self.turnover is not None else None
+        features = symbol_features(bars, last, turnover)
+        top = rank_symbols(features, last, self.top_k)
+
+        summaries = [
+            f"{self.symbols[i]} {last[i]:.6g} {features['change'][i] * 100:+.2f} "
+            f"{features['volatility'][i] * 100:.3f} {features['turnover'][i]:.3g}"
+            for i in top
+        ]
+        # 收盘价相对现价的基点，旧→新，不含当前这根
+        closes = bars[top, :, 3]
+        bps = np.rint((closes / last[top, None] - 1.0) * 1e4)
+
+        k = len(top)
+        while True:
+            for stride in SERIES_STRIDES:
+                text = self._format(summaries[:k], bps[:k], stride, k)
+                tokens = estimate_tokens(text)
+                if tokens <= self.token_budget:
+                    self.last_stats = {'symbols': k, 'stride': stride, 'tokens': tokens}
+                    return text
+            if k <= 1:
+                self.last_stats = {'symbols': k, 'stride': None, 'tokens': tokens}
+                return text
+            k = max(1, k // 2)
+
+    def _format(self, summaries: List[str], bps, stride: Optional[int], k: int) -> str:
+        """按给定降采样步长拼接行情文本"""
+        if stride is None:
+            lines = summaries
+            series_note = ""
+        else:
+            positions = np.arange(self.window - 1 - stride, -1, -stride)[::-1]
+            lines = []
+            for summary, row in zip(summaries, bps[:, positions]):
+                series = ",".join(str(int(x)) for x in row if x == x)
+                lines.append(f"{summary} {series}" if series else summary)
+            series_note = f" 近{self.window}分钟收盘价相对现价的基点序列(旧→新,每{stride}分钟)"
+        header = (f"\n当前市场（按波动率与成交额排名前{k}/{len(self.symbols)}个代币）：\n"
+                  f"列：代币 现价 {self.window}分钟涨跌% 1分钟波动率% 成交额USDT{series_note}\n")
+        return header + "\n".join(lines) + "\n\nJSON:\n"
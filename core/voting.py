@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+自一致性投票
+同一模型并发采样N次，按(symbol, action)做信心加权多数表决，结果已成定局时取消剩余请求
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Any, List, Optional, Tuple
+
+from adapters.llm_base import LLMAdapter
+from core.decision import DecisionMaker, DecisionSample
+from core.prompt import PromptRenderer
+
+
+DEFAULT_SAMPLES = 5
+# 单个样本的最大票重（confidence上限）
+MAX_VOTE_WEIGHT = 1.0
+
+
+class VotingDecisionMaker(DecisionMaker):
+    """
+    自一致性投票决策引擎
+
+    每个样本的票重为其confidence，解析失败的样本（confidence为0）相当于弃权。
+    注意：不要与响应缓存同时使用，否则N个样本会命中同一条缓存。
+    """
+
+    def __init__(self, llm_adapter: LLMAdapter, samples: int = DEFAULT_SAMPLES,
+                 renderer: Optional[PromptRenderer] = None, streaming: bool = False):
+        """
+        初始化投票决策引擎
+
+        Args:
+            llm_adapter: LLM适配器实例
+            samples: 每次决策的采样数
+            renderer: 提示词渲染器
+            streaming: 单个样本是否使用流式提前终止
+        """
+        super().__init__(llm_adapter, renderer=renderer, streaming=streaming)
+        self.samples = samples
+        self._executor = ThreadPoolExecutor(max_workers=samples,
+                                            thread_name_prefix=f"vote-{self.model_name}")
+        self.last_votes: Dict[str, float] = {}
+        self.last_samples_used = 0
+
+    def get_decision(self, market_data: Dict[str, float]) -> Dict[str, Any]:
+        """
+        并发采样并投票（线程池）
+
+        Args:
+            market_data: 市场数据
+
+        Returns:
+            投票后的决策字典
+        """
+        prompt = self.render_prompt(market_data)
+        pending = {self._executor.submit(self.sample, prompt) for _ in range(self.samples)}
+        tally = _Tally(self.samples)
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    tally.add(future.result())
+                if tally.settled():
+                    break
+        finally:
+            # 尚未开始的请求直接取消；已在执行中的请求结果被丢弃
+            for future in pending:
+                future.cancel()
+        return self._finish(tally)
+
+    async def aget_decision(self, market_data: Dict[str, float]) -> Dict[str, Any]:
+        """
+        并发采样并投票（异步，提前定局时取消在途请求）
+
+        Args:
+            market_data: 市场数据
+
+        Returns:
+            投票后的决策字典
+        """
+        prompt = self.render_prompt(market_data)
+        tasks = [asyncio.ensure_future(self.asample(prompt)) for _ in range(self.samples)]
+        tally = _Tally(self.samples)
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                tally.add(await next_done)
+                if tally.settled():
+                    break
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+        return self._finish(tally)
+
+    def _finish(self, tally: '_Tally') -> Dict[str, Any]:
+        """
+        记录投票结果并生成最终决策
+
+        last_response/last_call_info/last_rejection取自胜出组中被采用的样本；
+        全部弃权时取自最后完成的样本
+        """
+        self.last_votes = {f"{action} {symbol}": weight
+                           for (symbol, action), weight in tally.weights.items()}
+        self.last_samples_used = tally.count
+        result = tally.result()
+        if result is None:
+            result = DecisionSample(self.get_default_decision())
+            last = tally.last
+            if last is not None:
+                result = DecisionSample(result.decision, last.response, last.call_info,
+                                        last.rejection, last.stopped_early)
+        return self._record(result)
+
+
+class _Tally:
+    """信心加权计票"""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.count = 0
+        self.weights: Dict[Tuple[Any, str], float] = {}
+        self.samples: Dict[Tuple[Any, str], List[DecisionSample]] = {}
+        self.last: Optional[DecisionSample] = None
+
+    def add(self, sample: DecisionSample):
+        """计入一个样本"""
+        self.count += 1
+        self.last = sample
+        decision = sample.decision
+        key = (decision.get('symbol'), decision.get('action', 'HOLD'))
+        weight = min(max(float(decision.get('confidence') or 0.0), 0.0), MAX_VOTE_WEIGHT)
+        if weight <= 0:
+            return
+        self.weights[key] = self.weights.get(key, 0.0) + weight
+        self.samples.setdefault(key, []).append(sample)
+
+    def _ranked(self) -> List[float]:
+        return sorted(self.weights.values(), reverse=True) + [0.0, 0.0]
+
+    def settled(self) -> bool:
+        """剩余样本全部投给第二名也无法反超时，结果已成定局"""
+        remaining = self.total - self.count
+        leader, runner_up = self._ranked()[:2]
+        return leader > 0 and leader - runner_up > remaining * MAX_VOTE_WEIGHT
+
+    def result(self) -> Optional[DecisionSample]:
+        """
+        生成最终决策
+
+        Returns:
+            胜出组中信心最高的样本（决策的confidence替换为该组的平均信心）；全部弃权时返回None
+        """
+        if not self.weights:
+            return None
+        winner = max(self.weights, key=self.weights.get)
+        group = self.samples[winner]
+        best = max(group, key=lambda item: item.decision.get('confidence') or 0.0)
+        decision = dict(best.decision)
+        decision['confidence'] = sum(item.decision.get('confidence') or 0.0 for item in group) / len(group)
+        return DecisionSample(decision, best.response, best.call_info, best.rejection, best.stopped_early)
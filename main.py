@@ -5,6 +5,7 @@ Alpha Arena MVP - 主程序
 最简化的AI交易决策对比系统
 """
 
+import argparse
 import os
 import sys
 from datetime import datetime
@@ -18,8 +19,202 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from core.market import MarketData
 from core.decision import DecisionMaker
-from adapters.openai_adapter import OpenAIAdapter
-from adapters.claude_adapter import ClaudeAdapter
+from core.voting import VotingDecisionMaker
+from core.fanout import DecisionFanout, DEFAULT_DECISION_TIMEOUT
+from core.ledger import PaperLedger
+from core.risk import RiskEngine
+from core.replay import SnapshotRecorder
+from core.audit import AuditLog, audit_cycle
+from core.storage import ArenaStore
+from core.latency import LatencyRegistry
+from core.orchestrator import Orchestrator, DEFAULT_CYCLE_INTERVAL
+from core.shm import ProcessArena
+from core.prompt import PromptRenderer
+from core.universe import PromptCompressor, load_universe
+from core.schema import DecisionValidator
+from adapters.cached_adapter import CachedLLMAdapter
+from adapters.gateway import GatewayLLMAdapter
+from adapters.hedging import HedgedLLMAdapter
+from adapters.market_stream import MarketStream
+from adapters.registry import ModelRegistry
+
+
+def make_decision_maker(adapter):
+    """
+    按环境变量构建决策引擎：ARENA_VOTES>1时启用自一致性投票
+    
+    Args:
+        adapter: LLM适配器
+    
+    Returns:
+        DecisionMaker实例
+    """
+    votes = int(os.getenv('ARENA_VOTES', '1'))
+    if votes > 1:
+        return VotingDecisionMaker(adapter, samples=votes, streaming=True)
+    return DecisionMaker(adapter, streaming=True)
+
+
+# 模型注册表：适配器SDK只在对应模型启用时导入
+MODEL_REGISTRY = ModelRegistry.from_env()
+
+
+def wrap_adapter(adapter, secondary=None, hedge_options=None):
+    """
+    为适配器加上网关（限流/重试/熔断）、可选的备用部署对冲与响应缓存，并构建决策引擎
+    
+    Args:
+        adapter: 主部署LLM适配器
+        secondary: 备用部署LLM适配器，给出时启用对冲请求
+        hedge_options: HedgedLLMAdapter的参数
+    
+    Returns:
+        DecisionMaker实例
+    """
+    # 对冲时只有通过决策schema校验的响应才算胜出，缓存也只保存这样的响应
+    validator = DecisionValidator(PromptRenderer.shared().symbols)
+    adapter = GatewayLLMAdapter(adapter)
+    if secondary is not None:
+        adapter = HedgedLLMAdapter(adapter, GatewayLLMAdapter(secondary), validator=validator.is_valid,
+                                   **(hedge_options or {}))
+    if os.getenv('LLM_CACHE_DIR'):
+        adapter = CachedLLMAdapter(adapter, validator=validator.is_valid)
+    return make_decision_maker(adapter)
+
+
+def build_decision_maker(model: str):
+    """
+    构建单个模型的决策引擎（也用作进程级工作者的工厂 "main:build_decision_maker"）
+    
+    Args:
+        model: 显示名称（模型注册表中的键）
+    
+    Returns:
+        DecisionMaker实例
+    """
+    return wrap_adapter(MODEL_REGISTRY.create_adapter(model), MODEL_REGISTRY.create_secondary(model),
+                        MODEL_REGISTRY.hedge_options(model))
+
+
+def build_decision_makers():
+    """
+    并行初始化所有启用的AI模型
+    
+    决策经DecisionFanout走异步连接池，这里不预热同步连接池；
+    调度器预热后由report_cold_start计入冷启动耗时。
+    
+    Returns:
+        {显示名称: 决策引擎}，初始化失败的模型不包含在内
+    """
+    print("\n🤖 初始化AI模型...")
+    decision_makers = MODEL_REGISTRY.build_all(wrap_adapter, warm_up=False)
+    for model, decision_maker in decision_makers.items():
+        print(f"✅ {model} ({decision_maker.model_name}) 初始化成功")
+    
+    return decision_makers
+
+
+def report_cold_start(fanout):
+    """
+    把调度器预热异步连接池的耗时计入冷启动统计并显示
+    
+    Args:
+        fanout: 已完成warm_up的DecisionFanout
+    """
+    MODEL_REGISTRY.record_warm_up(fanout.last_warm_up_latencies)
+    print("🧊 冷启动耗时:")
+    print(MODEL_REGISTRY.format_cold_start())
+
+
+def attach_prompt_compressor(market_data: MarketData):
+    """
+    行情提示词改为按token预算压缩：只保留波动率与成交额排名靠前的代币及其K线
+    
+    Args:
+        market_data: 市场数据管理器（提供K线与成交额）
+    """
+    if market_data.bars is not None:
+        PromptRenderer.shared().set_compressor(
+            PromptCompressor(market_data.bars, turnover=market_data.get_turnover))
+
+
+def build_market_data() -> MarketData:
+    """
+    构建市场数据管理器：设置ARENA_STREAM_URL时启动流式行情订阅，
+    数据新鲜时优先从环形缓冲区取价，并逐tick驱动K线与风控检查
+    
+    Returns:
+        MarketData实例
+    """
+    stream_url = os.getenv('ARENA_STREAM_URL')
+    if not stream_url:
+        return MarketData()
+    symbols = load_universe()
+    stream = MarketStream(symbols, url=stream_url)
+    stream.start()
+    print(f"📡 流式行情已启动: {stream_url}")
+    return MarketData(stream=stream, symbols=symbols)
+
+
+def run_daemon(interval: int = DEFAULT_CYCLE_INTERVAL, use_workers: bool = False):
+    """
+    常驻模式：组件只构建一次，按对齐墙钟的固定周期循环运行
+    
+    Args:
+        interval: 周期（秒）
+        use_workers: 每个模型的决策与账本运行在独立进程中，行情经共享内存分发
+    """
+    print("🚀 Alpha Arena - 常驻模式")
+    print("=" * 50)
+    
+    market_data = build_market_data()
+    if not market_data.is_api_available():
+        print("❌ 交易所API不可用，请检查配置")
+        market_data.close()
+        return
+    attach_prompt_compressor(market_data)
+    
+    workers = None
+    if use_workers:
+        print("\n🤖 启动模型工作者进程...")
+        workers = ProcessArena(MODEL_REGISTRY.enabled_models(), market_data.get_symbols())
+        decision_makers = {}
+        if not workers.models:
+            workers.close()
+            market_data.close()
+            print("❌ 没有可用的AI模型，请检查API密钥配置")
+            return
+    else:
+        decision_makers = build_decision_makers()
+        if not decision_makers:
+            market_data.close()
+            print("❌ 没有可用的AI模型，请检查API密钥配置")
+            return
+    
+    record_dir = os.getenv('ARENA_RECORD_DIR')
+    recorder = SnapshotRecorder(record_dir, market_data.get_symbols()) if record_dir else None
+    audit_dir = os.getenv('ARENA_AUDIT_DIR')
+    audit = AuditLog(audit_dir) if audit_dir else None
+    db_path = os.getenv('ARENA_DB')
+    storage = ArenaStore(db_path) if db_path else None
+    orchestrator = Orchestrator(market_data, decision_makers, interval=interval,
+                                recorder=recorder, audit=audit,
+                                latency_export=os.getenv('ARENA_LATENCY_EXPORT'),
+                                workers=workers, storage=storage)
+    try:
+        if orchestrator.fanout is not None:
+            orchestrator.warm_up()
+            report_cold_start(orchestrator.fanout)
+        orchestrator.run()
+    except KeyboardInterrupt:
+        print("\n\n⏹️ 用户中断程序")
+    finally:
+        orchestrator.close()
+        metrics = orchestrator.get_metrics()
+        print(f"📊 共运行{metrics['cycles']}个周期，错过{metrics['missed_ticks']}个tick，"
+              f"超时{metrics['overruns']}次，平均抖动{metrics['jitter_mean'] * 1000:.0f}ms")
+        print("⏱️ 分阶段延迟:")
+        print(LatencyRegistry.shared().format_for_display())
 
 
 def main():
@@ -29,14 +224,16 @@ def main():
     print(f"📅 运行时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print()
     
+    market_data = None
     try:
         # 初始化市场数据管理器
         print("📊 初始化市场数据管理器...")
-        market_data = MarketData()
+        market_data = build_market_data()
         
         if not market_data.is_api_available():
             print("❌ 交易所API不可用，请检查配置")
             return
+        attach_prompt_compressor(market_data)
         
         # 获取实时价格
         print("💰 获取实时价格...")
@@ -51,55 +248,73 @@ def main():
             print("❌ 没有获取到有效价格，请检查网络连接")
             return
         
-        # 初始化LLM适配器
-        print("\n🤖 初始化AI模型...")
+        # 录制行情快照，供回放引擎使用
+        record_dir = os.getenv('ARENA_RECORD_DIR')
+        if record_dir:
+            SnapshotRecorder(record_dir, market_data.get_symbols()).append(
+                market_data.exchange_api.last_snapshot.get('timestamp', datetime.now().timestamp()),
+                prices)
         
-        # OpenAI适配器
-        try:
-            openai_adapter = OpenAIAdapter()
-            openai_decision_maker = DecisionMaker(openai_adapter)
-            print(f"✅ OpenAI ({openai_adapter.get_model_name()}) 初始化成功")
-        except Exception as e:
-            print(f"❌ OpenAI初始化失败: {e}")
-            openai_decision_maker = None
-        
-        # Claude适配器
-        try:
-            claude_adapter = ClaudeAdapter()
-            claude_decision_maker = DecisionMaker(claude_adapter)
-            print(f"✅ Claude ({claude_adapter.get_model_name()}) 初始化成功")
-        except Exception as e:
-            print(f"❌ Claude初始化失败: {e}")
-            claude_decision_maker = None
-        
-        if not openai_decision_maker and not claude_decision_maker:
+        # 初始化LLM适配器
+        decision_makers = build_decision_makers()
+        if not decision_makers:
             print("❌ 没有可用的AI模型，请检查API密钥配置")
             return
         
-        # 获取AI决策
+        # 获取AI决策（所有模型并行，统一截止时间）
         print("\n🧠 获取AI交易决策...")
         
-        decisions = {}
+        fanout = DecisionFanout(decision_makers, timeout=DEFAULT_DECISION_TIMEOUT)
+        try:
+            fanout.warm_up()
+            report_cold_start(fanout)
+            decisions = fanout.run(prices)
+        finally:
+            fanout.close()
+        
+        for model_name, decision in decisions.items():
+            latency = fanout.last_latencies.get(model_name, 0.0)
+            print(f"\n🤖 {model_name}决策 ({latency:.2f}s):")
+            print(decision_makers[model_name].format_decision_for_display(decision))
+        print(f"\n⏱️ 决策阶段耗时: {fanout.last_wall_time:.2f}s")
+        print(LatencyRegistry.shared().format_for_display())
+        
+        # 模拟撮合：每个模型独立的10,000 USDT账本
+        ledger = PaperLedger(list(decision_makers), market_data.get_symbols())
+        risk = RiskEngine(ledger)
+        fills = risk.execute(decisions, valid_prices)
+        print("\n💼 模拟账户:")
+        for fill in fills:
+            print(f"   {fill['model']}: {fill['side']} {fill['symbol']} "
+                  f"{fill['qty']:.6f} @ ${fill['price']:.4f} (手续费 ${fill['fee']:.2f})")
+        print(ledger.format_for_display())
         
-        # OpenAI决策
-        if openai_decision_maker:
-            print("\n🤖 OpenAI决策:")
-            try:
-                openai_decision = openai_decision_maker.get_decision(prices)
-                decisions['OpenAI'] = openai_decision
-                print(openai_decision_maker.format_decision_for_display(openai_decision))
-            except Exception as e:
-                print(f"❌ OpenAI决策获取失败: {e}")
+        # 审计日志：提示词、行情快照、原始输出、决策与成交
+        audit_dir = os.getenv('ARENA_AUDIT_DIR')
+        if audit_dir:
+            audit = AuditLog(audit_dir)
+            audit_cycle(audit, datetime.now().timestamp(), decision_makers, valid_prices,
+                        decisions, fills, fanout.last_latencies, risk.last_rejections)
+            audit.close()
         
-        # Claude决策
-        if claude_decision_maker:
-            print("\n🤖 Claude决策:")
-            try:
-                claude_decision = claude_decision_maker.get_decision(prices)
-                decisions['Claude'] = claude_decision
-                print(claude_decision_maker.format_decision_for_display(claude_decision))
-            except Exception as e:
-                print(f"❌ Claude决策获取失败: {e}")
+        # 持久化：决策、成交、净值、持仓与提示词
+        db_path = os.getenv('ARENA_DB')
+        if db_path:
+            storage = ArenaStore(db_path)
+            details = {}
+            for model, decision_maker in decision_makers.items():
+                prompt = decision_maker.last_prompt
+                details[model] = {
+                    'prompt_hash': prompt.hash if prompt else None,
+                    'prompt': prompt.text if prompt else None,
+                    'latency': fanout.last_latencies.get(model),
+                    'rejection': decision_maker.last_rejection,
+                    'risk_rejection': risk.last_rejections.get(model),
+                }
+            storage.write_cycle(datetime.now().timestamp(), decisions,
+                                {model: ledger.get_account(model) for model in decision_makers},
+                                fills, details)
+            storage.close()
         
         # 决策对比
         if len(decisions) >= 2:
@@ -113,11 +328,10 @@ def main():
             
             # 检查是否一致
             if len(decisions) == 2:
-                openai_decision = decisions.get('OpenAI', {})
-                claude_decision = decisions.get('Claude', {})
+                first_decision, second_decision = decisions.values()
                 
-                if (openai_decision.get('symbol') == claude_decision.get('symbol') and 
-                    openai_decision.get('action') == claude_decision.get('action')):
+                if (first_decision.get('symbol') == second_decision.get('symbol') and 
+                    first_decision.get('action') == second_decision.get('action')):
                     print("   🎯 两个AI达成一致！")
                 else:
                     print("   ⚡ 两个AI意见分歧")
@@ -130,7 +344,19 @@ def main():
         print(f"\n❌ 程序运行出错: {e}")
         import traceback
         traceback.print_exc()
+    finally:
+        if market_data is not None:
+            market_data.close()
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Alpha Arena MVP")
+    parser.add_argument('--daemon', action='store_true', help="常驻模式，按固定周期循环运行")
+    parser.add_argument('--interval', type=int, default=DEFAULT_CYCLE_INTERVAL, help="常驻模式的周期（秒）")
+    parser.add_argument('--workers', action='store_true', help="常驻模式下每个模型运行在独立进程中")
+    args = parser.parse_args()
+    
+    if args.daemon:
+        run_daemon(args.interval, use_workers=args.workers)
+    else:
+        main()